@@ -0,0 +1,185 @@
+"""Shared scheduler for animated (repeatedly edited) responses.
+
+Commands like /hack show a sequence of frames by editing their response on
+a timer. Instead of each invocation sleeping in its own coroutine and
+editing on a fixed cadence, ``Animator.play()`` registers the frame
+sequence and one tick loop drives every animation in flight:
+
+- frame ``i`` is due ``(i + 1) * interval`` seconds after the animation
+  starts. When edits fall behind, the loop jumps to the latest due frame
+  instead of replaying the backlog, so an animation takes about as long as
+  planned and the final frame is never dropped
+- the gap between edits is stretched when REST is under pressure: an
+  exponential moving average of edit latency above ``target_latency``, or a
+  429 in the last ``throttle_window`` seconds. Stretching drops frames
+  rather than slowing the animation down
+- at most ``max_active`` animations run at once; up to ``max_queued`` more
+  wait for a slot, and anything beyond that is collapsed to its final frame
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from rest_scheduler import FUN, run_direct
+
+log = logging.getLogger("skybot.animation")
+
+
+class _Animation:
+    __slots__ = ("key", "edit", "frames", "interval", "started", "next_at", "shown", "sent", "inflight", "done")
+
+    def __init__(self, key, edit, frames: list[str], interval: float, done: asyncio.Future):
+        self.key = key
+        self.edit = edit
+        self.frames = frames
+        self.interval = interval
+        self.started = 0.0
+        self.next_at = 0.0
+        # Index of the last frame sent, and how many were actually sent
+        self.shown = -1
+        self.sent = 0
+        self.inflight = False
+        self.done = done
+
+
+class Animator:
+    def __init__(self, max_active: int = 25, max_queued: int = 100, tick: float = 0.25, target_latency: float = 0.5,
+                 max_stretch: float = 4.0, throttle_window: float = 10.0, scheduler=None):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.tick = tick
+        self.target_latency = target_latency
+        self.max_stretch = max_stretch
+        self.throttle_window = throttle_window
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+        self._active = []
+        self._waiting = deque()
+        self._task = None
+        self._sends = set()
+        self._latency = 0.0
+        self._last_429 = -1e9
+        self.stats = {"animations": 0, "frames_sent": 0, "frames_dropped": 0, "collapsed": 0, "throttled": 0}
+
+    def depth(self) -> dict:
+        return {"active": len(self._active), "waiting": len(self._waiting)}
+
+    def stretch(self, now: float | None = None) -> float:
+        """How much to stretch the gap between frames (1 = no pressure)."""
+        now = time.monotonic() if now is None else now
+        factor = max(1.0, self._latency / self.target_latency)
+        if now - self._last_429 < self.throttle_window:
+            factor *= 2
+        return min(factor, self.max_stretch)
+
+    async def play(self, key, edit, frames: list[str], interval: float = 1.5) -> int:
+        """Show ``frames`` one after another; ``edit(content)`` is a coroutine that edits the response.
+
+        ``key`` identifies the response (e.g. the interaction ID) and is its
+        REST route. Returns the number of frames actually shown; raises if
+        an edit fails.
+        """
+        if not frames:
+            return 0
+        self.stats["animations"] += 1
+        if len(self._active) >= self.max_active and len(self._waiting) >= self.max_queued:
+            # Overloaded: skip straight to the end
+            log.debug("Animation %s collapsed (%s active, %s waiting)", key, len(self._active), len(self._waiting))
+            self.stats["collapsed"] += 1
+            self.stats["frames_dropped"] += len(frames) - 1
+            await self._submit(FUN, f"interaction:{key}", edit, frames[-1])
+            self.stats["frames_sent"] += 1
+            return 1
+        anim = _Animation(key, edit, list(frames), interval, asyncio.get_running_loop().create_future())
+        if len(self._active) < self.max_active:
+            self._activate(anim, time.monotonic())
+        else:
+            self._waiting.append(anim)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            return await asyncio.shield(anim.done)
+        except asyncio.CancelledError:
+            if not anim.done.done():
+                anim.done.cancel()
+            raise
+
+    def _activate(self, anim, now: float):
+        anim.started = now
+        anim.next_at = now + anim.interval
+        self._active.append(anim)
+
+    def _finish(self, anim, result=None, error=None):
+        if anim in self._active:
+            self._active.remove(anim)
+        if not anim.done.done():
+            if error is not None:
+                anim.done.set_exception(error)
+            else:
+                anim.done.set_result(result)
+        now = time.monotonic()
+        while self._waiting and len(self._active) < self.max_active:
+            waiting = self._waiting.popleft()
+            if not waiting.done.done():
+                self._activate(waiting, now)
+
+    async def _run(self):
+        try:
+            while self._active or self._waiting:
+                now = time.monotonic()
+                stretch = self.stretch(now)
+                for anim in list(self._active):
+                    if anim.done.done():
+                        # Caller went away
+                        self._finish(anim)
+                        continue
+                    if anim.inflight or now < anim.next_at:
+                        continue
+                    last = len(anim.frames) - 1
+                    due = min(last, int((now - anim.started) / anim.interval) - 1)
+                    if due <= anim.shown:
+                        due = anim.shown + 1
+                    self.stats["frames_dropped"] += due - anim.shown - 1
+                    anim.shown = due
+                    anim.inflight = True
+                    anim.next_at = now + anim.interval * stretch
+                    send = asyncio.create_task(self._send(anim, anim.frames[due], due == last))
+                    self._sends.add(send)
+                    send.add_done_callback(self._sends.discard)
+                await asyncio.sleep(self.tick)
+        finally:
+            self._task = None
+
+    async def _send(self, anim, content: str, final: bool):
+        start = time.monotonic()
+        try:
+            await self._submit(FUN, f"interaction:{anim.key}", anim.edit, content)
+        except Exception as e:
+            if isinstance(e, discord.HTTPException) and e.status == 429:
+                self._last_429 = time.monotonic()
+                self.stats["throttled"] += 1
+            if final or not isinstance(e, discord.HTTPException) or e.status != 429:
+                self._finish(anim, error=e)
+                return
+            # Rate limited on an intermediate frame: drop it and carry on
+            self.stats["frames_dropped"] += 1
+        else:
+            anim.sent += 1
+            self.stats["frames_sent"] += 1
+            if final:
+                self._finish(anim, result=anim.sent)
+        finally:
+            self._latency += 0.2 * ((time.monotonic() - start) - self._latency)
+            anim.inflight = False
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        for anim in list(self._active) + list(self._waiting):
+            if not anim.done.done():
+                anim.done.cancel()
+        self._active.clear()
+        self._waiting.clear()
@@ -0,0 +1,178 @@
+"""On-disk LRU of avatar images for /getpfp's attachment mode.
+
+Entries are keyed by (avatar hash, size, format) and stored as one file
+each, named ``<hash>-<size>.<format>``. The hash changes whenever a user
+changes their avatar, so a cached file can never be served for a newer
+avatar; old hashes simply age out of the LRU.
+
+Images are fetched through one pooled ``aiohttp.ClientSession`` (as in
+webhooks.py). Concurrent requests for the same entry share a single
+download. The cache is bounded by total bytes: after every insert the least
+recently used files are deleted until it fits. Recency is kept in memory
+and mirrored to file mtimes, so the order survives a restart (the index is
+rebuilt from the directory at ``start()``).
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+log = logging.getLogger("skybot.avatars")
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_]")
+
+
+class AvatarCache:
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 8 * 1024 * 1024,
+                 pool_size: int = 10, timeout: float = 15.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        # file name -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._pending = {}
+        # Last mtime written, so recency order never ties at the filesystem's timestamp granularity
+        self._last_ns = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "fetch_errors": 0}
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        await asyncio.to_thread(self._load)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def size(self) -> int:
+        return self._bytes
+
+    def cached(self, avatar_hash: str, size: int, fmt: str) -> bool:
+        return self.filename(avatar_hash, size, fmt) in self._entries
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".tmp"):
+                # Interrupted download
+                os.remove(entry.path)
+                continue
+            st = entry.stat()
+            found.append((st.st_mtime_ns, entry.name, st.st_size))
+        found.sort()
+        self._last_ns = found[-1][0] if found else 0
+        self._entries = OrderedDict((name, size) for _, name, size in found)
+        self._bytes = sum(self._entries.values())
+        self._evict()
+        log.info("Avatar cache: %s file(s), %.1f MiB in %s", len(self._entries), self._bytes / 1048576, self.directory)
+
+    def _touch(self, path: str):
+        self._last_ns = max(time.time_ns(), self._last_ns + 1)
+        os.utime(path, ns=(self._last_ns, self._last_ns))
+
+    @staticmethod
+    def filename(avatar_hash: str, size: int, fmt: str) -> str:
+        return f"{_UNSAFE.sub('', str(avatar_hash))}-{int(size)}.{_UNSAFE.sub('', fmt)}"
+
+    async def get(self, avatar_hash: str, size: int, fmt: str, url: str) -> str:
+        """Path of the cached image, downloading it from ``url`` on a miss.
+
+        Open the file before the next ``await``: a later insert may evict
+        it (an already open file stays readable). Raises on download errors
+        and ``ValueError`` if the image is larger than ``max_entry_bytes``.
+        """
+        name = self.filename(avatar_hash, size, fmt)
+        path = os.path.join(self.directory, name)
+        if name in self._entries:
+            self.stats["hits"] += 1
+            self._entries.move_to_end(name)
+            try:
+                self._touch(path)
+            except OSError:
+                # Deleted behind our back; fetch it again
+                self._bytes -= self._entries.pop(name)
+            else:
+                return path
+        pending = self._pending.get(name)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            await asyncio.shield(pending)
+            return path
+        self.stats["misses"] += 1
+        task = self._pending[name] = asyncio.create_task(self._fetch(name, path, url))
+        try:
+            await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._pending.pop(name, None)
+            else:
+                task.add_done_callback(lambda _: self._pending.pop(name, None))
+        return path
+
+    async def _fetch(self, name: str, path: str, url: str):
+        if self._session is None:
+            await self.start()
+        try:
+            async with self._session.get(url) as resp:
+                resp.raise_for_status()
+                if (resp.content_length or 0) > self.max_entry_bytes:
+                    raise ValueError(f"avatar is {resp.content_length} bytes")
+                chunks = []
+                received = 0
+                async for chunk in resp.content.iter_chunked(65536):
+                    received += len(chunk)
+                    if received > self.max_entry_bytes:
+                        raise ValueError(f"avatar is over {self.max_entry_bytes} bytes")
+                    chunks.append(chunk)
+        except Exception:
+            self.stats["fetch_errors"] += 1
+            raise
+        data = b"".join(chunks)
+        await asyncio.to_thread(self._write, path, data)
+        self._touch(path)
+        if name in self._entries:
+            self._bytes -= self._entries.pop(name)
+        self._entries[name] = len(data)
+        self._bytes += len(data)
+        self._evict(keep=name)
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _evict(self, keep: str | None = None):
+        while self._bytes > self.max_bytes and self._entries:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                # Never evict the entry just inserted (it's bigger than the whole cache)
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(name)
+                continue
+            del self._entries[name]
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
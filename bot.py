@@ -2,100 +2,363 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import os
+import asyncio
 from dotenv import load_dotenv
 import time
-from collections import defaultdict, deque
 import random
+import logging
+import datetime
+import math
+
+from logging_setup import setup_logging
+from config_store import ConfigStore
+from ratewindow import RateWindows
+import raid
+from mute_provisioning import MuteProvisioner
+import mutes
+from duplicates import DuplicateDetector
+import word_filter
+from purge import Purger, PurgeJob
+from modlog import ModLog
+from webhooks import WebhookClient
+from avatar_cache import AvatarCache
+from reaction_roles import ReactionRoleIndex, emoji_key, format_emoji
+from metrics import Metrics
+from command_sync import sync_if_changed
+from member_cache import MemberResolver
+from cluster import ShardPlan, STATUS_INTERVAL
+from message_pipeline import MessagePipeline
+from join_queue import JoinProcessor
+from rest_scheduler import RestScheduler, MODERATION, VERIFICATION, NOTIFICATION
+import meters
+import repeat_packer
+import text_styles
+from animation import Animator
+from replay import GatewayRecorder
 
 # Load environment variables (prefer existing environment vars over .env)
 load_dotenv()
 
+log = logging.getLogger("skybot")
+cmd_log = logging.getLogger("skybot.commands")
+member_log = logging.getLogger("skybot.events.members")
+reaction_log = logging.getLogger("skybot.events.reactions")
+spam_log = logging.getLogger("skybot.antispam")
+raid_log = logging.getLogger("skybot.antiraid")
+shard_log = logging.getLogger("skybot.shards")
+
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
-
-# Simple in-memory storage for welcome/leave channels per guild
+# Persistent config: the dicts below are the read cache, SQLite is the backing store.
+# Admin commands mutate the dict and then call config_store.mark_dirty(...);
+# the store flushes changed guilds to disk in the background.
+config_store = ConfigStore(os.getenv('SKYBOT_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sky-bot.db'))
+
+# Cluster mode (see cluster.py): this process runs only the shards in
+# SKYBOT_SHARD_IDS and owns only the guilds on them. Without the env vars
+# it's a plain single-process bot that owns everything.
+shard_plan = ShardPlan.from_env()
+ready_shards = set()
+
+def owns_config_row(namespace, guild_id):
+    if namespace == "command_sync":
+        return shard_plan.cluster_id == 0
+    return shard_plan.owns_guild(guild_id)
+
+class SkyBot(commands.AutoShardedBot if shard_plan.sharded else commands.Bot):
+    async def setup_hook(self):
+        # Runs once per process, before connecting to the gateway
+        try:
+            loaded = await asyncio.to_thread(config_store.load_all, owns_config_row)
+            log.info("Loaded %s guild config row(s)", loaded)
+        except Exception as e:
+            log.warning("Failed to load config: %s", e)
+        reaction_roles.rebuild_all()
+        config_store.start()
+        # Commands are global to the application: one worker syncs for the cluster
+        if shard_plan.cluster_id == 0:
+            await self.sync_commands()
+        await webhook_client.start()
+        try:
+            await avatar_cache.start()
+        except Exception as e:
+            log.warning("Failed to open avatar cache: %s", e)
+        metrics_port = os.getenv('SKYBOT_METRICS_PORT')
+        if metrics_port:
+            try:
+                # Cluster workers listen on consecutive ports
+                await metrics.start(os.getenv('SKYBOT_METRICS_HOST', '127.0.0.1'), int(metrics_port) + shard_plan.cluster_id)
+            except Exception as e:
+                log.warning("Failed to start metrics endpoint: %s", e)
+        spam_windows.start()
+        self._raid_task = asyncio.create_task(raid_expiry_loop())
+        if shard_plan.cluster_dir:
+            self._status_task = asyncio.create_task(cluster_status_loop())
+
+    async def before_identify_hook(self, shard_id, *, initial=False):
+        # Cluster workers share the IDENTIFY rate limit through lock files
+        await shard_plan.before_identify(shard_id, initial)
+
+    async def sync_commands(self):
+        # Once per process (not on every on_ready/reconnect), and only if the tree changed.
+        # SKYBOT_DEV_GUILD syncs to one test guild instead, which propagates instantly.
+        force = os.getenv('SKYBOT_FORCE_SYNC', '').lower() in ('1', 'true', 'yes')
+        dev_guild = os.getenv('SKYBOT_DEV_GUILD')
+        target = discord.Object(id=int(dev_guild)) if dev_guild else None
+        try:
+            if target is not None:
+                self.tree.copy_global_to(guild=target)
+            if await sync_if_changed(self.tree, command_sync_state, guild=target, force=force):
+                config_store.mark_dirty("command_sync", target.id if target else 0)
+        except Exception as e:
+            log.warning("Failed to sync commands: %s", e)
+
+    async def close(self):
+        # Finish queued joins, then flush modlog entries (including autorole
+        # failures reported by the drain) while the connection is still up
+        await join_processor.drain()
+        await modlog.drain()
+        await animator.close()
+        await mute_manager.close()
+        spam_windows.stop()
+        for task in (getattr(self, '_raid_task', None), getattr(self, '_status_task', None)):
+            if task:
+                task.cancel()
+        await webhook_client.close()
+        await avatar_cache.close()
+        if event_recorder is not None:
+            event_recorder.close()
+        await metrics.close()
+        await config_store.close()
+        await super().close()
+
+# Low-memory mode: no startup chunking and no member cache. Counts come from
+# guild.member_count and members are fetched lazily through member_resolver.
+LOW_MEMORY = os.getenv('SKYBOT_LOW_MEMORY', '').lower() in ('1', 'true', 'yes')
+bot_options = {}
+if LOW_MEMORY:
+    bot_options.update(chunk_guilds_at_startup=False, member_cache_flags=discord.MemberCacheFlags.none())
+
+# SKYBOT_RECORD_EVENTS=<file> records gateway dispatches for offline replay
+# (tools/bench_replay.py --file). Recordings contain message content.
+RECORD_EVENTS = os.getenv('SKYBOT_RECORD_EVENTS')
+if RECORD_EVENTS:
+    bot_options.update(enable_debug_events=True)
+
+# No text commands: without the default !help, on_message skips prefix parsing entirely
+bot = SkyBot(command_prefix='!', intents=intents, help_command=None, **bot_options, **shard_plan.bot_options())
+member_resolver = MemberResolver()
+event_recorder = None
+if RECORD_EVENTS:
+    event_recorder = GatewayRecorder(RECORD_EVENTS)
+    bot.add_listener(event_recorder.on_socket_raw_receive)
+
+# Welcome/leave channels per guild
 # Format: {guild_id: {"welcome_channel": channel_id, "leave_channel": channel_id}}
-guild_settings = {}
+guild_settings = config_store.bind("guild_settings", {})
 
-# In-memory storage for autorole and verification config
+# Autorole and verification config
 # Format: {guild_id: {"autorole": role_id, "verification": {"channel_id": ..., "message_id": ..., "role_id": ...}}}
-autorole_settings = {}
+autorole_settings = config_store.bind("autorole_settings", {})
 
-# In-memory storage for log channel per guild
-log_channels = {}
+# Log channel per guild
+# Format: {guild_id: channel_id}
+log_channels = config_store.bind("log_channels", {})
 
-# Anti-spam config
+# Fingerprint of the last synced command tree per target (0 = global, else dev guild ID)
+# Format: {target: {"hash": sha256 hex}}
+command_sync_state = config_store.bind("command_sync", {})
+
+# Reaction-role panels per guild
+# Format: {guild_id: {message_id (str): {"channel_id": channel_id, "roles": {emoji_key: role_id}}}}
+reaction_role_panels = config_store.bind("reaction_roles", {})
+# Single (message_id, emoji) -> role index over panels + verification messages
+reaction_roles = ReactionRoleIndex(autorole_settings, reaction_role_panels)
+
+def autorole_settings_changed(guild_id):
+    config_store.mark_dirty("autorole_settings", guild_id)
+    reaction_roles.rebuild(guild_id)
+
+# Anti-spam config (defaults; guilds can override with /spamlimit)
 SPAM_MESSAGE_LIMIT = 5  # messages
 SPAM_TIME_WINDOW = 3    # seconds
 SPAM_MUTE_ROLE_NAME = "Muted"
 
-# Anti-raid config
+# Anti-raid config (defaults; guilds can override with /antiraid)
 RAID_JOIN_LIMIT = 5     # joins
 RAID_TIME_WINDOW = 10   # seconds
 
+# Welcomes are batched above this many joins per minute (guilds can override with /setupwelcome)
+WELCOME_BATCH_RATE = 10
+
 # Logging config
 MODLOG_CHANNEL_NAME = "modlog"
 
-# Spam tracking
-user_message_times = defaultdict(deque)
-# Raid tracking
-recent_joins = deque()
+# Outbound REST actions that compete for rate limits go through here:
+# moderation > verification/autorole > notifications > fun
+rest = RestScheduler()
+# Animated responses (/hack): one tick loop for all of them, frames dropped under REST pressure
+animator = Animator(scheduler=rest)
+
+# Spam tracking, keyed by (guild, user)
+# Per-guild limits format: {guild_id: {"limit": int, "window": float}}
+spam_windows = RateWindows(SPAM_MESSAGE_LIMIT, SPAM_TIME_WINDOW, config_store.bind("spam_limits", {}))
+# Same text from many authors/channels in a short window (raids that stay under the per-author limit)
+duplicate_detector = DuplicateDetector()
+# Banned words, blocked domains and patterns, compiled per guild
+# Format: {guild_id: {"words": [...], "domains": [...], "regexes": [...]}}
+word_filters = word_filter.WordFilters(config_store.bind("word_filters", {}))
+# Mute role per guild, with background overwrite provisioning
+# Format: {guild_id: {"role_id": role_id, "complete": bool}}
+mute_provisioner = MuteProvisioner(
+    SPAM_MUTE_ROLE_NAME,
+    config_store.bind("mute_roles", {}),
+    on_change=lambda guild_id: config_store.mark_dirty("mute_roles", guild_id),
+    scheduler=rest
+)
+# Anti-spam mutes: native timeouts (or the Muted role, per guild), longer for repeat offenders;
+# role mutes are lifted by the bot when they expire
+# Format: {guild_id: {user_id (str): {"strikes": int, "last": epoch, "until": epoch, "mode": "timeout"|"role"}}}
+# Mode format: {guild_id: {"mode": "timeout"|"role"}}
+mute_manager = mutes.MuteManager(
+    mute_provisioner,
+    config_store.bind("mutes", {}),
+    config_store.bind("mute_settings", {}),
+    resolve_guild=bot.get_guild,
+    resolve_member=member_resolver.resolve,
+    on_change=lambda guild_id: config_store.mark_dirty("mutes", guild_id),
+    scheduler=rest
+)
+# /purge: streamed history scans, bulk deletes for messages under 14 days old
+purger = Purger(scheduler=rest)
+
+# Raid tracking, per guild
+# Per-guild overrides format: {guild_id: {"enabled": bool, "limit": int, "window": float, "cooldown": float, ...}}
+raid_detector = raid.RaidDetector(RAID_JOIN_LIMIT, RAID_TIME_WINDOW, config_store.bind("raid_settings", {}))
+
+# on_message filters, compiled per guild (filters register next to on_message)
+# Format: {guild_id: {"enabled": [names], "disabled": [names], "exempt_channels": [ids], "exempt_roles": [ids]}}
+message_pipeline = MessagePipeline(config_store.bind("message_filters", {}))
+
+# Shared connection pool + per-webhook rate-limit buckets for /webhooksend
+webhook_client = WebhookClient()
+
+# /getpfp attachment mode: avatars fetched once and kept in a size-bounded
+# on-disk LRU. Cluster workers each get their own directory.
+AVATAR_CACHE_DIR = os.getenv('SKYBOT_AVATAR_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.avatar-cache')
+if shard_plan.cluster_dir:
+    AVATAR_CACHE_DIR = os.path.join(AVATAR_CACHE_DIR, f"cluster-{shard_plan.cluster_id}")
+avatar_cache = AvatarCache(AVATAR_CACHE_DIR, max_bytes=int(os.getenv('SKYBOT_AVATAR_CACHE_MB', '64')) * 1024 * 1024)
+
+def resolve_log_channel(guild):
+    channel_id = log_channels.get(guild.id)
+    if channel_id:
+        return guild.get_channel(channel_id)
+    return discord.utils.get(guild.text_channels, name=MODLOG_CHANNEL_NAME)
+
+# Modlog entries are queued per guild and sent in batches; set
+# SKYBOT_MODLOG_EMBEDS=1 to post them as embeds instead of text lines
+modlog = ModLog(resolve_log_channel, embeds=os.getenv('SKYBOT_MODLOG_EMBEDS', '').lower() in ('1', 'true', 'yes'), scheduler=rest)
+
+def log_event(guild, message):
+    # Never blocks: the entry is delivered by the modlog flusher
+    modlog.log(guild, message)
+
+def welcome_payload(guild, members):
+    if len(members) == 1:
+        member = members[0]
+        embed = discord.Embed(
+            title="👋 Welcome!",
+            description=f"Welcome {member.mention} to {guild.name}!",
+            color=discord.Color.green()
+        )
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.set_footer(text=f"Member #{guild.member_count}")
+        return {"embed": embed}
+    shown = members[:10]
+    names = ", ".join(m.mention for m in shown)
+    if len(members) > len(shown):
+        names += f" and {len(members) - len(shown)} others"
+    else:
+        names = ", ".join(m.mention for m in shown[:-1]) + f" and {shown[-1].mention}"
+    embed = discord.Embed(
+        title="👋 Welcome!",
+        description=f"Welcome {names} to {guild.name}!",
+        color=discord.Color.green()
+    )
+    embed.set_footer(text=f"{len(members)} new members • Member #{guild.member_count}")
+    return {"embed": embed, "allowed_mentions": discord.AllowedMentions.none()}
+
+def autorole_failed(member, role, error):
+    member_log.warning("Autorole %s not given to %s in guild %s: %s", role.id, member, member.guild.id, error)
+    log_event(member.guild, f"⚠️ Couldn't give autorole {role.mention} to {member.mention}: {error}")
+
+# Welcomes and autoroles, queued per guild and drained by a shared worker pool
+join_processor = JoinProcessor(welcome_payload, on_failure=autorole_failed, scheduler=rest)
+
+async def raid_expiry_loop():
+    # Ends raid mode for guilds whose cool-down passed without new joins
+    while True:
+        await asyncio.sleep(15)
+        for guild_id, joins, duration in raid_detector.expire():
+            raid_log.info("Raid mode ended in guild %s (%s joins)", guild_id, joins)
+            guild = bot.get_guild(guild_id)
+            if guild and raid_detector.get(guild_id, "alert"):
+                log_event(guild, f"🛡️ Raid mode ended after {int(duration)}s ({joins} joins during raid).")
+
+async def cluster_status_loop():
+    # Per-shard readiness/latency for the cluster supervisor
+    while True:
+        try:
+            shard_plan.write_status(bot, ready_shards)
+        except Exception as e:
+            shard_log.warning("Failed to write cluster status: %s", e)
+        await asyncio.sleep(STATUS_INTERVAL)
+
+@bot.event
+async def on_shard_ready(shard_id):
+    ready_shards.add(shard_id)
+    shard_log.info("Shard %s ready (%s/%s in this process)", shard_id, len(ready_shards), len(bot.shards))
 
-async def log_event(guild, message):
-    guild_id = guild.id
-    channel_id = log_channels.get(guild_id)
-    channel = guild.get_channel(channel_id) if channel_id else None
-    if channel:
-        await channel.send(f"[LOG] {message}")
+@bot.event
+async def on_shard_disconnect(shard_id):
+    ready_shards.discard(shard_id)
+    shard_log.info("Shard %s disconnected", shard_id)
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    ready_shards.add(shard_id)
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    print(f'Bot ID: {bot.user.id}')
-    print('------')
+    log.info("%s has connected to Discord!", bot.user)
+    log.info("Bot ID: %s", bot.user.id)
+    log.info("------")
     # Set presence to Online with a friendly activity
     try:
         activity = discord.Activity(type=discord.ActivityType.watching, name="for /raiz • /diag | Support: discord.gg/DZEkJ29dZ3")
         await bot.change_presence(status=discord.Status.online, activity=activity)
     except Exception as e:
-        print(f'Failed to set presence: {e}')
-    # Sync slash commands
-    try:
-        synced = await bot.tree.sync()
-        print(f'Synced {len(synced)} command(s)')
-    except Exception as e:
-        print(f'Failed to sync commands: {e}')
+        log.warning("Failed to set presence: %s", e)
+    # Finish mute-role overwrite jobs interrupted by a restart
+    mute_provisioner.resume(bot.guilds)
+    # Re-arm mute expiries; role mutes that ran out while offline are lifted now
+    mute_manager.resume(list(mute_manager.state))
 
-# Slash command: RAIZ
-@bot.tree.command(name="raiz", description="Spam your message like a broken record 🔁")
-@app_commands.describe(
-    message="Your message (choose wisely)",
-    times="How many times? (1-10, don't go crazy)",
-    public="Make everyone see it (or keep it secret)"
-)
-async def raiz(interaction: discord.Interaction, message: str, times: int, public: bool=True):
-    # Validate the times parameter (respond quickly for invalid input)
-    if times < 1 or times > 10:
-        try:
-            await interaction.response.send_message("❌ Please choose a number between 1 and 10!", ephemeral=True)
-        except Exception as e:
-            print(f"[raiz] Failed to send validation error: {e}")
-        return
 
+async def send_repeats(interaction: discord.Interaction, name: str, text: str, times: int, public: bool, noun: str, preview_max: int):
+    # Shared by /raiz and /raizv2: repeats are packed into the fewest follow-ups
     if not public:
         # Private (no extra perms required): single ephemeral block
-        repeated = ("\n").join([message] * times)
-        if len(repeated) > 1900:
-            repeated = repeated[:1900] + "…"
+        repeated, shown = repeat_packer.preview(text, times)
         try:
             await interaction.response.send_message(repeated, ephemeral=True)
-            print(f"[raiz] Ephemeral only; sent preview for {times}")
+            cmd_log.info("[%s] Ephemeral only; sent preview with %s/%s", name, shown, times)
         except Exception as e:
-            print(f"[raiz] Failed to send ephemeral: {e}")
+            cmd_log.warning("[%s] Failed to send ephemeral: %s", name, e)
         return
 
     # Public flow (optional). Uses interaction follow-ups so only
@@ -103,44 +366,32 @@ async def raiz(interaction: discord.Interaction, message: str, times: int, publi
     try:
         await interaction.response.defer(ephemeral=True, thinking=True)
     except Exception as e:
-        print(f"[raiz] Failed to defer interaction: {e}")
+        cmd_log.warning("[%s] Failed to defer interaction: %s", name, e)
         return
 
+    packing = repeat_packer.pack_repeats(text, times)
     sent = 0
     chunks = 0
-    max_chunks = 5  # Discord limits follow-ups per interaction
     allowed_mentions = discord.AllowedMentions.none()
     send_failed = None
-    try:
-        while sent < times and chunks < max_chunks:
-            remaining = times - sent
-            slots_left = max_chunks - chunks
-            per_chunk = (remaining + slots_left - 1) // slots_left
-            block = ("\n").join([message] * per_chunk)
-            if len(block) > 1900:
-                # Trim to avoid 2000 char limit
-                max_lines = max(1, 1900 // max(1, len(message) + 1))
-                block = ("\n").join([message] * max_lines)
-            try:
-                await interaction.followup.send(block, wait=True, allowed_mentions=allowed_mentions)
-                sent += block.count("\n") + 1
-                chunks += 1
-            except Exception as e:
-                send_failed = e
-                break
-    except Exception as e:
-        send_failed = e
+    for payload, count in zip(packing.payloads, packing.counts):
+        try:
+            await interaction.followup.send(payload, wait=True, allowed_mentions=allowed_mentions)
+        except Exception as e:
+            send_failed = e
+            break
+        sent += count
+        chunks += 1
 
-    print(f"[raiz] Requested {times}, actually sent {min(sent, times)} in {chunks} chunk(s)")
+    cmd_log.info("[%s] Requested %s, actually sent %s in %s chunk(s)", name, times, sent, chunks)
     try:
         if sent >= times:
-            await interaction.edit_original_response(content=f"✅ Sent {times}/{times} message(s) to the channel.")
+            await interaction.edit_original_response(content=f"✅ Sent {times}/{times} {noun} to the channel.")
         elif sent > 0:
-            await interaction.edit_original_response(content=f"⚠️ Sent {sent}/{times}. Hit follow-up limit; try fewer repeats.")
+            why = "Hit follow-up limit; try fewer repeats or a shorter message." if send_failed is None else "Sending failed partway."
+            await interaction.edit_original_response(content=f"⚠️ Sent {sent}/{times}. {why}")
         else:
-            preview = ("\n").join([message] * min(times, 10))
-            if len(preview) > 1900:
-                preview = preview[:1900] + "…"
+            preview, _ = repeat_packer.preview(text, min(times, preview_max), limit=1700)
             reason = "I couldn't post publicly here."
             if isinstance(send_failed, discord.Forbidden):
                 reason = "I'm missing permission to post app messages here."
@@ -151,7 +402,24 @@ async def raiz(interaction: discord.Interaction, message: str, times: int, publi
                 "Ask a mod to enable 'Use External Apps' for this channel, or grant the bot 'Send Messages'.\n\n" + preview
             ))
     except Exception as e:
-        print(f"[raiz] Failed to edit original response: {e}")
+        cmd_log.warning("[%s] Failed to edit original response: %s", name, e)
+
+# Slash command: RAIZ
+@bot.tree.command(name="raiz", description="Spam your message like a broken record 🔁")
+@app_commands.describe(
+    message="Your message (choose wisely)",
+    times="How many times? (1-10, don't go crazy)",
+    public="Make everyone see it (or keep it secret)"
+)
+async def raiz(interaction: discord.Interaction, message: str, times: int, public: bool=True):
+    # Validate the times parameter (respond quickly for invalid input)
+    if times < 1 or times > 10:
+        try:
+            await interaction.response.send_message("❌ Please choose a number between 1 and 10!", ephemeral=True)
+        except Exception as e:
+            cmd_log.warning("[raiz] Failed to send validation error: %s", e)
+        return
+    await send_repeats(interaction, "raiz", message, times, public, "message(s)", preview_max=10)
 
 # Slash command: RAIZ V2 (big text with spacing)
 @bot.tree.command(name="raizv2", description="Spam but BIGGER and LOUDER 📢")
@@ -166,151 +434,45 @@ async def raizv2(interaction: discord.Interaction, message: str, times: int, pub
         try:
             await interaction.response.send_message("❌ Please choose a number between 1 and 10!", ephemeral=True)
         except Exception as e:
-            print(f"[raizv2] Failed to send validation error: {e}")
+            cmd_log.warning("[raizv2] Failed to send validation error: %s", e)
         return
+    # Big heading text; every line gets its own "# "
+    await send_repeats(interaction, "raizv2", text_styles.STYLES["big"].transform(message), times, public, "big message(s)", preview_max=5)
 
-    # Format message with # for big text - single line breaks
-    formatted_msg = f"# {message}"
-    
-    if not public:
-        # Private preview
-        repeated = ("\n").join([formatted_msg] * times)
-        if len(repeated) > 1900:
-            repeated = repeated[:1900] + "…"
-        try:
-            await interaction.response.send_message(repeated, ephemeral=True)
-            print(f"[raizv2] Ephemeral only; sent preview for {times}")
-        except Exception as e:
-            print(f"[raizv2] Failed to send ephemeral: {e}")
-        return
-
-    # Public flow
-    try:
-        await interaction.response.defer(ephemeral=True, thinking=True)
-    except Exception as e:
-        print(f"[raizv2] Failed to defer interaction: {e}")
-        return
+# Meter commands (/femboymeter, /gaymeter, /skidmeter, /uwumeter, /touch, /ship),
+# declared in meters.py. Daily mode: one stable score per user per day.
+METERS_DAILY = os.getenv('SKYBOT_METERS_DAILY', '').lower() in ('1', 'true', 'yes')
+METER_MENTIONS = discord.AllowedMentions(users=True, roles=False, everyone=False)
 
-    sent = 0
-    chunks = 0
-    max_chunks = 5
-    allowed_mentions = discord.AllowedMentions.none()
-    send_failed = None
-    
-    try:
-        while sent < times and chunks < max_chunks:
-            remaining = times - sent
-            slots_left = max_chunks - chunks
-            per_chunk = (remaining + slots_left - 1) // slots_left
-            block = ("\n").join([formatted_msg] * per_chunk)
-            if len(block) > 1900:
-                # Trim to avoid 2000 char limit
-                max_lines = max(1, 1900 // max(1, len(formatted_msg) + 1))
-                block = ("\n").join([formatted_msg] * max_lines)
-            try:
-                await interaction.followup.send(block, wait=True, allowed_mentions=allowed_mentions)
-                sent += block.count("\n") + 1
-                chunks += 1
-            except Exception as e:
-                send_failed = e
-                break
-    except Exception as e:
-        send_failed = e
-
-    print(f"[raizv2] Requested {times}, actually sent {min(sent, times)} in {chunks} chunk(s)")
-    try:
-        if sent >= times:
-            await interaction.edit_original_response(content=f"✅ Sent {times}/{times} big message(s) to the channel.")
-        elif sent > 0:
-            await interaction.edit_original_response(content=f"⚠️ Sent {sent}/{times}. Hit follow-up limit; try fewer repeats.")
-        else:
-            preview = ("\n").join([formatted_msg] * min(times, 5))
-            if len(preview) > 1900:
-                preview = preview[:1900] + "…"
-            reason = "I couldn't post publicly here."
-            if isinstance(send_failed, discord.Forbidden):
-                reason = "I'm missing permission to post app messages here."
-            elif isinstance(send_failed, discord.HTTPException) and getattr(send_failed, 'status', None) == 403:
-                reason = "Public app messages are blocked in this channel."
-            await interaction.edit_original_response(content=(
-                f"❌ {reason}\n"
-                "Ask a mod to enable 'Use External Apps' for this channel, or grant the bot 'Send Messages'.\n\n" + preview
-            ))
-    except Exception as e:
-        print(f"[raizv2] Failed to edit original response: {e}")
-
-# Slash command: Femboy Meter
-@bot.tree.command(name="femboymeter", description="Scientifically calculate someone's femboy levels 🎀")
-@app_commands.describe(user="The victim... I mean subject")
-async def femboymeter(interaction: discord.Interaction, user: discord.Member):
+async def send_meter(interaction: discord.Interaction, meter: meters.Meter, *users):
     # Support DMs: default to invoker if not in guild
-    target = user if user is not None else interaction.user
-    percentage = random.randint(1, 100)
-    if percentage > 50:
-        result_msg = f"🎀 {target.mention} is **{percentage}%** femboy! They are a femboy! 💖"
-    else:
-        result_msg = f"🎀 {target.mention} is **{percentage}%** femboy!"
+    if None in users:
+        users = tuple(u if u is not None else interaction.user for u in users)
+    score = meters.score(meter, tuple([u.id for u in users]), daily=METERS_DAILY)
+    result_msg = meter.render(score, *users)
     try:
-        await interaction.response.send_message(
-            result_msg,
-            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
-        )
-        print(f"[femboymeter] Sent result for {getattr(target, 'display_name', getattr(target, 'name', str(target)))}: {percentage}%")
+        await interaction.response.send_message(result_msg, allowed_mentions=METER_MENTIONS)
+        cmd_log.info("[%s] %s: %s%%", meter.name, ", ".join([getattr(u, 'display_name', str(u)) for u in users]), score)
     except Exception as e:
-        print(f"[femboymeter] Failed to send: {e}")
+        cmd_log.warning("[%s] Failed to send: %s", meter.name, e)
         try:
-            await interaction.response.send_message(
-                f"❌ Couldn't post the result. Preview: {result_msg}",
-                ephemeral=True
-            )
+            await interaction.response.send_message(f"❌ Couldn't post the result. Preview: {result_msg}", ephemeral=True)
         except Exception:
             pass
 
-# Slash command: Gay Meter (playful)
-@bot.tree.command(name="gaymeter", description="Measure the rainbow levels 🌈 (totally legit science)")
-@app_commands.describe(user="Your totally straight friend")
-async def gaymeter(interaction: discord.Interaction, user: discord.Member):
-    target = user if user is not None else interaction.user
-    percentage = random.randint(1, 100)
-    result_msg = f"🌈 {target.mention} is {percentage}% on the gay‑o‑meter — just for fun!"
-    try:
-        await interaction.response.send_message(
-            result_msg,
-            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
-        )
-        print(f"[gaymeter] Sent result for {getattr(target, 'display_name', getattr(target, 'name', str(target)))}: {percentage}%")
-    except Exception as e:
-        print(f"[gaymeter] Failed to send: {e}")
-        try:
-            await interaction.response.send_message(
-                f"❌ Couldn't post the result. Preview: {result_msg}",
-                ephemeral=True
-            )
-        except Exception:
-            pass
+def register_meter(meter: meters.Meter):
+    # Parameter names must match meter.params ("user", or "user1"/"user2")
+    if len(meter.params) == 1:
+        async def callback(interaction: discord.Interaction, user: discord.Member):
+            await send_meter(interaction, meter, user)
+    else:
+        async def callback(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member):
+            await send_meter(interaction, meter, user1, user2)
+    command = app_commands.Command(name=meter.name, description=meter.description, callback=callback)
+    bot.tree.add_command(app_commands.describe(**meter.params)(command))
 
-# Slash command: Skid Meter
-@bot.tree.command(name="skidmeter", description="Rate how much of a 💩 someone is (brutally honest)")
-@app_commands.describe(user="The lucky participant")
-async def skidmeter(interaction: discord.Interaction, user: discord.Member):
-    target = user if user is not None else interaction.user
-    percentage = random.randint(1, 100)
-    result_msg = f"💩 {target.mention} is **{percentage}%** a skid not sigma!"
-    try:
-        await interaction.response.send_message(
-            result_msg,
-            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
-        )
-        print(f"[skidmeter] Sent result for {getattr(target, 'display_name', getattr(target, 'name', str(target)))}: {percentage}%")
-    except Exception as e:
-        print(f"[skidmeter] Failed to send: {e}")
-        try:
-            await interaction.response.send_message(
-                f"❌ Couldn't post the result. Preview: {result_msg}",
-                ephemeral=True
-            )
-        except Exception:
-            pass
+for meter in meters.METERS:
+    register_meter(meter)
 
 # Slash command: Coin Flip
 @bot.tree.command(name="coinflip", description="Let fate decide (because you can't) 🪙")
@@ -322,9 +484,9 @@ async def coinflip(interaction: discord.Interaction):
     # Direct public response
     try:
         await interaction.response.send_message(result_msg)
-        print(f"[coinflip] Flipped: {result} for {interaction.user.name}")
+        cmd_log.info("[coinflip] Flipped: %s for %s", result, interaction.user.name)
     except Exception as e:
-        print(f"[coinflip] Failed to send: {e}")
+        cmd_log.warning("[coinflip] Failed to send: %s", e)
         try:
             await interaction.response.send_message(
                 f"❌ Couldn't flip the coin. Result was: {result}",
@@ -337,7 +499,6 @@ async def coinflip(interaction: discord.Interaction):
 @bot.tree.command(name="hack", description="Hack someone (not really, it's fake lol) 💻")
 @app_commands.describe(user="The victim to 'hack'")
 async def hack(interaction: discord.Interaction, user: discord.Member):
-    import asyncio
     target = user if user is not None else interaction.user
     try:
         await interaction.response.send_message(f"🔓 Initiating hack on {target.mention}...")
@@ -352,103 +513,45 @@ async def hack(interaction: discord.Interaction, user: discord.Member):
         "💾 Downloading data... 100%",
         f"✅ Successfully hacked {target.mention}!\n\n**Stolen Data:**\n🔑 Password: `ilovemom123`\n📧 Email: `{getattr(target, 'name', str(target))}@totallyrealmail.com`\n💳 Credit Card: `6767 6767 6767 6767`\n📍 IP Address: `127.0.0.1`\n⚠️ Browser History: *[REDACTED - too embarrassing]*\n\n*Joke command — not real!*"
     ]
+    async def edit(content):
+        await interaction.edit_original_response(content=content)
     try:
-        for stage in stages:
-            await asyncio.sleep(1.5)
-            await interaction.edit_original_response(content=stage)
-        print(f"[hack] 'Hacked' {getattr(target, 'display_name', getattr(target, 'name', str(target)))}")
+        shown = await animator.play(interaction.id, edit, stages, interval=1.5)
+        cmd_log.info("[hack] 'Hacked' %s (%s/%s frames)", getattr(target, 'display_name', getattr(target, 'name', str(target))), shown, len(stages))
     except Exception as e:
-        print(f"[hack] Failed: {e}")
+        cmd_log.warning("[hack] Failed: %s", e)
         try:
             await interaction.followup.send(f"❌ Hack failed. {target.mention} has antivirus!", ephemeral=True)
         except Exception:
             pass
 
 # Slash command: Emojify
+# Styles live in text_styles.py; long results are split across follow-ups
+# on grapheme boundaries instead of being cut mid-emoji.
 @bot.tree.command(name="emojify", description="Turn text into PURE EMOJI ENERGY ✨")
-@app_commands.describe(text="The text to emojify")
-async def emojify(interaction: discord.Interaction, text: str):
-    emoji_map = {
-        'a': '🅰️', 'b': '🅱️', 'c': '🅲', 'd': '🅳', 'e': '🅴',
-        'f': '🅵', 'g': '🅶', 'h': '🅷', 'i': '🅸', 'j': '🅹',
-        'k': '🅺', 'l': '🅻', 'm': '🅼', 'n': '🅽', 'o': '🅾️',
-        'p': '🅿️', 'q': '🆀', 'r': '🆁', 's': '🆂', 't': '🆃',
-        'u': '🆄', 'v': '🆅', 'w': '🆆', 'x': '🆇', 'y': '🆈', 'z': '🆉',
-        '0': '0️⃣', '1': '1️⃣', '2': '2️⃣', '3': '3️⃣', '4': '4️⃣',
-        '5': '5️⃣', '6': '6️⃣', '7': '7️⃣', '8': '8️⃣', '9': '9️⃣',
-        '!': '❗', '?': '❓', ' ': '  '
-    }
-    
-    result = ''.join(emoji_map.get(char.lower(), char) for char in text)
-    
-    if len(result) > 2000:
-        result = result[:1997] + "..."
-    
+@app_commands.describe(text="The text to emojify", style="How to style it (default: emoji letters)")
+@app_commands.choices(style=[
+    app_commands.Choice(name=f"{s.name} ({s.description})"[:100], value=s.name) for s in text_styles.STYLES.values()
+])
+async def emojify(interaction: discord.Interaction, text: str, style: str = "emoji"):
+    text_style = text_styles.STYLES.get(style, text_styles.STYLES["emoji"])
+    chunks = text_style.render(text) or [text_styles.ZWSP]
+    # The reply plus MAX_FOLLOWUPS follow-ups; when cut off, the notice takes the last one
+    shown = chunks if len(chunks) <= 1 + repeat_packer.MAX_FOLLOWUPS else chunks[:repeat_packer.MAX_FOLLOWUPS]
     try:
-        await interaction.response.send_message(result)
-        print(f"[emojify] Emojified text for {interaction.user.name}")
+        await interaction.response.send_message(shown[0], allowed_mentions=discord.AllowedMentions.none())
+        for chunk in shown[1:]:
+            await interaction.followup.send(chunk, allowed_mentions=discord.AllowedMentions.none())
+        if len(chunks) > len(shown):
+            await interaction.followup.send(f"✂️ Cut off after {len(shown)} messages.", ephemeral=True)
+        cmd_log.info("[emojify] Emojified text for %s (%s, %s message(s))", interaction.user.name, text_style.name, len(shown))
     except Exception as e:
-        print(f"[emojify] Failed: {e}")
+        cmd_log.warning("[emojify] Failed: %s", e)
         try:
-            await interaction.response.send_message("❌ Text too long or failed to emojify!", ephemeral=True)
-        except Exception:
-            pass
-
-# Slash command: UwU Meter
-@bot.tree.command(name="uwumeter", description="Check someone's UwU levels (OwO what's this?) 👉👈")
-@app_commands.describe(user="The person to check")
-async def uwumeter(interaction: discord.Interaction, user: discord.Member):
-    import random
-    target = user if user is not None else interaction.user
-    percentage = random.randint(1, 100)
-    if percentage < 30:
-        vibe = "Barely any UwU energy... kinda sus ngl 😐"
-    elif percentage < 60:
-        vibe = "Moderate UwU vibes detected owo"
-    elif percentage < 90:
-        vibe = "HIGH UwU LEVELS!! They're dangerously cute!! >w<"
-    else:
-        vibe = "🚨 MAXIMUM UwU OVERLOAD!! *notices your bulge* OwO 🚨"
-    result_msg = f"💕 {target.mention} is **{percentage}%** UwU!\n{vibe}"
-    try:
-        await interaction.response.send_message(
-            result_msg,
-            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
-        )
-        print(f"[uwumeter] {getattr(target, 'display_name', getattr(target, 'name', str(target)))}: {percentage}%")
-    except Exception as e:
-        print(f"[uwumeter] Failed: {e}")
-        try:
-            await interaction.response.send_message(f"❌ Failed! Preview: {result_msg}", ephemeral=True)
-        except Exception:
-            pass
-
-# Slash command: Touch Grass
-@bot.tree.command(name="touch", description="Check if someone needs to touch grass 🌱")
-@app_commands.describe(user="The terminally online suspect")
-async def touch(interaction: discord.Interaction, user: discord.Member):
-    import random
-    target = user if user is not None else interaction.user
-    percentage = random.randint(1, 100)
-    if percentage < 20:
-        verdict = f"{target.mention} is SEVERELY grass-deficient!! 🚨\n**Prescription:** Go outside IMMEDIATELY!"
-    elif percentage < 50:
-        verdict = f"{target.mention} needs to touch grass soon... ⚠️\nIt's been a while, hasn't it?"
-    elif percentage < 80:
-        verdict = f"{target.mention} touches grass occasionally. Acceptable. ✅"
-    else:
-        verdict = f"{target.mention} is a certified grass-toucher!! 🌿\nTeach us your ways, master!"
-    result_msg = f"🌱 **Touch Grass Meter: {percentage}%**\n{verdict}"
-    try:
-        await interaction.response.send_message(
-            result_msg,
-            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
-        )
-        print(f"[touch] {getattr(target, 'display_name', getattr(target, 'name', str(target)))}: {percentage}%")
-    except Exception as e:
-        print(f"[touch] Failed: {e}")
-        try:
-            await interaction.response.send_message(f"❌ Failed! Preview: {result_msg}", ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("❌ Text too long or failed to emojify!", ephemeral=True)
+            else:
+                await interaction.response.send_message("❌ Text too long or failed to emojify!", ephemeral=True)
         except Exception:
             pass
 
@@ -456,12 +559,14 @@ async def touch(interaction: discord.Interaction, user: discord.Member):
 @bot.tree.command(name="getpfp", description="Get anyone's profile picture with size options 🖼️")
 @app_commands.describe(
     user="Whose pfp? (optional, defaults to you)",
-    size="Image size (128/256/512/1024/2048)"
+    size="Image size (128/256/512/1024/2048)",
+    attach="Upload the image itself instead of linking Discord's CDN"
 )
 async def getpfp(
     interaction: discord.Interaction,
     user: discord.User | None = None,
     size: int = 1024,
+    attach: bool = False,
 ):
     try:
         target = user or interaction.user
@@ -499,12 +604,30 @@ async def getpfp(
         # Fallback original
         view.add_item(discord.ui.Button(label="Open Original", url=original_url))
 
-        await interaction.response.send_message(embed=embed, view=view, allowed_mentions=discord.AllowedMentions.none())
-        print(f"[getpfp] Sent pfp for {getattr(target, 'display_name', getattr(target, 'name', 'User'))} at {size}px")
+        extra = {}
+        if attach:
+            fmt = "gif" if avatar_asset.is_animated() else "png"
+            if not avatar_cache.cached(avatar_asset.key, size, fmt):
+                await interaction.response.defer(thinking=True)
+            try:
+                path = await avatar_cache.get(avatar_asset.key, size, fmt, avatar_asset.with_format(fmt).with_size(size).url)
+                # Opened right away: a later cache insert may evict the file
+                extra["file"] = discord.File(path, filename=f"avatar.{fmt}")
+                embed.set_image(url=f"attachment://avatar.{fmt}")
+            except Exception as e:
+                # Fall back to the CDN link
+                cmd_log.warning("[getpfp] Avatar cache fetch failed, linking instead: %s", e)
+
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed, view=view, allowed_mentions=discord.AllowedMentions.none(), **extra)
+        else:
+            await interaction.response.send_message(embed=embed, view=view, allowed_mentions=discord.AllowedMentions.none(), **extra)
+        cmd_log.info("[getpfp] Sent pfp for %s at %spx%s", getattr(target, 'display_name', getattr(target, 'name', 'User')), size, " (attached)" if extra else "")
     except Exception as e:
-        print(f"[getpfp] Failed: {e}")
+        cmd_log.warning("[getpfp] Failed: %s", e)
         try:
-            await interaction.response.send_message(
+            send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await send(
                 "❌ Couldn't get profile picture. Try again in another channel.",
                 ephemeral=True,
             )
@@ -516,10 +639,10 @@ async def getpfp(
 @app_commands.describe(
     webhook_url="The secret passage (webhook URL)",
     message="Your undercover message",
-    webhook_name="Your fake identity (optional)"
+    webhook_name="Your fake identity (optional)",
+    times="How many times to send it (1-10, paced to the webhook's rate limit)"
 )
-async def webhooksend(interaction: discord.Interaction, webhook_url: str, message: str, webhook_name: str = None):
-    import aiohttp
+async def webhooksend(interaction: discord.Interaction, webhook_url: str, message: str, webhook_name: str = None, times: int = 1):
     from urllib.parse import urlparse
     
     # Defer the response to avoid timeout
@@ -554,27 +677,34 @@ async def webhooksend(interaction: discord.Interaction, webhook_url: str, messag
             pass
         return
     
-    # Send via webhook
+    if times < 1 or times > 10:
+        try:
+            await interaction.edit_original_response(content="❌ Please choose a number between 1 and 10!")
+        except Exception:
+            pass
+        return
+
+    # Send via the shared webhook client (queues behind the webhook's rate limit)
     try:
-        async with aiohttp.ClientSession() as session:
-            payload = {"content": message}
-            if webhook_name:
-                payload["username"] = webhook_name
-            
-            async with session.post(normalized, json=payload) as resp:
-                if resp.status == 204 or resp.status == 200:
-                    await interaction.edit_original_response(content="✅ Message sent via webhook!")
-                    print(f"[webhooksend] Sent message via webhook (name: {webhook_name or 'default'})")
-                else:
-                    error_text = await resp.text()
-                    await interaction.edit_original_response(content=f"❌ Webhook request failed with status {resp.status}.\n```\n{error_text[:500]}\n```")
-                    print(f"[webhooksend] Failed with status {resp.status}: {error_text}")
+        payload = {"content": message}
+        if webhook_name:
+            payload["username"] = webhook_name
+
+        results = await webhook_client.send_many(normalized, [payload] * times)
+        sent = sum(1 for status, _ in results if status in (200, 204))
+        if sent == times:
+            await interaction.edit_original_response(content="✅ Message sent via webhook!" if times == 1 else f"✅ Sent {times}/{times} messages via webhook!")
+            cmd_log.info("[webhooksend] Sent %s message(s) via webhook (name: %s)", times, webhook_name or 'default')
+        else:
+            status, error_text = results[-1]
+            await interaction.edit_original_response(content=f"❌ Webhook request failed with status {status} after {sent}/{times} sent.\n```\n{error_text[:500]}\n```")
+            cmd_log.warning("[webhooksend] Failed with status %s after %s/%s: %s", status, sent, times, error_text)
     except Exception as e:
         try:
             await interaction.edit_original_response(content=f"❌ Failed to send webhook: {str(e)[:200]}")
         except Exception:
             pass
-        print(f"[webhooksend] Exception: {e}")
+        cmd_log.warning("[webhooksend] Exception: %s", e)
 
 # Slash command: Diagnostics (permissions in current channel)
 @bot.tree.command(name="diag", description="Show the bot's permissions in this channel")
@@ -654,19 +784,21 @@ async def diag(interaction: discord.Interaction):
     try:
         await interaction.edit_original_response(content=f"```\n{body}\n```")
     except Exception as e:
-        print(f"[diag] Failed to send diagnostics: {e}")
+        cmd_log.warning("[diag] Failed to send diagnostics: %s", e)
 
 # Slash command: Setup Welcome/Leave (Server Only, Admin)
 @bot.tree.command(name="setupwelcome", description="Configure welcome and leave notifications (Admin only) 👋")
 @app_commands.describe(
     welcome_channel="Channel for welcome messages (optional)",
-    leave_channel="Channel for leave messages (optional)"
+    leave_channel="Channel for leave messages (optional)",
+    batch_after=f"Joins per minute above which welcomes are combined into one message (0 = never, default {WELCOME_BATCH_RATE})"
 )
 @app_commands.checks.has_permissions(manage_guild=True)
 async def setupwelcome(
     interaction: discord.Interaction,
     welcome_channel: discord.TextChannel | None = None,
-    leave_channel: discord.TextChannel | None = None
+    leave_channel: discord.TextChannel | None = None,
+    batch_after: app_commands.Range[int, 0, 1000] | None = None
 ):
     # Only works in guilds (servers)
     if not interaction.guild:
@@ -694,6 +826,10 @@ async def setupwelcome(
         guild_settings[guild_id]["leave_channel"] = leave_channel.id
         changes.append(f"✅ Leave notifications → {leave_channel.mention}")
     
+    if batch_after is not None:
+        guild_settings[guild_id]["welcome_batch_rate"] = batch_after
+        changes.append(f"✅ Welcomes batched above {batch_after} joins/minute" if batch_after else "✅ Welcomes never batched")
+    
     if not changes:
         try:
             await interaction.edit_original_response(
@@ -703,12 +839,13 @@ async def setupwelcome(
             pass
         return
     
+    config_store.mark_dirty("guild_settings", guild_id)
     response = "**Welcome/Leave Setup Updated:**\n" + "\n".join(changes)
     try:
         await interaction.edit_original_response(content=response)
-        print(f"[setupwelcome] Guild {guild_id}: {changes}")
+        cmd_log.info("[setupwelcome] Guild %s: %s", guild_id, changes)
     except Exception as e:
-        print(f"[setupwelcome] Failed: {e}")
+        cmd_log.warning("[setupwelcome] Failed: %s", e)
 
 # Slash command: Disable Welcome/Leave (Server Only, Admin)
 @bot.tree.command(name="disablewelcome", description="Disable welcome/leave notifications (Admin only) 🚫")
@@ -724,9 +861,10 @@ async def disablewelcome(interaction: discord.Interaction):
     guild_id = interaction.guild.id
     if guild_id in guild_settings:
         del guild_settings[guild_id]
+        config_store.mark_dirty("guild_settings", guild_id)
         try:
             await interaction.response.send_message("✅ Welcome and leave notifications disabled.", ephemeral=True)
-            print(f"[disablewelcome] Disabled for guild {guild_id}")
+            cmd_log.info("[disablewelcome] Disabled for guild %s", guild_id)
         except Exception:
             pass
     else:
@@ -738,49 +876,62 @@ async def disablewelcome(interaction: discord.Interaction):
 @bot.event
 async def on_member_join(member):
     guild_id = member.guild.id
-    print(f"[DEBUG] Member joined: {member} (ID: {member.id}) in guild {guild_id}")
+    # Anti-raid: O(1) per join; alerts go out in the background so a
+    # join flood never waits on the modlog channel
+    transition, raid_joins = raid_detector.record_join(guild_id)
+    in_raid = transition == raid.STARTED or transition == raid.ONGOING
+    if transition == raid.STARTED or transition == raid.ENDED:
+        if transition == raid.STARTED:
+            raid_log.info("Raid mode started in guild %s", guild_id)
+            alert = f"🚨 Raid mode ON: more than {raid_detector.get(guild_id, 'limit')} joins in {raid_detector.get(guild_id, 'window'):g}s."
+        else:
+            raid_log.info("Raid mode ended in guild %s (%s joins)", guild_id, raid_joins)
+            alert = f"🛡️ Raid mode ended ({raid_joins} joins during raid)."
+        if raid_detector.get(guild_id, "alert"):
+            log_event(member.guild, alert)
+    skip_welcome = in_raid and raid_detector.get(guild_id, "skip_welcome")
+    pause_autorole = in_raid and raid_detector.get(guild_id, "pause_autorole")
+    if skip_welcome and pause_autorole:
+        return
+
+    member_log.debug("Member joined: %s (ID: %s) in guild %s", member, member.id, guild_id)
     settings = guild_settings.get(guild_id, {})
-    welcome_ch_id = settings.get("welcome_channel")
+    welcome_ch_id = None if skip_welcome else settings.get("welcome_channel")
+    channel = None
     if welcome_ch_id:
         channel = member.guild.get_channel(welcome_ch_id)
-        print(f"[DEBUG] Welcome channel: {channel}")
-        if channel and channel.permissions_for(member.guild.me).send_messages:
-            try:
-                embed = discord.Embed(
-                    title="👋 Welcome!",
-                    description=f"Welcome {member.mention} to {member.guild.name}!",
-                    color=discord.Color.green()
-                )
-                embed.set_thumbnail(url=member.display_avatar.url)
-                embed.set_footer(text=f"Member #{len(member.guild.members)}")
-                await channel.send(embed=embed)
-                print(f"[on_member_join] Sent welcome for {member} in guild {guild_id}")
-            except Exception as e:
-                print(f"[on_member_join] Failed to send welcome: {e}")
-        else:
-            print(f"[on_member_join] Bot missing send_messages permission in welcome channel {welcome_ch_id}")
-    else:
-        print(f"[on_member_join] No welcome channel configured for guild {guild_id}")
+        member_log.debug("Welcome channel: %s", channel)
+        if not (channel and channel.permissions_for(member.guild.me).send_messages):
+            member_log.warning("Bot missing send_messages permission in welcome channel %s", welcome_ch_id)
+            channel = None
+    elif not skip_welcome:
+        member_log.debug("No welcome channel configured for guild %s", guild_id)
     # Autorole assignment
-    autorole_conf = autorole_settings.get(guild_id, {})
-    role_id = autorole_conf.get("autorole")
-    print(f"[DEBUG] Autorole config: {autorole_conf}")
+    role = None
+    role_id = None if pause_autorole else autorole_settings.get(guild_id, {}).get("autorole")
     if role_id:
         role = member.guild.get_role(role_id)
-        print(f"[DEBUG] Autorole: {role}")
-        if role:
-            try:
-                await member.add_roles(role, reason="Autorole on join")
-                print(f"[on_member_join] Assigned autorole {role.name} to {member}")
-            except Exception as e:
-                print(f"[on_member_join] Failed to assign autorole: {e}")
-        else:
-            print(f"[on_member_join] Autorole ID {role_id} not found in guild {guild_id}")
+        member_log.debug("Autorole: %s", role)
+        if not role:
+            member_log.warning("Autorole ID %s not found in guild %s", role_id, guild_id)
+    # Sent/applied in the background; welcomes are batched during join bursts
+    join_processor.submit(member, channel, role, batch_rate=settings.get("welcome_batch_rate", WELCOME_BATCH_RATE))
+
+@bot.event
+async def on_guild_channel_create(channel):
+    # New channels need the mute overwrite too
+    role = mute_provisioner.cached_role(channel.guild)
+    if role and mute_provisioner.needs_overwrite(channel, role):
+        try:
+            await mute_provisioner.apply(channel, role)
+        except Exception as e:
+            spam_log.warning("Failed to add mute overwrite in new channel %s: %s", channel.id, e)
 
 @bot.event
 async def on_member_remove(member):
-    # Send leave notification if configured
     guild_id = member.guild.id
+    member_resolver.forget(guild_id, member.id)
+    # Send leave notification if configured
     settings = guild_settings.get(guild_id, {})
     leave_ch_id = settings.get("leave_channel")
     
@@ -794,62 +945,124 @@ async def on_member_remove(member):
                     color=discord.Color.red()
                 )
                 embed.set_thumbnail(url=member.display_avatar.url)
-                await channel.send(embed=embed)
-                print(f"[on_member_remove] Sent leave for {member} in guild {guild_id}")
+                await rest.submit(NOTIFICATION, f"messages:{channel.id}", channel.send, embed=embed)
+                member_log.info("Sent leave for %s in guild %s", member, guild_id)
             except Exception as e:
-                print(f"[on_member_remove] Failed to send leave: {e}")
+                member_log.warning("Failed to send leave: %s", e)
+
+# Runs first and never stops the chain: the deleted message still counts
+# toward anti-spam and duplicate detection
+async def words_filter(message):
+    match = word_filters.scan(message.guild.id, message.content)
+    if match is None:
+        return False
+    spam_log.info("Removed message from %s in guild %s (%s: %s)", message.author, message.guild.id, match.kind, match.term)
+    try:
+        await rest.submit(MODERATION, f"messages:{message.channel.id}", message.delete, reason=f"Blocked {match.kind}")
+    except discord.NotFound:
+        return False
+    except discord.HTTPException as e:
+        spam_log.warning("Failed to remove filtered message in guild %s: %s", message.guild.id, e)
+        return False
+    log_event(message.guild, f"Removed a message from {message.author} in {message.channel.mention} (blocked {match.kind}: `{match.term}`)")
+    return False
+
+# Only in the pipeline of guilds that have a list
+message_pipeline.register("words", words_filter, active=lambda guild_id: guild_id in word_filters.settings)
+
+async def antispam_filter(message):
+    if not spam_windows.hit(message.guild.id, message.author.id):
+        return False
+    # Timeout (or mute role), escalating for repeat offenders
+    mute = await mute_manager.mute(message.author, reason="Spamming")
+    if mute is None:
+        # Already muted; this message was in flight
+        return True
+    duration = mutes.format_duration(mute.duration)
+    spam_log.info("Muted %s in guild %s for spamming (%s, %s, strike %s)", message.author, message.guild.id, mute.mode, duration, mute.strikes)
+    log_event(message.guild, f"User {message.author} muted for {duration} ({mute.mode}, strike {mute.strikes}) for spamming in {message.channel.mention}")
+    await rest.submit(NOTIFICATION, f"messages:{message.channel.id}", message.channel.send, f"{message.author.mention} has been muted for {duration} for spamming.")
+    return True
+
+message_pipeline.register("antispam", antispam_filter)
+
+async def duplicates_filter(message):
+    flag = duplicate_detector.check(message)
+    if flag is None:
+        return False
+    guild = message.guild
+    # Remove the copies (one bulk delete per channel) and mute every author at once
+    deletes = []
+    for channel_id, message_ids in flag.messages.items():
+        channel = guild.get_channel(channel_id) or guild.get_thread(channel_id)
+        if channel is not None:
+            deletes.append(rest.submit(MODERATION, f"messages:{channel_id}", channel.delete_messages,
+                                       [discord.Object(id=i) for i in message_ids], reason="Duplicate spam"))
+    members = [m for m in flag.authors if isinstance(m, discord.Member)]
+    results = await asyncio.gather(*deletes, *(mute_manager.mute(m, reason="Duplicate spam") for m in members), return_exceptions=True)
+    for result in results:
+        # NotFound: already gone (e.g. removed by the word filter)
+        if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+            spam_log.warning("Duplicate spam action failed in guild %s: %s", guild.id, result)
+    muted = [m for m, r in zip(members, results[len(deletes):]) if isinstance(r, mutes.Mute)]
+    if flag.batch:
+        spam_log.info("Duplicate spam in guild %s: %s author(s), %s message(s)", guild.id, len(flag.authors), sum(len(v) for v in flag.messages.values()))
+        names = ", ".join(str(m) for m in flag.authors[:10]) + (f" and {len(flag.authors) - 10} more" if len(flag.authors) > 10 else "")
+        log_event(guild, f"Duplicate spam from {len(flag.authors)} account(s) ({names}): messages removed, {len(muted)} muted")
+        await rest.submit(NOTIFICATION, f"messages:{message.channel.id}", message.channel.send,
+                          f"🧹 Removed duplicate spam from {len(flag.authors)} account(s).")
+    elif muted:
+        log_event(guild, f"User {message.author} muted for duplicate spam in {message.channel.mention}")
+    return True
+
+message_pipeline.register("duplicates", duplicates_filter)
 
 @bot.event
 async def on_message(message):
-    # Ignore messages from the bot itself
-    if message.author == bot.user:
-        return
-    
-    # Anti-spam
+    # Bots (including this one) never go through the filters
     if message.guild and not message.author.bot:
-        now = time.time()
-        times = user_message_times[message.author.id]
-        times.append(now)
-        while times and now - times[0] > SPAM_TIME_WINDOW:
-            times.popleft()
-        if len(times) > SPAM_MESSAGE_LIMIT:
-            # Mute user
-            mute_role = discord.utils.get(message.guild.roles, name=SPAM_MUTE_ROLE_NAME)
-            if not mute_role:
-                mute_role = await message.guild.create_role(name=SPAM_MUTE_ROLE_NAME, reason="Anti-spam mute")
-                for channel in message.guild.channels:
-                    await channel.set_permissions(mute_role, send_messages=False)
-            await message.author.add_roles(mute_role, reason="Spamming")
-            await log_event(message.guild, f"User {message.author} muted for spamming in {message.channel.mention}")
-            await message.channel.send(f"{message.author.mention} has been muted for spamming.")
-    
-    # Process commands
-    await bot.process_commands(message)
+        await message_pipeline.run(message)
+    # Only parse prefixes if a text command is ever added
+    if bot.all_commands:
+        await bot.process_commands(message)
 
-# Verification reaction role handler
+# Verification + reaction-role handlers
 @bot.event
 async def on_raw_reaction_add(payload):
-    guild_id = payload.guild_id
-    user_id = payload.user_id
-    print(f"[DEBUG] Reaction add: user {user_id} in guild {guild_id}, channel {payload.channel_id}, message {payload.message_id}, emoji {payload.emoji}")
-    if not guild_id or not user_id:
+    # One dict probe rejects every reaction that isn't on a panel
+    action = reaction_roles.match(payload.message_id, payload.emoji)
+    if action is None or payload.guild_id != action.guild_id or payload.user_id == bot.user.id:
         return
-    conf = autorole_settings.get(guild_id, {}).get("verification")
-    print(f"[DEBUG] Verification config: {conf}")
-    if not conf:
+    reaction_log.debug("Reaction add: user %s in guild %s, message %s, emoji %s", payload.user_id, payload.guild_id, payload.message_id, payload.emoji)
+    guild = bot.get_guild(action.guild_id)
+    role = guild.get_role(action.role_id) if guild else None
+    if not role:
         return
-    # Always assign the role specified in the verification config
-    if payload.channel_id == conf["channel_id"] and payload.message_id == conf["message_id"] and str(payload.emoji) == "✅":
-        guild = bot.get_guild(guild_id)
-        member = guild.get_member(user_id) if guild else None
-        role = guild.get_role(conf["role_id"]) if guild else None
-        print(f"[DEBUG] Member: {member}, Role to assign: {role}")
-        if member and role:
-            try:
-                await member.add_roles(role, reason="Verified via reaction")
-                print(f"[verification] Assigned {role.name} to {member}")
-            except Exception as e:
-                print(f"[verification] Failed to assign role: {e}")
+    member = payload.member or await member_resolver.resolve(guild, payload.user_id)
+    if member:
+        try:
+            await rest.submit(VERIFICATION, f"roles:{guild.id}", member.add_roles, role, reason=action.reason)
+            reaction_log.info("Assigned %s to %s", role.name, member)
+        except Exception as e:
+            reaction_log.warning("Failed to assign role: %s", e)
+
+@bot.event
+async def on_raw_reaction_remove(payload):
+    action = reaction_roles.match(payload.message_id, payload.emoji)
+    if action is None or not action.revoke or payload.guild_id != action.guild_id:
+        return
+    guild = bot.get_guild(action.guild_id)
+    role = guild.get_role(action.role_id) if guild else None
+    if not role:
+        return
+    member = await member_resolver.resolve(guild, payload.user_id)
+    # Only trust member.roles for the live member cache; LRU/fetched copies may predate the role being added
+    if member and (role in member.roles or guild.get_member(payload.user_id) is None):
+        try:
+            await rest.submit(VERIFICATION, f"roles:{guild.id}", member.remove_roles, role, reason=action.reason)
+            reaction_log.info("Removed %s from %s", role.name, member)
+        except Exception as e:
+            reaction_log.warning("Failed to remove role: %s", e)
 
 # Slash command: Send test welcome message (Admin only)
 @bot.tree.command(name="welcometest", description="Send a test welcome message to the configured channel (Admin only)")
@@ -875,9 +1088,10 @@ async def welcometest(interaction: discord.Interaction):
         color=discord.Color.green()
     )
     embed.set_thumbnail(url=interaction.user.display_avatar.url)
-    embed.set_footer(text=f"Test message • Member #{len(guild.members)}")
-    await channel.send(embed=embed)
-    await interaction.response.send_message(f"✅ Test welcome sent to {channel.mention}.", ephemeral=True)
+    embed.set_footer(text=f"Test message • Member #{guild.member_count}")
+    await interaction.response.defer(ephemeral=True)
+    await rest.submit(NOTIFICATION, f"messages:{channel.id}", channel.send, embed=embed)
+    await interaction.followup.send(f"✅ Test welcome sent to {channel.mention}.", ephemeral=True)
 
 # Slash command: Send test leave message (Admin only)
 @bot.tree.command(name="leavetest", description="Send a test leave message to the configured channel (Admin only)")
@@ -904,8 +1118,9 @@ async def leavetest(interaction: discord.Interaction):
     )
     embed.set_thumbnail(url=interaction.user.display_avatar.url)
     embed.set_footer(text="Test message")
-    await channel.send(embed=embed)
-    await interaction.response.send_message(f"✅ Test leave sent to {channel.mention}.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    await rest.submit(NOTIFICATION, f"messages:{channel.id}", channel.send, embed=embed)
+    await interaction.followup.send(f"✅ Test leave sent to {channel.mention}.", ephemeral=True)
 
 # Slash command: Set Autorole (Admin only)
 @bot.tree.command(name="setautorole", description="Set an autorole for new members (Admin only)")
@@ -917,11 +1132,12 @@ async def setautorole(interaction: discord.Interaction, role: discord.Role):
         autorole_settings[guild_id] = {}
     
     autorole_settings[guild_id]["autorole"] = role.id
+    autorole_settings_changed(guild_id)
     try:
         await interaction.response.send_message(f"✅ Autorole set to {role.mention}.")
-        print(f"[setautorole] Guild {guild_id}: Autorole set to {role.name}")
+        cmd_log.info("[setautorole] Guild %s: Autorole set to %s", guild_id, role.name)
     except Exception as e:
-        print(f"[setautorole] Failed: {e}")
+        cmd_log.warning("[setautorole] Failed: %s", e)
 
 # Slash command: Remove Autorole (Admin only)
 @bot.tree.command(name="removeautorole", description="Remove the autorole from new members (Admin only)")
@@ -930,11 +1146,12 @@ async def removeautorole(interaction: discord.Interaction):
     guild_id = interaction.guild.id
     if guild_id in autorole_settings:
         del autorole_settings[guild_id]
+        autorole_settings_changed(guild_id)
         try:
             await interaction.response.send_message("✅ Autorole removed.")
-            print(f"[removeautorole] Guild {guild_id}: Autorole removed")
+            cmd_log.info("[removeautorole] Guild %s: Autorole removed", guild_id)
         except Exception as e:
-            print(f"[removeautorole] Failed: {e}")
+            cmd_log.warning("[removeautorole] Failed: %s", e)
     else:
         await interaction.response.send_message("ℹ️ No autorole set for this server.")
 
@@ -963,23 +1180,27 @@ async def setupverification(
     }
     
     # Send the verification message
+    await interaction.response.defer()
     try:
-        verify_msg = await channel.send(
+        route = f"messages:{channel.id}"
+        verify_msg = await rest.submit(
+            NOTIFICATION, route, channel.send,
             message,
             embed=None,
             allowed_mentions=discord.AllowedMentions.none()
         )
         # Add reaction for verification
-        await verify_msg.add_reaction("✅")
+        await rest.submit(NOTIFICATION, route, verify_msg.add_reaction, "✅")
         
         # Update the message ID in settings
         autorole_settings[guild_id]["verification"]["message_id"] = verify_msg.id
+        autorole_settings_changed(guild_id)
         
-        await interaction.response.send_message(f"✅ Verification setup complete. Message ID: {verify_msg.id}")
-        print(f"[setupverification] Guild {guild_id}: Verification set up in {channel.name}")
+        await interaction.followup.send(f"✅ Verification setup complete. Message ID: {verify_msg.id}")
+        cmd_log.info("[setupverification] Guild %s: Verification set up in %s", guild_id, channel.name)
     except Exception as e:
-        print(f"[setupverification] Failed: {e}")
-        await interaction.response.send_message(f"❌ Failed to set up verification: {e}", ephemeral=True)
+        cmd_log.warning("[setupverification] Failed: %s", e)
+        await interaction.followup.send(f"❌ Failed to set up verification: {e}", ephemeral=True)
 
 # Slash command: Remove Verification (Admin only)
 @bot.tree.command(name="removeverification", description="Remove verification setup (Admin only)")
@@ -988,22 +1209,101 @@ async def removeverification(interaction: discord.Interaction):
     guild_id = interaction.guild.id
     if guild_id in autorole_settings and "verification" in autorole_settings[guild_id]:
         del autorole_settings[guild_id]["verification"]
+        autorole_settings_changed(guild_id)
         try:
             await interaction.response.send_message("✅ Verification removed.")
-            print(f"[removeverification] Guild {guild_id}: Verification removed")
+            cmd_log.info("[removeverification] Guild %s: Verification removed", guild_id)
         except Exception as e:
-            print(f"[removeverification] Failed: {e}")
+            cmd_log.warning("[removeverification] Failed: %s", e)
     else:
         await interaction.response.send_message("ℹ️ No verification setup for this server.")
 
+# Slash command: Add a reaction role (Admin only)
+@bot.tree.command(name="reactionroleadd", description="Give a role when people react to a message (Admin only)")
+@app_commands.describe(
+    message_id="ID of the panel message",
+    emoji="Emoji to react with",
+    role="Role to give (removed again when the reaction is removed)",
+    channel="Channel the message is in (optional, defaults to current)"
+)
+@app_commands.checks.has_permissions(manage_roles=True)
+async def reactionroleadd(interaction: discord.Interaction, message_id: str, emoji: str, role: discord.Role, channel: discord.TextChannel = None):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    target_channel = channel or interaction.channel
+    try:
+        msg = await target_channel.fetch_message(int(message_id))
+    except (ValueError, discord.NotFound):
+        await interaction.response.send_message(f"❌ Message {message_id} not found in {target_channel.mention}.", ephemeral=True)
+        return
+    except Exception as e:
+        await interaction.response.send_message(f"❌ Couldn't read that message: {e}", ephemeral=True)
+        return
+    partial = discord.PartialEmoji.from_str(emoji.strip())
+    try:
+        await msg.add_reaction(partial)
+    except Exception as e:
+        await interaction.response.send_message(f"❌ Couldn't react with {emoji}: {e}", ephemeral=True)
+        return
+    reaction_roles.add(guild.id, target_channel.id, msg.id, partial, role.id)
+    config_store.mark_dirty("reaction_roles", guild.id)
+    await interaction.response.send_message(f"✅ Reacting with {partial} on that message now gives {role.mention}.", ephemeral=True)
+    cmd_log.info("[reactionroleadd] Guild %s: %s %s -> %s", guild.id, msg.id, emoji_key(partial), role.name)
+
+# Slash command: Remove a reaction role (Admin only)
+@bot.tree.command(name="reactionroleremove", description="Remove a reaction role or a whole panel (Admin only)")
+@app_commands.describe(message_id="ID of the panel message", emoji="Emoji to remove (optional, removes the whole panel if empty)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def reactionroleremove(interaction: discord.Interaction, message_id: str, emoji: str = None):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    partial = discord.PartialEmoji.from_str(emoji.strip()) if emoji else None
+    try:
+        removed = reaction_roles.remove(guild.id, int(message_id), partial)
+    except ValueError:
+        removed = False
+    if not removed:
+        await interaction.response.send_message("ℹ️ No matching reaction role found.", ephemeral=True)
+        return
+    config_store.mark_dirty("reaction_roles", guild.id)
+    await interaction.response.send_message("✅ Reaction role removed.", ephemeral=True)
+    cmd_log.info("[reactionroleremove] Guild %s: %s %s", guild.id, message_id, emoji or '(panel)')
+
+# Slash command: List reaction roles (Admin only)
+@bot.tree.command(name="reactionroles", description="List this server's reaction-role panels (Admin only)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def reactionroles(interaction: discord.Interaction):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    panels = reaction_role_panels.get(guild.id, {})
+    if not panels:
+        await interaction.response.send_message("ℹ️ No reaction-role panels set up. Use /reactionroleadd.", ephemeral=True)
+        return
+    lines = []
+    for message_id, panel in panels.items():
+        lines.append(f"**Message {message_id}** in <#{panel['channel_id']}>")
+        for key, role_id in panel["roles"].items():
+            lines.append(f"  {format_emoji(guild, key)} → <@&{role_id}>")
+    body = "\n".join(lines)
+    if len(body) > 1900:
+        body = body[:1900] + "…"
+    await interaction.response.send_message(body, ephemeral=True, allowed_mentions=discord.AllowedMentions.none())
+
 # Slash command: Send a message to any channel (Admin only)
 @bot.tree.command(name="say", description="Send a message to any channel (Admin only)")
 @app_commands.describe(message="The message to send", channel="Channel to send the message in (optional)")
 @app_commands.checks.has_permissions(manage_guild=True)
 async def say(interaction: discord.Interaction, message: str, channel: discord.TextChannel = None):
     target_channel = channel or interaction.channel
-    await target_channel.send(message)
-    await interaction.response.send_message(f"✅ Message sent to {target_channel.mention}.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    await rest.submit(NOTIFICATION, f"messages:{target_channel.id}", target_channel.send, message)
+    await interaction.followup.send(f"✅ Message sent to {target_channel.mention}.", ephemeral=True)
 
 # Slash command: Create Verification Channel (Admin only)
 @bot.tree.command(name="verifyadd", description="Set up verification: create or pick a channel (Admin only)")
@@ -1014,6 +1314,8 @@ async def verifyadd(interaction: discord.Interaction, role: discord.Role, channe
     if not guild:
         await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
         return
+    # Several queued REST calls follow; acknowledge within the 3s deadline first
+    await interaction.response.defer(ephemeral=True)
     if channel:
         target_channel = channel
         # Update permissions for verification
@@ -1023,9 +1325,10 @@ async def verifyadd(interaction: discord.Interaction, role: discord.Role, channe
         overwrites.view_channel = True
         overwrites.send_messages = True
         overwrites.read_message_history = True
-        await target_channel.set_permissions(guild.default_role, overwrite=overwrites)
-        await target_channel.set_permissions(role, view_channel=False)
-        await target_channel.set_permissions(guild.me, view_channel=True, send_messages=True)
+        route = f"channels:{guild.id}"
+        await rest.submit(VERIFICATION, route, target_channel.set_permissions, guild.default_role, overwrite=overwrites)
+        await rest.submit(VERIFICATION, route, target_channel.set_permissions, role, view_channel=False)
+        await rest.submit(VERIFICATION, route, target_channel.set_permissions, guild.me, view_channel=True, send_messages=True)
     else:
         # Create new channel
         overwrites = {
@@ -1033,15 +1336,17 @@ async def verifyadd(interaction: discord.Interaction, role: discord.Role, channe
             role: discord.PermissionOverwrite(view_channel=False),
             guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
         }
-        target_channel = await guild.create_text_channel(channel_name, overwrites=overwrites, reason="Verification setup")
+        target_channel = await rest.submit(VERIFICATION, f"channels:{guild.id}", guild.create_text_channel,
+                                           channel_name, overwrites=overwrites, reason="Verification setup")
     embed = discord.Embed(title="Verification Required", description=f"React with ✅ to get access!", color=discord.Color.blurple())
-    msg = await target_channel.send(embed=embed)
-    await msg.add_reaction("✅")
+    msg = await rest.submit(VERIFICATION, f"messages:{target_channel.id}", target_channel.send, embed=embed)
+    await rest.submit(VERIFICATION, f"messages:{target_channel.id}", msg.add_reaction, "✅")
     # Save config for reaction handler
     guild_id = guild.id
     autorole_settings[guild_id] = autorole_settings.get(guild_id, {})
     autorole_settings[guild_id]["verification"] = {"channel_id": target_channel.id, "message_id": msg.id, "role_id": role.id}
-    await interaction.response.send_message(f"✅ Verification channel set: {target_channel.mention}\nUsers must react to the message to get {role.mention}.", ephemeral=True)
+    autorole_settings_changed(guild_id)
+    await interaction.followup.send(f"✅ Verification channel set: {target_channel.mention}\nUsers must react to the message to get {role.mention}.", ephemeral=True)
 
 # Slash command: Lock
 @bot.tree.command(name="lock", description="Lock a channel so @everyone cannot send messages (Admin only)")
@@ -1057,8 +1362,144 @@ async def lock(interaction: discord.Interaction, channel: discord.TextChannel =
     if overwrite is None:
         overwrite = discord.PermissionOverwrite()
     overwrite.send_messages = False
-    await target_channel.set_permissions(guild.default_role, overwrite=overwrite)
-    await interaction.response.send_message(f"🔒 {target_channel.mention} is now locked for @everyone.", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    await rest.submit(MODERATION, f"channels:{guild.id}", target_channel.set_permissions, guild.default_role, overwrite=overwrite)
+    await interaction.followup.send(f"🔒 {target_channel.mention} is now locked for @everyone.", ephemeral=True)
+
+PURGE_MAX = 1000
+# Messages read per channel when no time window is given
+PURGE_SCAN_LIMIT = 5000
+# Time window for everywhere/flagged purges when none is given
+PURGE_DEFAULT_MINUTES = 60
+PURGE_PROGRESS_INTERVAL = 2.0
+
+def purge_progress(job, where):
+    state = "✋ Purge cancelled" if job.cancelled and job.finished else "✅ Purge finished" if job.finished else "🧹 Purging"
+    text = f"{state} in {where}: {job.deleted:,} deleted, {job.scanned:,} scanned"
+    if job.old_deleted:
+        text += f" ({job.old_deleted:,} older than 14 days, deleted one by one)"
+    if job.failed:
+        text += f", {job.failed:,} failed"
+    if len(job.channels) > 1:
+        text += f"\nChannels: {job.channels_done}/{len(job.channels)}"
+    if job.skipped_channels:
+        text += f"\n⚠️ No access to {', '.join(c.mention for c in job.skipped_channels[:10])}"
+    if job.cancelled and not job.finished:
+        text += "\nCancelling…"
+    return text[:2000]
+
+class PurgeCancelView(discord.ui.View):
+    def __init__(self, job, where):
+        super().__init__(timeout=None)
+        self.job = job
+        self.where = where
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.danger, emoji="✋")
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.job.cancel()
+        button.disabled = True
+        await interaction.response.edit_message(content=purge_progress(self.job, self.where), view=self)
+
+# Slash command: Purge messages (Admin only)
+@bot.tree.command(name="purge", description="Delete recent messages by user, text, bots or time (Admin only) 🧹")
+@app_commands.describe(
+    count=f"Most messages to delete (1-{PURGE_MAX}, default 100)",
+    user="Only messages from this user",
+    contains="Only messages containing this text",
+    bots="Only messages from bots",
+    minutes="Only messages from the last N minutes",
+    channel="Channel to purge (defaults to this one)",
+    everywhere=f"Every channel instead of one (needs a user; last {PURGE_DEFAULT_MINUTES} minutes unless set)",
+    flagged=f"Everyone muted by anti-spam in the last `minutes` (default {PURGE_DEFAULT_MINUTES}), in every channel"
+)
+@app_commands.checks.has_permissions(manage_messages=True)
+async def purge(
+    interaction: discord.Interaction,
+    count: int = 100,
+    user: discord.User | None = None,
+    contains: str | None = None,
+    bots: bool = False,
+    minutes: int | None = None,
+    channel: discord.TextChannel | None = None,
+    everywhere: bool = False,
+    flagged: bool = False
+):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if count < 1 or count > PURGE_MAX or (minutes is not None and not 1 <= minutes <= 30 * 1440):
+        await interaction.response.send_message(f"❌ Count must be 1-{PURGE_MAX} and minutes 1-{30 * 1440}.", ephemeral=True)
+        return
+    user_ids = {user.id} if user else set()
+    if flagged:
+        window = (minutes or PURGE_DEFAULT_MINUTES) * 60
+        now = time.time()
+        user_ids |= {int(uid) for uid, entry in mute_manager.state.get(guild.id, {}).items() if now - entry["last"] <= window}
+        if not user_ids:
+            await interaction.response.send_message(f"✅ Nobody was muted by anti-spam in the last {window // 60} minutes.", ephemeral=True)
+            return
+    if (everywhere or flagged) and not user_ids:
+        await interaction.response.send_message("❌ Purging every channel needs a user (or flagged).", ephemeral=True)
+        return
+    if everywhere or flagged:
+        minutes = minutes or PURGE_DEFAULT_MINUTES
+        candidates = [*guild.text_channels, *guild.voice_channels, *guild.threads]
+        where = "all channels"
+    else:
+        candidates = [channel or interaction.channel]
+        where = candidates[0].mention
+    channels = []
+    for candidate in candidates:
+        perms = candidate.permissions_for(guild.me)
+        if perms.view_channel and perms.read_message_history and perms.manage_messages:
+            channels.append(candidate)
+    if not channels:
+        await interaction.response.send_message("❌ I need View Channel, Read Message History and Manage Messages there.", ephemeral=True)
+        return
+    job = PurgeJob(
+        channels,
+        user_ids=user_ids,
+        contains=contains,
+        bots=bots,
+        after=discord.utils.utcnow() - datetime.timedelta(minutes=minutes) if minutes else None,
+        limit=count,
+        scan_limit=None if minutes else PURGE_SCAN_LIMIT,
+        reason=f"Purge by {interaction.user}"
+    )
+    view = PurgeCancelView(job, where)
+    await interaction.response.send_message(purge_progress(job, where), view=view, ephemeral=True)
+    task = asyncio.create_task(purger.run(job))
+    live = True
+    while not task.done():
+        await asyncio.wait({task}, timeout=PURGE_PROGRESS_INTERVAL)
+        if live and not task.done():
+            try:
+                await interaction.edit_original_response(content=purge_progress(job, where), view=view)
+            except discord.HTTPException:
+                # Interaction token expired (15 minutes): the purge keeps going, the log gets the result
+                live = False
+    view.stop()
+    try:
+        await task
+    except Exception as e:
+        cmd_log.exception("[purge] Guild %s failed", guild.id)
+        if live:
+            await interaction.edit_original_response(content=f"{purge_progress(job, where)}\n❌ Stopped: {str(e)[:200]}", view=None)
+        return
+    if live:
+        try:
+            await interaction.edit_original_response(content=purge_progress(job, where), view=None)
+        except discord.HTTPException:
+            pass
+    filters = ", ".join(filter(None, [
+        f"users {', '.join(f'<@{u}>' for u in sorted(user_ids)[:10])}" if user_ids else None,
+        f"containing `{contains}`" if contains else None,
+        "bots" if bots else None,
+        f"last {minutes} min" if minutes else None,
+    ])) or "any message"
+    log_event(guild, f"{interaction.user} purged {job.deleted} message(s) in {where} ({filters}){' (cancelled)' if job.cancelled else ''}")
+    cmd_log.info("[purge] Guild %s: %s deleted, %s scanned, %s channel(s), cancelled=%s", guild.id, job.deleted, job.scanned, len(channels), job.cancelled)
 
 # Slash command: Responds with the 67 meme gif
 @bot.tree.command(name="67", description="Responds with the 67 meme gif")
@@ -1071,24 +1512,27 @@ async def sixtyseven(interaction: discord.Interaction):
 @app_commands.describe(user="User to ban", reason="Reason for ban (optional)")
 @app_commands.checks.has_permissions(ban_members=True)
 async def ban(interaction: discord.Interaction, user: discord.Member, reason: str = None):
+    # The ban may queue behind other REST work; acknowledge within the 3s deadline first
+    await interaction.response.defer(ephemeral=True)
     try:
-        await user.ban(reason=reason)
-        await interaction.response.send_message(f"✅ {user.mention} has been banned.", ephemeral=True)
-        await log_event(interaction.guild, f"User {user} banned by {interaction.user}. Reason: {reason or 'No reason provided'}")
+        await rest.submit(MODERATION, f"members:{interaction.guild.id}", user.ban, reason=reason)
+        await interaction.followup.send(f"✅ {user.mention} has been banned.", ephemeral=True)
+        log_event(interaction.guild, f"User {user} banned by {interaction.user}. Reason: {reason or 'No reason provided'}")
     except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to ban {user.mention}: {e}", ephemeral=True)
+        await interaction.followup.send(f"❌ Failed to ban {user.mention}: {e}", ephemeral=True)
 
 # Slash command: Kick a user (Admin only)
 @bot.tree.command(name="kick", description="Kick a user from the server (Admin only, for when a gentle yeet is enough)")
 @app_commands.describe(user="User to kick", reason="Reason for kick (optional)")
 @app_commands.checks.has_permissions(kick_members=True)
 async def kick(interaction: discord.Interaction, user: discord.Member, reason: str = None):
+    await interaction.response.defer(ephemeral=True)
     try:
-        await user.kick(reason=reason)
-        await interaction.response.send_message(f"✅ {user.mention} has been kicked.", ephemeral=True)
-        await log_event(interaction.guild, f"User {user} kicked by {interaction.user}. Reason: {reason or 'No reason provided'}")
+        await rest.submit(MODERATION, f"members:{interaction.guild.id}", user.kick, reason=reason)
+        await interaction.followup.send(f"✅ {user.mention} has been kicked.", ephemeral=True)
+        log_event(interaction.guild, f"User {user} kicked by {interaction.user}. Reason: {reason or 'No reason provided'}")
     except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to kick {user.mention}: {e}", ephemeral=True)
+        await interaction.followup.send(f"❌ Failed to kick {user.mention}: {e}", ephemeral=True)
 
 # Slash command: Warn a user (Admin only)
 @bot.tree.command(name="warn", description="Warn a user (Admin only, for when you want to wag your finger and say 'naughty naughty')")
@@ -1096,7 +1540,7 @@ async def kick(interaction: discord.Interaction, user: discord.Member, reason: s
 @app_commands.checks.has_permissions(manage_guild=True)
 async def warn(interaction: discord.Interaction, user: discord.Member, reason: str = None):
     await interaction.response.send_message(f"⚠️ {user.mention} has been warned. Reason: {reason or 'No reason provided'}", ephemeral=True)
-    await log_event(interaction.guild, f"User {user} warned by {interaction.user}. Reason: {reason or 'No reason provided'}")
+    log_event(interaction.guild, f"User {user} warned by {interaction.user}. Reason: {reason or 'No reason provided'}")
 
 # Slash command: Set slowmode for a channel (Admin only)
 @bot.tree.command(name="slowmode", description="Set slowmode for a channel (Admin only, for when chat needs to chill and touch grass)")
@@ -1104,32 +1548,318 @@ async def warn(interaction: discord.Interaction, user: discord.Member, reason: s
 @app_commands.checks.has_permissions(manage_channels=True)
 async def slowmode(interaction: discord.Interaction, seconds: int, channel: discord.TextChannel = None):
     target_channel = channel or interaction.channel
+    await interaction.response.defer(ephemeral=True)
     try:
-        await target_channel.edit(slowmode_delay=seconds)
-        await interaction.response.send_message(f"⏳ Slowmode set to {seconds} seconds in {target_channel.mention}.", ephemeral=True)
-        await log_event(interaction.guild, f"Slowmode set to {seconds}s in {target_channel} by {interaction.user}")
+        await rest.submit(MODERATION, f"channels:{interaction.guild.id}", target_channel.edit, slowmode_delay=seconds)
+        await interaction.followup.send(f"⏳ Slowmode set to {seconds} seconds in {target_channel.mention}.", ephemeral=True)
+        log_event(interaction.guild, f"Slowmode set to {seconds}s in {target_channel} by {interaction.user}")
     except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to set slowmode: {e}", ephemeral=True)
-
-# Slash command: Ship
-@bot.tree.command(name="ship", description="Ship two users together and show a compatibility score! (For science, and maybe a little chaos)")
-@app_commands.describe(user1="First user to ship", user2="Second user to ship")
-async def ship(interaction: discord.Interaction, user1: discord.Member, user2: discord.Member):
-    u1 = user1 if user1 is not None else interaction.user
-    u2 = user2 if user2 is not None else interaction.user
-    score = random.randint(0, 100)
-    bar = "💖" * (score // 10) + "💔" * (10 - score // 10)
-    if score > 80:
-        comment = "A match made in heaven! 💍"
-    elif score > 50:
-        comment = "There's definitely a spark! ✨"
-    elif score > 30:
-        comment = "Could work out... maybe! 🤔"
+        await interaction.followup.send(f"❌ Failed to set slowmode: {e}", ephemeral=True)
+
+# Slash command: Set log channel (Admin only)
+@bot.tree.command(name="setlogchannel", description="Set the channel for moderation logs (Admin only) 📜")
+@app_commands.describe(channel=f"Log channel (leave empty to fall back to #{MODLOG_CHANNEL_NAME})")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def setlogchannel(interaction: discord.Interaction, channel: discord.TextChannel = None):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if channel:
+        log_channels[guild.id] = channel.id
+        message = f"✅ Moderation logs → {channel.mention}"
     else:
-        comment = "Better luck next time! 😅"
+        log_channels.pop(guild.id, None)
+        message = f"✅ Log channel cleared; logs go to #{MODLOG_CHANNEL_NAME} if it exists."
+    config_store.mark_dirty("log_channels", guild.id)
+    await interaction.response.send_message(message, ephemeral=True)
+    cmd_log.info("[setlogchannel] Guild %s: %s", guild.id, channel.id if channel else None)
+
+# Slash command: Set anti-spam limits (Admin only)
+@bot.tree.command(name="spamlimit", description="Set how many messages per time window count as spam (Admin only)")
+@app_commands.describe(messages=f"Messages allowed in the window (2-50, default {SPAM_MESSAGE_LIMIT})", seconds=f"Window length in seconds (1-60, default {SPAM_TIME_WINDOW})", reset="Go back to the defaults")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def spamlimit(interaction: discord.Interaction, messages: int = SPAM_MESSAGE_LIMIT, seconds: float = float(SPAM_TIME_WINDOW), reset: bool = False):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if reset:
+        spam_windows.reset_limits(guild.id)
+        config_store.mark_dirty("spam_limits", guild.id)
+        await interaction.response.send_message(f"✅ Anti-spam reset to {SPAM_MESSAGE_LIMIT} messages per {SPAM_TIME_WINDOW}s.", ephemeral=True)
+        return
+    if messages < 2 or messages > 50 or seconds < 1 or seconds > 60:
+        await interaction.response.send_message("❌ Messages must be 2-50 and seconds 1-60.", ephemeral=True)
+        return
+    spam_windows.set_limits(guild.id, messages, seconds)
+    config_store.mark_dirty("spam_limits", guild.id)
+    await interaction.response.send_message(f"✅ Anti-spam: more than {messages} messages in {seconds:g}s gets muted.", ephemeral=True)
+    cmd_log.info("[spamlimit] Guild %s: %s msgs / %ss", guild.id, messages, seconds)
+
+# Slash command: Choose how anti-spam mutes (Admin only)
+@bot.tree.command(name="mutemode", description="Choose how anti-spam mutes: Discord timeout or the Muted role (Admin only)")
+@app_commands.describe(mode="timeout (default, needs Moderate Members) or role (Muted role on every channel)")
+@app_commands.choices(mode=[app_commands.Choice(name=m, value=m) for m in mutes.MODES])
+@app_commands.checks.has_permissions(manage_guild=True)
+async def mutemode(interaction: discord.Interaction, mode: str):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    mute_manager.settings[guild.id] = {"mode": mode}
+    config_store.mark_dirty("mute_settings", guild.id)
+    ladder = ", ".join(mutes.format_duration(d) for d in mute_manager.ladder)
+    note = ""
+    if mode == mutes.TIMEOUT and not guild.me.guild_permissions.moderate_members:
+        note = "\n⚠️ I don't have **Moderate Members**, so mutes will use the Muted role until I do."
     await interaction.response.send_message(
-        f"{u1.mention} + {u2.mention} = {score}%\n{bar}\n{comment}")
+        f"✅ Anti-spam now mutes with **{mode}**. Repeat offenders get: {ladder}.{note}",
+        ephemeral=True
+    )
+    cmd_log.info("[mutemode] Guild %s: %s", guild.id, mode)
+
+def message_filter_summary(guild):
+    conf = message_pipeline.settings.get(guild.id, {})
+    enabled = message_pipeline.enabled(guild.id)
+    channels = ", ".join(f"<#{c}>" for c in conf.get("exempt_channels", ())) or "none"
+    roles = ", ".join(f"<@&{r}>" for r in conf.get("exempt_roles", ())) or "none"
+    return (
+        "**Message filters:**\n"
+        + "\n".join(f"{'✅' if name in enabled else '❌'} {name}" for name in message_pipeline.names)
+        + f"\nExempt channels: {channels}\nExempt roles: {roles}"
+    )
+
+def message_filters_changed(guild_id):
+    conf = message_pipeline.settings.get(guild_id)
+    if conf is not None and not any(conf.values()):
+        del message_pipeline.settings[guild_id]
+    config_store.mark_dirty("message_filters", guild_id)
+    message_pipeline.invalidate(guild_id)
+
+async def message_filter_autocomplete(interaction: discord.Interaction, current: str):
+    return [app_commands.Choice(name=name, value=name) for name in message_pipeline.names if current.lower() in name][:25]
+
+# Slash command: Turn message filters on/off (Admin only)
+@bot.tree.command(name="messagefilter", description="Turn a message filter (like anti-spam) on or off (Admin only)")
+@app_commands.describe(name="Which filter", enabled="On or off (leave empty to just show the current setup)")
+@app_commands.autocomplete(name=message_filter_autocomplete)
+@app_commands.checks.has_permissions(manage_guild=True)
+async def messagefilter(interaction: discord.Interaction, name: str | None = None, enabled: bool | None = None):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if name is not None and enabled is not None:
+        if name not in message_pipeline.names:
+            await interaction.response.send_message(f"❌ Unknown filter. Available: {', '.join(message_pipeline.names)}", ephemeral=True)
+            return
+        conf = message_pipeline.settings.setdefault(guild.id, {})
+        on, off = set(conf.get("enabled", ())), set(conf.get("disabled", ()))
+        (on if enabled else off).add(name)
+        (off if enabled else on).discard(name)
+        conf["enabled"], conf["disabled"] = sorted(on), sorted(off)
+        message_filters_changed(guild.id)
+        cmd_log.info("[messagefilter] Guild %s: %s -> %s", guild.id, name, enabled)
+    await interaction.response.send_message(message_filter_summary(guild), ephemeral=True)
+
+# Slash command: Exempt a channel or role from message filters (Admin only)
+@bot.tree.command(name="filterexempt", description="Exempt a channel/category or role from message filters (Admin only)")
+@app_commands.describe(channel="Channel or category to exempt", role="Role to exempt", remove="Remove the exemption instead")
+@app_commands.checks.has_permissions(manage_guild=True)
+async def filterexempt(interaction: discord.Interaction, channel: discord.abc.GuildChannel | None = None, role: discord.Role | None = None, remove: bool = False):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if channel is not None or role is not None:
+        conf = message_pipeline.settings.setdefault(guild.id, {})
+        for key, target in (("exempt_channels", channel), ("exempt_roles", role)):
+            if target is None:
+                continue
+            ids = set(conf.get(key, ()))
+            if remove:
+                ids.discard(target.id)
+            else:
+                ids.add(target.id)
+            conf[key] = sorted(ids)
+        message_filters_changed(guild.id)
+        cmd_log.info("[filterexempt] Guild %s: channel %s, role %s, remove=%s", guild.id, channel.id if channel else None, role.id if role else None, remove)
+    await interaction.response.send_message(message_filter_summary(guild), ephemeral=True)
+
+WORD_FILTER_FILE_BYTES = 512 * 1024
+
+def word_filter_summary(guild):
+    lines = ["**Word filter:**"]
+    for kind in word_filter.KINDS:
+        terms = word_filters.terms(guild.id, kind)
+        shown = ", ".join(f"`{t}`" for t in terms[:20]) + (f" and {len(terms) - 20:,} more" if len(terms) > 20 else "")
+        lines.append(f"{kind}s ({len(terms):,}): {shown or 'none'}")
+    if "words" not in message_pipeline.enabled(guild.id):
+        lines.append("⚠️ The `words` filter is turned off here (see /messagefilter).")
+    return "\n".join(lines)[:2000]
+
+# Slash command: Banned words, blocked domains and patterns (Admin only)
+@bot.tree.command(name="wordfilter", description="Delete messages with banned words, links or patterns (Admin only)")
+@app_commands.describe(
+    kind="word (whole words; * at either end for partial), domain (and its subdomains) or regex",
+    add="Entries to add, comma separated (one pattern per call for regex)",
+    remove="Entries to remove, comma separated (one pattern per call for regex)",
+    file="Text file with one entry per line to add",
+    clear="Remove every entry of this kind"
+)
+@app_commands.choices(kind=[app_commands.Choice(name=k, value=k) for k in word_filter.KINDS])
+@app_commands.checks.has_permissions(manage_guild=True)
+async def wordfilter(interaction: discord.Interaction, kind: str = word_filter.WORD, add: str | None = None, remove: str | None = None,
+                     file: discord.Attachment | None = None, clear: bool = False):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if not (add or remove or file or clear):
+        await interaction.response.send_message(word_filter_summary(guild), ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+
+    def split(value):
+        if not value:
+            return []
+        return [value] if kind == word_filter.REGEX else value.split(",")
+
+    entries = split(add)
+    if file is not None:
+        if file.size > WORD_FILTER_FILE_BYTES:
+            await interaction.followup.send(f"❌ Files are limited to {WORD_FILTER_FILE_BYTES // 1024} KB.", ephemeral=True)
+            return
+        entries += (await file.read()).decode("utf-8", "replace").splitlines()
+    entries = [e for e in entries if e.strip()]
+    # Refuse an oversized upload before validating any of it
+    limit = word_filter.max_entries(kind)
+    if len(entries) > limit:
+        await interaction.followup.send(f"❌ At most {limit:,} {kind}s per server; that's {len(entries):,}.", ephemeral=True)
+        return
+    try:
+        cleaned = [word_filter.clean_term(kind, e) for e in entries]
+        removed = [word_filter.clean_term(kind, e) for e in split(remove) if e.strip()]
+    except ValueError as e:
+        await interaction.followup.send(f"❌ {e}", ephemeral=True)
+        return
+    if clear:
+        word_filters.clear(guild.id, kind)
+    removed = word_filters.remove(guild.id, kind, removed)
+    try:
+        added = word_filters.add(guild.id, kind, cleaned)
+    except ValueError as e:
+        # Over the limit: nothing added, but a clear/remove above still applies
+        config_store.mark_dirty("word_filters", guild.id)
+        message_pipeline.invalidate(guild.id)
+        await interaction.followup.send(f"❌ {e}", ephemeral=True)
+        return
+    config_store.mark_dirty("word_filters", guild.id)
+    # A guild's first entry (or its last removal) adds/drops the filter from its pipeline
+    message_pipeline.invalidate(guild.id)
+    # Build now rather than on the next message
+    word_filters.compile(guild.id)
+    # Advisory only: timings vary with load, so they never decide acceptance
+    slow = []
+    if kind == word_filter.REGEX:
+        for pattern in added:
+            if await asyncio.to_thread(word_filter.probe, pattern) > word_filter.PROBE_BUDGET:
+                slow.append(pattern)
+                spam_log.warning("Guild %s added a slow word filter pattern: %s", guild.id, pattern)
+    warning = f"\n⚠️ Slow on long repetitive messages (switched off if it slows scans down): {', '.join(f'`{p}`' for p in slow)}" if slow else ""
+    await interaction.followup.send(
+        f"✅ {kind}s: {len(added):,} added, {len(removed):,} removed{', list cleared first' if clear else ''}.{warning}\n\n{word_filter_summary(guild)}"[:2000],
+        ephemeral=True
+    )
+    cmd_log.info("[wordfilter] Guild %s: %s +%s -%s clear=%s", guild.id, kind, len(added), len(removed), clear)
 
+# Slash command: Configure anti-raid (Admin only)
+@bot.tree.command(name="antiraid", description="Configure join-flood protection (Admin only) 🛡️")
+@app_commands.describe(
+    enabled="Turn raid detection on or off",
+    joins=f"Joins allowed in the window before raid mode (2-100, default {RAID_JOIN_LIMIT})",
+    seconds=f"Window length in seconds (1-300, default {RAID_TIME_WINDOW})",
+    cooldown="Seconds without a flood before raid mode ends (10-3600)",
+    pause_autorole="Skip autorole while in raid mode",
+    skip_welcome="Skip welcome messages while in raid mode",
+    alert="Post to the log channel when raid mode starts/ends"
+)
+@app_commands.checks.has_permissions(manage_guild=True)
+async def antiraid(
+    interaction: discord.Interaction,
+    enabled: bool | None = None,
+    joins: int | None = None,
+    seconds: float | None = None,
+    cooldown: float | None = None,
+    pause_autorole: bool | None = None,
+    skip_welcome: bool | None = None,
+    alert: bool | None = None
+):
+    guild = interaction.guild
+    if not guild:
+        await interaction.response.send_message("❌ This command only works in servers!", ephemeral=True)
+        return
+    if (joins is not None and not 2 <= joins <= 100) or (seconds is not None and not 1 <= seconds <= 300) or (cooldown is not None and not 10 <= cooldown <= 3600):
+        await interaction.response.send_message("❌ Joins must be 2-100, seconds 1-300 and cooldown 10-3600.", ephemeral=True)
+        return
+    raid_detector.update(
+        guild.id, enabled=enabled, limit=joins, window=seconds, cooldown=cooldown,
+        pause_autorole=pause_autorole, skip_welcome=skip_welcome, alert=alert
+    )
+    config_store.mark_dirty("raid_settings", guild.id)
+    conf = raid_detector.config(guild.id)
+    status = "🚨 active now" if raid_detector.in_raid(guild.id) else "normal"
+    await interaction.response.send_message(
+        "**Anti-raid settings:**\n"
+        f"Enabled: {'Yes' if conf['enabled'] else 'No'} (state: {status})\n"
+        f"Trigger: more than {conf['limit']} joins in {conf['window']:g}s\n"
+        f"Cool-down: {conf['cooldown']:g}s\n"
+        f"Pause autorole: {'Yes' if conf['pause_autorole'] else 'No'}\n"
+        f"Skip welcome: {'Yes' if conf['skip_welcome'] else 'No'}\n"
+        f"Modlog alert: {'Yes' if conf['alert'] else 'No'}",
+        ephemeral=True
+    )
+    cmd_log.info("[antiraid] Guild %s: %s", guild.id, conf)
+
+
+# Metrics: every slash command and @bot.event handler above is wrapped for
+# counts/errors/latency; gauges are only evaluated when /metrics is scraped
+metrics = Metrics()
+metrics.gauge("skybot_gateway_latency_seconds", "Gateway heartbeat latency", lambda: bot.latency if math.isfinite(bot.latency) else None)
+metrics.gauge("skybot_shard_latency_seconds", "Gateway heartbeat latency per shard", lambda: {
+    str(shard_id): latency for shard_id, latency in getattr(bot, 'latencies', []) if math.isfinite(latency)
+})
+metrics.gauge("skybot_shards_ready", "Shards in this process that are connected and ready", lambda: len(ready_shards))
+metrics.gauge("skybot_guilds", "Guilds in cache", lambda: len(bot.guilds))
+metrics.gauge("skybot_cached_users", "Users in cache", lambda: len(bot.users))
+metrics.gauge("skybot_cached_members", "Members in cache across all guilds", lambda: sum(len(g.members) for g in bot.guilds))
+metrics.gauge("skybot_queue_depth", "Internal queue depths", lambda: {
+    "modlog": modlog.depth(),
+    "joins": join_processor.depth(),
+    "config_store_dirty": config_store.pending(),
+    "mute_jobs": mute_provisioner.pending(),
+    "mute_expiries": mute_manager.pending(),
+    "webhook_busy_buckets": webhook_client.queued(),
+})
+metrics.gauge("skybot_avatar_cache", "Avatar cache counters and size", lambda: dict(avatar_cache.stats, files=len(avatar_cache), bytes=avatar_cache.size()))
+metrics.gauge("skybot_duplicate_fingerprints", "Recent message fingerprints tracked for duplicate spam", lambda: len(duplicate_detector))
+metrics.gauge("skybot_duplicate_spam", "Duplicate spam counters", lambda: duplicate_detector.stats)
+metrics.gauge("skybot_word_filter", "Word filter counters and guilds with a compiled list", lambda: dict(word_filters.stats, compiled=len(word_filters)))
+metrics.gauge("skybot_purges", "Purge counters", lambda: purger.stats)
+metrics.gauge("skybot_mutes", "Anti-spam mute counters", lambda: mute_manager.stats)
+metrics.gauge("skybot_member_resolver", "Lazy member lookups (low-memory mode)", lambda: dict(member_resolver.stats, lru_size=len(member_resolver)))
+metrics.gauge("skybot_message_pipelines", "Guilds with a compiled message filter pipeline", lambda: len(message_pipeline))
+metrics.gauge("skybot_spam_windows", "Authors with a live anti-spam window", lambda: len(spam_windows))
+metrics.gauge("skybot_reaction_role_entries", "Indexed (message, emoji) reaction roles", lambda: len(reaction_roles))
+metrics.histograms["rest_wait"] = rest.wait_histograms
+metrics.gauge("skybot_rest_queue_depth", "Scheduled REST actions waiting, per priority (and in flight)", rest.depth)
+metrics.gauge("skybot_animations", "Animated responses running/waiting", animator.depth)
+metrics.gauge("skybot_animation_frames", "Animation frame counters", lambda: animator.stats)
+metrics.gauge("skybot_join_processor", "Welcome/autorole counters", lambda: join_processor.stats)
+metrics.gauge("skybot_modlog_entries", "Modlog entry counters", lambda: modlog.stats)
+metrics.instrument_tree(bot.tree)
+metrics.instrument_events(bot)
 
 # Run the bot
 if __name__ == '__main__':
@@ -1138,7 +1868,12 @@ if __name__ == '__main__':
         TOKEN = TOKEN.strip()
         if TOKEN.lower().startswith('bot '):
             TOKEN = TOKEN[4:].strip()
-    if TOKEN is None:
-        print('Error: DISCORD_TOKEN not found in environment variables')
-    else:
-        bot.run(TOKEN)
+    log_listener = setup_logging()
+    try:
+        if TOKEN is None:
+            log.error("DISCORD_TOKEN not found in environment variables")
+        else:
+            # Logging is configured above; don't let discord.py install its own handler
+            bot.run(TOKEN, log_handler=None)
+    finally:
+        log_listener.stop()
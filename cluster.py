@@ -0,0 +1,265 @@
+"""Multi-process sharded cluster mode.
+
+Run ``python cluster.py`` instead of ``python bot.py`` to start a supervisor
+that launches ``SKYBOT_CLUSTERS`` worker processes on this machine. Each
+worker is a normal ``bot.py`` running ``AutoShardedBot`` over a contiguous
+range of the ``SKYBOT_SHARD_COUNT`` shards (default: Discord's recommended
+count from ``GET /gateway/bot``).
+
+Every worker only receives events for guilds on its own shards, so the
+in-memory per-guild state (spam windows, raid windows, modlog queues, ...)
+is partitioned by shard for free. Persistent config is partitioned too:
+workers load and write only rows for guilds they own.
+
+Coordination happens through files in ``SKYBOT_CLUSTER_DIR``:
+
+- ``identify-<bucket>.lock``: Discord allows ``max_concurrency`` IDENTIFYs
+  per 5 seconds, one per bucket ``shard_id % max_concurrency``. Workers take
+  the bucket's lock and wait out the previous IDENTIFY before their own, so
+  all workers can start at once without tripping the limit.
+- ``worker-<id>.json``: each worker writes per-shard readiness and latency
+  every few seconds; the supervisor prints a summary and restarts workers
+  that exit.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from urllib import request
+
+try:
+    import fcntl
+except ImportError:  # Windows: cluster mode isn't supported, single-process mode still is
+    fcntl = None
+
+log = logging.getLogger("skybot.cluster")
+
+IDENTIFY_INTERVAL = 5.5  # seconds between IDENTIFYs per bucket (Discord: 5s, plus margin)
+STATUS_INTERVAL = 5.0
+
+
+def guild_shard(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+def parse_shard_ids(value: str) -> list[int]:
+    """'0-3' or '0,1,2,3' -> [0, 1, 2, 3]"""
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        ids.extend(range(int(start), int(end) + 1) if sep else [int(start)])
+    return ids
+
+
+class ShardPlan:
+    """The shard slice owned by this process (from the worker environment)."""
+
+    def __init__(self, shard_count: int | None = None, shard_ids: list[int] | None = None, cluster_id: int = 0,
+                 cluster_dir: str | None = None, max_concurrency: int = 1):
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.cluster_id = cluster_id
+        self.cluster_dir = cluster_dir
+        self.max_concurrency = max(1, max_concurrency)
+        self._owned = frozenset(shard_ids) if shard_ids is not None else None
+
+    @classmethod
+    def from_env(cls) -> "ShardPlan":
+        count = os.getenv("SKYBOT_SHARD_COUNT")
+        ids = os.getenv("SKYBOT_SHARD_IDS")
+        return cls(
+            shard_count=int(count) if count else None,
+            shard_ids=parse_shard_ids(ids) if ids else None,
+            cluster_id=int(os.getenv("SKYBOT_CLUSTER_ID", "0")),
+            cluster_dir=os.getenv("SKYBOT_CLUSTER_DIR"),
+            max_concurrency=int(os.getenv("SKYBOT_MAX_CONCURRENCY", "1")),
+        )
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count is not None
+
+    def owns_guild(self, guild_id: int) -> bool:
+        if self._owned is None or not self.shard_count:
+            return True
+        return guild_shard(guild_id, self.shard_count) in self._owned
+
+    def bot_options(self) -> dict:
+        if not self.sharded:
+            return {}
+        options = {"shard_count": self.shard_count}
+        if self.shard_ids is not None:
+            options["shard_ids"] = self.shard_ids
+        return options
+
+    def _wait_identify_slot(self, shard_id: int):
+        # Blocking: runs in a worker thread
+        bucket = shard_id % self.max_concurrency
+        path = os.path.join(self.cluster_dir, f"identify-{bucket}.lock")
+        with open(path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    last = float(f.read().strip() or 0)
+                except ValueError:
+                    last = 0.0
+                delay = last + IDENTIFY_INTERVAL - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                f.seek(0)
+                f.truncate()
+                f.write(str(time.time()))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    async def before_identify(self, shard_id: int | None, initial: bool):
+        if self.cluster_dir and fcntl is not None and shard_id is not None:
+            await asyncio.to_thread(self._wait_identify_slot, shard_id)
+        elif not initial:
+            await asyncio.sleep(5.0)
+
+    def write_status(self, bot, ready_shards: set):
+        if not self.cluster_dir:
+            return
+        shards = {}
+        for shard_id, info in getattr(bot, "shards", {}).items():
+            latency = info.latency
+            shards[str(shard_id)] = {
+                "ready": shard_id in ready_shards,
+                "closed": info.is_closed(),
+                "latency": latency if latency == latency and latency != float("inf") else None,
+            }
+        status = {"cluster_id": self.cluster_id, "pid": os.getpid(), "time": time.time(), "guilds": len(bot.guilds), "shards": shards}
+        path = os.path.join(self.cluster_dir, f"worker-{self.cluster_id}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp, path)
+
+
+def fetch_gateway_info(token: str) -> dict:
+    req = request.Request("https://discord.com/api/v10/gateway/bot", headers={
+        "Authorization": f"Bot {token}",
+        "User-Agent": "DiscordBot (sky-bot cluster, 1.0)",
+    })
+    with request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def split_shards(shard_count: int, workers: int) -> list[list[int]]:
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def _print_status(cluster_dir: str, workers: int):
+    lines = []
+    for cid in range(workers):
+        try:
+            with open(os.path.join(cluster_dir, f"worker-{cid}.json")) as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            lines.append(f"  worker {cid}: no status yet")
+            continue
+        age = time.time() - status["time"]
+        ready = sum(1 for s in status["shards"].values() if s["ready"])
+        parts = []
+        for sid, s in sorted(status["shards"].items(), key=lambda kv: int(kv[0])):
+            lat = f"{s['latency'] * 1000:.0f}ms" if s["latency"] is not None else "-"
+            parts.append(f"{sid}:{'ok' if s['ready'] and not s['closed'] else 'down'}/{lat}")
+        lines.append(f"  worker {cid} (pid {status['pid']}): {ready}/{len(status['shards'])} shards ready, "
+                     f"{status['guilds']} guilds, updated {age:.0f}s ago  [{' '.join(parts)}]")
+    log.info("Cluster status:\n%s", "\n".join(lines))
+
+
+def main():
+    from dotenv import load_dotenv
+    from logging_setup import setup_logging
+
+    load_dotenv()
+    listener = setup_logging()
+    token = (os.getenv("DISCORD_TOKEN") or "").strip()
+    if token.lower().startswith("bot "):
+        token = token[4:].strip()
+    if not token:
+        log.error("DISCORD_TOKEN not found in environment variables")
+        listener.stop()
+        sys.exit(2)
+
+    shard_count = os.getenv("SKYBOT_SHARD_COUNT")
+    max_concurrency = os.getenv("SKYBOT_MAX_CONCURRENCY")
+    if not shard_count or not max_concurrency:
+        info = fetch_gateway_info(token)
+        shard_count = shard_count or str(info["shards"])
+        max_concurrency = max_concurrency or str(info.get("session_start_limit", {}).get("max_concurrency", 1))
+    shard_count = int(shard_count)
+    ranges = split_shards(shard_count, int(os.getenv("SKYBOT_CLUSTERS", str(os.cpu_count() or 1))))
+    cluster_dir = os.path.abspath(os.getenv("SKYBOT_CLUSTER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cluster")))
+    os.makedirs(cluster_dir, exist_ok=True)
+    bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+    log.info("Starting %s worker(s) for %s shard(s), max_concurrency %s", len(ranges), shard_count, max_concurrency)
+
+    def spawn(cid: int) -> subprocess.Popen:
+        env = dict(os.environ,
+                   SKYBOT_SHARD_COUNT=str(shard_count),
+                   SKYBOT_SHARD_IDS=f"{ranges[cid][0]}-{ranges[cid][-1]}",
+                   SKYBOT_CLUSTER_ID=str(cid),
+                   SKYBOT_CLUSTER_DIR=cluster_dir,
+                   SKYBOT_MAX_CONCURRENCY=str(max_concurrency))
+        log.info("Worker %s: shards %s-%s", cid, ranges[cid][0], ranges[cid][-1])
+        return subprocess.Popen([sys.executable, bot_path], env=env)
+
+    procs = {cid: spawn(cid) for cid in range(len(ranges))}
+    restarts = {cid: 0 for cid in procs}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for p in procs.values():
+            if p.poll() is None:
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    last_report = 0.0
+    try:
+        while not stopping:
+            time.sleep(1)
+            for cid, p in list(procs.items()):
+                code = p.poll()
+                if code is not None and not stopping:
+                    restarts[cid] += 1
+                    backoff = min(60, 2 ** min(restarts[cid], 6))
+                    log.warning("Worker %s exited with %s; restarting in %ss", cid, code, backoff)
+                    time.sleep(backoff)
+                    procs[cid] = spawn(cid)
+            if time.monotonic() - last_report > 60:
+                last_report = time.monotonic()
+                _print_status(cluster_dir, len(ranges))
+    finally:
+        for p in procs.values():
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
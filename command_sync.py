@@ -0,0 +1,44 @@
+"""Sync the slash-command tree only when it actually changed.
+
+``tree.sync()`` re-uploads every command and is tightly rate limited, so the
+serialized tree is hashed and the hash of the last successful sync is kept
+(per target: 0 for global, otherwise the guild ID). A sync happens only
+when the hash differs or when forced.
+"""
+
+import hashlib
+import json
+import logging
+
+import discord
+
+log = logging.getLogger("skybot.command_sync")
+
+GLOBAL = 0
+
+
+def tree_fingerprint(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    payload = [command.to_dict() for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    # Include the application ID so switching bot tokens with the same database still syncs
+    app_id = getattr(getattr(tree, "client", None), "application_id", None)
+    blob = f"{app_id}:" + json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def sync_if_changed(tree, state: dict, guild: discord.abc.Snowflake | None = None, force: bool = False) -> bool:
+    """Sync the tree (globally or to one guild) if its fingerprint changed.
+
+    ``state`` maps target -> {"hash": str}; the caller persists it.
+    Returns True if a sync was performed.
+    """
+    target = guild.id if guild is not None else GLOBAL
+    where = f"guild {target}" if guild is not None else "global"
+    fingerprint = tree_fingerprint(tree, guild)
+    if not force and state.get(target, {}).get("hash") == fingerprint:
+        log.info("Command tree unchanged (%s, %s...), skipping sync", where, fingerprint[:12])
+        return False
+    synced = await tree.sync(guild=guild)
+    state[target] = {"hash": fingerprint}
+    log.info("Synced %s command(s) (%s, %s...)", len(synced), where, fingerprint[:12])
+    return True
@@ -0,0 +1,161 @@
+"""Persistent per-guild config for Sky Bot.
+
+The bot keeps its config in plain dicts (guild_settings, autorole_settings,
+log_channels, ...) so hot paths stay a single dict lookup. This module backs
+those dicts with a local SQLite file:
+
+- ``bind()`` registers a dict under a namespace
+- ``load_all()`` fills every bound dict from disk in one query at startup
+- ``mark_dirty()`` queues a (namespace, guild_id) for writing
+- a background task flushes queued rows in batches; the SQLite work runs in
+  a worker thread so the event loop never blocks on disk I/O
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+log = logging.getLogger("skybot.config_store")
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sky-bot.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_config (
+    namespace TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, guild_id)
+)
+"""
+
+
+class ConfigStore:
+    def __init__(self, path: str = DEFAULT_DB_PATH, flush_interval: float = 2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._maps = {}
+        self._dirty = set()
+        self._conn = None
+        # One connection shared by the worker thread; the lock keeps
+        # a flush and a shutdown flush from interleaving.
+        self._db_lock = threading.Lock()
+        self._flush_task = None
+        self._wakeup = None
+
+    def bind(self, namespace: str, mapping: dict):
+        self._maps[namespace] = mapping
+        return mapping
+
+    def _connect(self):
+        if self._conn is None:
+            # Cluster workers share the file; wait out another process's write instead of failing
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load_all(self, keep=None) -> int:
+        """Fill every bound dict from disk. Returns the number of rows loaded.
+
+        ``keep(namespace, guild_id)`` filters rows, e.g. to the guilds owned
+        by this cluster worker.
+        """
+        with self._db_lock:
+            rows = self._connect().execute("SELECT namespace, guild_id, value FROM guild_config").fetchall()
+        loaded = 0
+        for namespace, guild_id, value in rows:
+            mapping = self._maps.get(namespace)
+            if mapping is None or (keep is not None and not keep(namespace, guild_id)):
+                continue
+            try:
+                mapping[guild_id] = json.loads(value)
+                loaded += 1
+            except ValueError:
+                log.warning("Skipping corrupt row %s/%s", namespace, guild_id)
+        return loaded
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, namespace: str, guild_id: int):
+        # Called from command handlers: just record the key, never touch disk here.
+        self._dirty.add((namespace, guild_id))
+        if self._wakeup is not None and len(self._dirty) >= 256:
+            self._wakeup.set()
+
+    def _snapshot(self):
+        # Serialize on the event loop so the worker thread never reads
+        # dicts that handlers may be mutating.
+        dirty, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for namespace, guild_id in dirty:
+            mapping = self._maps.get(namespace)
+            value = mapping.get(guild_id) if mapping is not None else None
+            if value is None or value == {}:
+                deletes.append((namespace, guild_id))
+            else:
+                upserts.append((namespace, guild_id, json.dumps(value, separators=(",", ":"))))
+        return upserts, deletes
+
+    def _write(self, upserts, deletes):
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                if upserts:
+                    conn.executemany(
+                        "INSERT INTO guild_config (namespace, guild_id, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT(namespace, guild_id) DO UPDATE SET value = excluded.value",
+                        upserts,
+                    )
+                if deletes:
+                    conn.executemany("DELETE FROM guild_config WHERE namespace = ? AND guild_id = ?", deletes)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        upserts, deletes = self._snapshot()
+        try:
+            await asyncio.to_thread(self._write, upserts, deletes)
+        except Exception as e:
+            log.warning("Flush failed, will retry: %s", e)
+            for namespace, guild_id, _ in upserts:
+                self._dirty.add((namespace, guild_id))
+            self._dirty.update(deletes)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._flush_task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,138 @@
+"""Cross-channel duplicate-content detection for the message pipeline.
+
+Catches the raid pattern the per-author rate window misses: many accounts
+posting the same text or link, each staying under the spam limit, often
+spread over several channels.
+
+Each message's text is normalized (NFKC, casefold, format characters such
+as zero-width spaces dropped, whitespace collapsed) and hashed. Each guild
+keeps a bounded LRU of recent fingerprints, with the authors, channels and
+message IDs seen for each. A fingerprint is flagged once ``authors``
+different authors or ``channels`` different channels posted it within
+``window`` seconds. The first flag returns every matching author and
+message so they can be handled in one batch; later copies of a flagged
+fingerprint are returned one by one.
+
+Per message this is one dict probe plus amortized O(1) eviction, after
+normalizing the text (bounded by Discord's message length). Memory per
+guild is capped: at most ``max_fingerprints`` fingerprints, each keeping at
+most ``max_authors`` authors and ``max_messages`` message IDs per author.
+Short messages (under ``min_length`` normalized characters) are ignored so
+"gm" and "lol" never match.
+"""
+
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize(text: str) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+        # Drop zero-width and other format characters used to dodge exact matching
+        text = "".join(ch for ch in text if unicodedata.category(ch) != "Cf")
+    return " ".join(text.casefold().split())
+
+
+class _Fingerprint:
+    __slots__ = ("first_seen", "last_seen", "authors", "channels", "messages", "flagged")
+
+    def __init__(self, now: float):
+        self.first_seen = now
+        self.last_seen = now
+        # author ID -> member (the object handed back in a Flag)
+        self.authors = {}
+        self.channels = set()
+        # author ID -> [(channel_id, message_id)]
+        self.messages = {}
+        self.flagged = False
+
+
+class Flag:
+    __slots__ = ("authors", "messages", "batch")
+
+    def __init__(self, authors: list, messages: dict, batch: bool):
+        # Members/users who posted the content
+        self.authors = authors
+        # channel ID -> [message IDs] to remove
+        self.messages = messages
+        # True the first time a fingerprint is flagged (everyone seen so far)
+        self.batch = batch
+
+
+class DuplicateDetector:
+    def __init__(self, authors: int = 4, channels: int = 3, window: float = 30.0, min_length: int = 16,
+                 max_fingerprints: int = 1024, max_authors: int = 25, max_messages: int = 5):
+        self.authors = authors
+        self.channels = channels
+        self.window = window
+        self.min_length = min_length
+        self.max_fingerprints = max_fingerprints
+        self.max_authors = max_authors
+        self.max_messages = max_messages
+        # {guild_id: OrderedDict[fingerprint, _Fingerprint]}, least recently seen first
+        self._guilds = {}
+        self.stats = {"checked": 0, "flagged": 0, "flagged_messages": 0, "evicted": 0}
+
+    def __len__(self):
+        return sum(len(g) for g in self._guilds.values())
+
+    def forget(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def check(self, message, now: float | None = None) -> Flag | None:
+        content = message.content
+        if len(content) < self.min_length:
+            return None
+        text = normalize(content)
+        if len(text) < self.min_length:
+            return None
+        self.stats["checked"] += 1
+        now = time.monotonic() if now is None else now
+        recent = self._guilds.get(message.guild.id)
+        if recent is None:
+            recent = self._guilds[message.guild.id] = OrderedDict()
+        key = hash(text)
+        entry = recent.get(key)
+        # New, gone quiet, or (unless already flagged) trickling in too slowly to count: start over
+        if entry is None or now - entry.last_seen > self.window or (not entry.flagged and now - entry.first_seen > self.window):
+            entry = recent[key] = _Fingerprint(now)
+        recent.move_to_end(key)
+        entry.last_seen = now
+        self._evict(recent, now)
+
+        author = message.author
+        ref = (message.channel.id, message.id)
+        if entry.flagged:
+            self.stats["flagged_messages"] += 1
+            return Flag([author], {ref[0]: [ref[1]]}, batch=False)
+        if author.id not in entry.authors and len(entry.authors) < self.max_authors:
+            entry.authors[author.id] = author
+            entry.messages[author.id] = []
+        refs = entry.messages.get(author.id)
+        if refs is not None and len(refs) < self.max_messages:
+            refs.append(ref)
+        entry.channels.add(ref[0])
+        if len(entry.authors) < self.authors and len(entry.channels) < self.channels:
+            return None
+        entry.flagged = True
+        self.stats["flagged"] += 1
+        messages = {}
+        for refs in entry.messages.values():
+            for channel_id, message_id in refs:
+                messages.setdefault(channel_id, []).append(message_id)
+        self.stats["flagged_messages"] += sum(len(ids) for ids in messages.values())
+        flag = Flag(list(entry.authors.values()), messages, batch=True)
+        # The members and IDs are no longer needed once handed out
+        entry.authors.clear()
+        entry.messages.clear()
+        return flag
+
+    def _evict(self, recent: OrderedDict, now: float):
+        # Oldest first: drop anything stale, then enforce the cap
+        while recent:
+            oldest = next(iter(recent.values()))
+            if now - oldest.last_seen <= self.window and len(recent) <= self.max_fingerprints:
+                break
+            recent.popitem(last=False)
+            self.stats["evicted"] += 1
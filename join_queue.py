@@ -0,0 +1,200 @@
+"""Queued, coalescing processing of member joins.
+
+``on_member_join`` used to send the welcome embed and add the autorole
+inline, one REST call per join per action. ``JoinProcessor.submit()`` now
+just queues the work on the guild and returns:
+
+- welcomes: while a guild's join rate is at or below ``batch_rate`` joins
+  per ``rate_window`` seconds, each join gets its own welcome as before.
+  Above it, welcomes are collected for ``batch_delay`` seconds and sent as
+  one message ("Welcome A, B, C and 37 others")
+- autoroles: applied in join order; failures are retried with exponential
+  backoff. Members that left are dropped; anything else that still fails
+  after ``max_attempts`` (or is refused with 403) is handed to
+  ``on_failure`` so it ends up in the modlog instead of vanishing
+
+Each guild has at most one welcome and one autorole task, and all of them
+share ``workers`` slots, so a flood in one guild can't monopolise the
+bot's REST budget.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from rest_scheduler import NOTIFICATION, VERIFICATION, run_direct
+
+log = logging.getLogger("skybot.joins")
+
+
+class _GuildJoins:
+    __slots__ = ("guild", "welcomes", "roles", "window_start", "window_joins", "welcome_task", "role_task")
+
+    def __init__(self, guild):
+        self.guild = guild
+        # [(member, channel)]
+        self.welcomes = deque()
+        # [(member, role, attempt)]
+        self.roles = deque()
+        self.window_start = 0.0
+        self.window_joins = 0
+        self.welcome_task = None
+        self.role_task = None
+
+
+class JoinProcessor:
+    def __init__(self, welcome_payload, workers: int = 4, rate_window: float = 60.0, batch_delay: float = 5.0,
+                 max_attempts: int = 6, base_delay: float = 2.0, on_failure=None, scheduler=None):
+        # welcome_payload(guild, [members]) -> send() kwargs for one welcome message
+        self.welcome_payload = welcome_payload
+        self.rate_window = rate_window
+        self.batch_delay = batch_delay
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        # on_failure(member, role, error) for autoroles that could not be applied
+        self.on_failure = on_failure or (lambda member, role, error: None)
+        self._slots = asyncio.Semaphore(workers)
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+        self._guilds = {}
+        self._retries = set()
+        self._closing = False
+        self.stats = {"welcomes": 0, "welcome_sends": 0, "welcome_failed": 0,
+                      "autoroles": 0, "autorole_retries": 0, "autorole_failed": 0}
+
+    def depth(self) -> int:
+        return sum(len(g.welcomes) + len(g.roles) for g in self._guilds.values()) + len(self._retries)
+
+    def _guild(self, guild) -> _GuildJoins:
+        g = self._guilds.get(guild.id)
+        if g is None:
+            g = self._guilds[guild.id] = _GuildJoins(guild)
+        g.guild = guild
+        return g
+
+    def submit(self, member: discord.Member, welcome_channel=None, role: discord.Role | None = None, batch_rate: int = 0):
+        """Queue the welcome and/or autorole for one join. Never blocks.
+
+        ``batch_rate``: joins per ``rate_window`` above which welcomes are
+        batched (0 = never batch).
+        """
+        if self._closing:
+            return
+        g = self._guild(member.guild)
+        now = time.monotonic()
+        if now - g.window_start >= self.rate_window:
+            g.window_start = now
+            g.window_joins = 0
+        g.window_joins += 1
+        if welcome_channel is not None:
+            g.welcomes.append((member, welcome_channel))
+            if g.welcome_task is None:
+                batching = 0 < batch_rate < g.window_joins
+                g.welcome_task = asyncio.create_task(self._welcome_loop(g, self.batch_delay if batching else 0.0, batch_rate))
+        if role is not None:
+            g.roles.append((member, role, 1))
+            self._start_roles(g)
+
+    def _start_roles(self, g):
+        if g.role_task is None:
+            g.role_task = asyncio.create_task(self._role_loop(g))
+
+    async def _welcome_loop(self, g, delay: float, batch_rate: int):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            while g.welcomes:
+                channel = g.welcomes[0][1]
+                members = [g.welcomes.popleft()[0]]
+                if 0 < batch_rate < g.window_joins:
+                    # Batching: one message per channel; the channel can change between joins
+                    while g.welcomes and g.welcomes[0][1] == channel:
+                        members.append(g.welcomes.popleft()[0])
+                async with self._slots:
+                    try:
+                        await self._submit(NOTIFICATION, f"messages:{channel.id}", channel.send, **self.welcome_payload(g.guild, members))
+                        self.stats["welcome_sends"] += 1
+                        self.stats["welcomes"] += len(members)
+                        log.info("Sent welcome for %s member(s) in guild %s", len(members), g.guild.id)
+                    except Exception as e:
+                        self.stats["welcome_failed"] += len(members)
+                        log.warning("Failed to send welcome for %s member(s) in guild %s: %s", len(members), g.guild.id, e)
+                if g.welcomes and 0 < batch_rate < g.window_joins and not self._closing:
+                    # Still flooding: let the next batch build up
+                    await asyncio.sleep(self.batch_delay)
+        finally:
+            g.welcome_task = None
+            if g.welcomes and not self._closing:
+                g.welcome_task = asyncio.create_task(self._welcome_loop(g, 0.0, batch_rate))
+
+    async def _role_loop(self, g):
+        try:
+            while g.roles:
+                member, role, attempt = g.roles.popleft()
+                async with self._slots:
+                    await self._apply_role(g, member, role, attempt)
+        finally:
+            g.role_task = None
+            if g.roles and not self._closing:
+                self._start_roles(g)
+
+    async def _apply_role(self, g, member, role, attempt: int):
+        try:
+            await self._submit(VERIFICATION, f"roles:{g.guild.id}", member.add_roles, role, reason="Autorole on join")
+        except discord.NotFound:
+            # Member left (or the role was deleted): nothing left to do
+            log.info("Autorole %s for %s skipped: member or role is gone", role.id, member.id)
+            return
+        except discord.Forbidden as e:
+            self._fail(member, role, e)
+            return
+        except Exception as e:
+            if attempt >= self.max_attempts or self._closing:
+                self._fail(member, role, e)
+                return
+            delay = self.base_delay * 2 ** (attempt - 1)
+            self.stats["autorole_retries"] += 1
+            log.info("Autorole for %s in guild %s failed (%s), retry %s in %ss", member.id, g.guild.id, e, attempt, delay)
+            retry = asyncio.create_task(self._retry_later(g, (member, role, attempt + 1), delay))
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+            return
+        self.stats["autoroles"] += 1
+        log.info("Assigned autorole %s to %s", role.name, member)
+
+    async def _retry_later(self, g, job, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Shutting down: one last try instead of dropping it
+            member, role, _ = job
+            await self._apply_role(g, member, role, self.max_attempts)
+            raise
+        g.roles.append(job)
+        self._start_roles(g)
+
+    def _fail(self, member, role, error):
+        self.stats["autorole_failed"] += 1
+        log.warning("Giving up on autorole %s for %s in guild %s: %s", role.id, member.id, member.guild.id, error)
+        try:
+            self.on_failure(member, role, error)
+        except Exception as e:
+            log.warning("Autorole failure callback failed: %s", e)
+
+    async def drain(self, timeout: float = 10.0):
+        """Finish queued work (used at shutdown); unfinished autoroles are reported."""
+        self._closing = True
+        for task in list(self._retries):
+            task.cancel()
+        tasks = [t for g in self._guilds.values() for t in (g.welcome_task, g.role_task) if t is not None]
+        tasks += list(self._retries)
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        for g in self._guilds.values():
+            while g.roles:
+                member, role, _ = g.roles.popleft()
+                self._fail(member, role, "shutdown before it could be applied")
@@ -0,0 +1,98 @@
+"""Logging setup for Sky Bot.
+
+All bot code logs through ``logging.getLogger("skybot.<subsystem>")`` with
+%-style arguments, so nothing is formatted unless the record is actually
+emitted. Handlers never run on the event loop: records go onto a queue and
+a ``QueueListener`` thread formats them and writes to stdout.
+
+Environment variables:
+
+- ``SKYBOT_LOG_LEVEL``: root level (default INFO)
+- ``SKYBOT_LOG_LEVELS``: per-logger levels, e.g.
+  ``skybot.events=WARNING,skybot.antispam=DEBUG,discord=WARNING``
+- ``SKYBOT_LOG_JSON``: ``1`` to emit one JSON object per line
+- ``SKYBOT_LOG_SAMPLE``: keep only a fraction of sub-WARNING records from
+  busy loggers, e.g. ``skybot.events.reactions=0.01,skybot.events.members=0.1``
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """Pass every Nth sub-WARNING record; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.every:
+            return False
+        self._count += 1
+        return self._count % self.every == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats the message in the calling thread;
+    # here the record is queued untouched so the listener thread does it.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _parse_pairs(value: str) -> dict[str, str]:
+    pairs = {}
+    for item in (value or "").split(","):
+        name, sep, setting = item.partition("=")
+        if sep and name.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Configure logging from the environment. Returns the started listener (call .stop() at exit)."""
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv("SKYBOT_LOG_JSON", "").lower() in ("1", "true", "yes"):
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(os.getenv("SKYBOT_LOG_LEVEL", "INFO").upper())
+
+    for name, level in _parse_pairs(os.getenv("SKYBOT_LOG_LEVELS", "")).items():
+        try:
+            logging.getLogger(name).setLevel(level.upper())
+        except ValueError:
+            print(f"Ignoring invalid log level {level!r} for {name}", file=sys.stderr)
+    for name, rate in _parse_pairs(os.getenv("SKYBOT_LOG_SAMPLE", "")).items():
+        try:
+            logging.getLogger(name).addFilter(SampleFilter(float(rate)))
+        except ValueError:
+            print(f"Ignoring invalid sample rate {rate!r} for {name}", file=sys.stderr)
+
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,74 @@
+"""Lazy member lookup for low-memory mode.
+
+With startup chunking off and ``MemberCacheFlags.none()``, ``guild.get_member``
+usually misses. ``MemberResolver.resolve()`` falls back to a small LRU of
+recently fetched members and then to ``guild.fetch_member`` (one REST call).
+Concurrent lookups for the same member share one fetch, and entries expire
+after ``ttl`` seconds so role data doesn't go stale for long.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class MemberResolver:
+    def __init__(self, maxsize: int = 5000, ttl: float = 120.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # {(guild_id, user_id): (expires_at, member)}, oldest first
+        self._lru = OrderedDict()
+        self._inflight = {}
+        self.stats = {"cache_hits": 0, "lru_hits": 0, "fetches": 0}
+
+    def __len__(self):
+        return len(self._lru)
+
+    def remember(self, member: discord.Member):
+        key = (member.guild.id, member.id)
+        self._lru[key] = (time.monotonic() + self.ttl, member)
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def forget(self, guild_id: int, user_id: int):
+        self._lru.pop((guild_id, user_id), None)
+
+    def get_cached(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        member = guild.get_member(user_id)
+        if member is not None:
+            self.stats["cache_hits"] += 1
+            return member
+        key = (guild.id, user_id)
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, member = entry
+        if expires_at < time.monotonic():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        self.stats["lru_hits"] += 1
+        return member
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        member = self.get_cached(guild, user_id)
+        if member is not None:
+            return member
+        key = (guild.id, user_id)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(guild, user_id))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        self.stats["fetches"] += 1
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+        self.remember(member)
+        return member
@@ -0,0 +1,141 @@
+"""Table-driven "meter" fun commands (/femboymeter, /gaymeter, /ship, ...).
+
+Each meter is one ``Meter`` entry: score range, tier thresholds and a
+message template. bot.py registers a slash command per entry and sends
+every result through one shared path.
+
+Templates are ``str.format`` strings with these fields:
+
+- ``{target}``: mention of the subject (single-user meters)
+- ``{user1}``, ``{user2}``: mentions of both subjects (two-user meters)
+- ``{score}``: the score
+- ``{tier}``: text of the tier the score falls in
+- ``{bar}``: 10-segment bar from ``bar`` (filled, empty)
+
+Scores are random per call by default. In daily mode a score is a hash of
+(meter, user(s), UTC day), so asking again the same day gives the same
+answer; results are memoised in a small LRU.
+"""
+
+import hashlib
+import random
+import time
+from bisect import bisect_right
+from functools import lru_cache
+
+
+# Stand-ins for the user mentions while messages are pre-rendered per score
+_USER_FIELDS = {"target": "\x00target", "user1": "\x00user1", "user2": "\x00user2"}
+
+
+class Meter:
+    __slots__ = ("name", "description", "params", "template", "low", "high", "bounds", "tiers", "bar", "_rendered")
+
+    def __init__(self, name: str, description: str, params: dict, template: str, low: int = 1, high: int = 100,
+                 tiers: tuple = (), bar: tuple | None = None):
+        self.name = name
+        self.description = description
+        # {parameter name: description}; one entry per member parameter (1 or 2)
+        self.params = params
+        self.template = template
+        self.low = low
+        self.high = high
+        # tiers: ((lowest score, text), ...) ascending; the first entry should start at `low`
+        self.bounds = tuple(bound for bound, _ in tiers)
+        self.tiers = tuple(text for _, text in tiers)
+        self.bar = bar
+        # Everything but the mentions only depends on the score: render it once
+        self._rendered = [self._render(score) for score in range(low, high + 1)]
+
+    def tier(self, score: int) -> str:
+        if not self.tiers:
+            return ""
+        return self.tiers[max(0, bisect_right(self.bounds, score) - 1)]
+
+    def _render(self, score: int) -> str:
+        fields = dict(_USER_FIELDS, score=score, tier=self.tier(score))
+        if self.bar:
+            filled = score * 10 // (self.high or 1)
+            fields["bar"] = self.bar[0] * filled + self.bar[1] * (10 - filled)
+        return self.template.format(**fields)
+
+    def render(self, score: int, *users) -> str:
+        text = self._rendered[score - self.low]
+        if len(users) == 1:
+            return text.replace("\x00target", users[0].mention)
+        return text.replace("\x00user1", users[0].mention).replace("\x00user2", users[1].mention)
+
+
+METERS = (
+    Meter(
+        "femboymeter", "Scientifically calculate someone's femboy levels 🎀",
+        {"user": "The victim... I mean subject"},
+        "🎀 {target} is **{score}%** femboy!{tier}",
+        tiers=((1, ""), (51, " They are a femboy! 💖")),
+    ),
+    Meter(
+        "gaymeter", "Measure the rainbow levels 🌈 (totally legit science)",
+        {"user": "Your totally straight friend"},
+        "🌈 {target} is {score}% on the gay‑o‑meter — just for fun!",
+    ),
+    Meter(
+        "skidmeter", "Rate how much of a 💩 someone is (brutally honest)",
+        {"user": "The lucky participant"},
+        "💩 {target} is **{score}%** a skid not sigma!",
+    ),
+    Meter(
+        "uwumeter", "Check someone's UwU levels (OwO what's this?) 👉👈",
+        {"user": "The person to check"},
+        "💕 {target} is **{score}%** UwU!\n{tier}",
+        tiers=(
+            (1, "Barely any UwU energy... kinda sus ngl 😐"),
+            (30, "Moderate UwU vibes detected owo"),
+            (60, "HIGH UwU LEVELS!! They're dangerously cute!! >w<"),
+            (90, "🚨 MAXIMUM UwU OVERLOAD!! *notices your bulge* OwO 🚨"),
+        ),
+    ),
+    Meter(
+        "touch", "Check if someone needs to touch grass 🌱",
+        {"user": "The terminally online suspect"},
+        "🌱 **Touch Grass Meter: {score}%**\n{target} {tier}",
+        tiers=(
+            (1, "is SEVERELY grass-deficient!! 🚨\n**Prescription:** Go outside IMMEDIATELY!"),
+            (20, "needs to touch grass soon... ⚠️\nIt's been a while, hasn't it?"),
+            (50, "touches grass occasionally. Acceptable. ✅"),
+            (80, "is a certified grass-toucher!! 🌿\nTeach us your ways, master!"),
+        ),
+    ),
+    Meter(
+        "ship", "Ship two users together and show a compatibility score! (For science, and maybe a little chaos)",
+        {"user1": "First user to ship", "user2": "Second user to ship"},
+        "{user1} + {user2} = {score}%\n{bar}\n{tier}",
+        low=0,
+        tiers=(
+            (0, "Better luck next time! 😅"),
+            (31, "Could work out... maybe! 🤔"),
+            (51, "There's definitely a spark! ✨"),
+            (81, "A match made in heaven! 💍"),
+        ),
+        bar=("💖", "💔"),
+    ),
+)
+
+
+@lru_cache(maxsize=4096)
+def _daily_score(meter: Meter, user_ids: tuple, day: int) -> int:
+    subject = ":".join(map(str, user_ids))
+    digest = hashlib.blake2b(f"{meter.name}:{subject}:{day}".encode(), digest_size=8).digest()
+    return meter.low + int.from_bytes(digest, "big") % (meter.high - meter.low + 1)
+
+
+def score(meter: Meter, user_ids: tuple, daily: bool = False) -> int:
+    if not daily:
+        return random.randint(meter.low, meter.high)
+    if len(user_ids) > 1:
+        # Order-independent, so /ship A B == /ship B A
+        user_ids = tuple(sorted(user_ids))
+    return _daily_score(meter, user_ids, int(time.time() // 86400))
+
+
+def cache_info():
+    return _daily_score.cache_info()
@@ -0,0 +1,156 @@
+"""In-process metrics with a Prometheus text endpoint.
+
+Every slash command callback and every ``@bot.event`` handler is wrapped to
+record a call count, an error count and a latency histogram. Recording is a
+``perf_counter()`` pair, a ``bisect`` and a few integer adds, cheap enough
+to leave on in production.
+
+Gauges (gateway latency, cache sizes, queue depths) are callbacks evaluated
+only when the endpoint is scraped. The endpoint is a small aiohttp server,
+started only when a port is configured.
+"""
+
+import functools
+import logging
+import time
+from bisect import bisect_left
+
+from aiohttp import web
+
+log = logging.getLogger("skybot.metrics")
+
+# Seconds; tuned for Discord REST round trips (tens to hundreds of ms)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# family -> (histogram name, errors name, label, histogram help, errors help)
+FAMILIES = {
+    "command": ("skybot_command_latency_seconds", "skybot_command_errors_total", "command",
+                "Command handler latency", "Command handlers that raised"),
+    "event": ("skybot_event_latency_seconds", "skybot_event_errors_total", "event",
+              "Event handler latency", "Event handlers that raised"),
+    "rest_wait": ("skybot_rest_queue_wait_seconds", "skybot_rest_errors_total", "priority",
+                  "Time REST actions waited in the scheduler", "Scheduled REST actions that raised"),
+}
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "errors")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; cumulated at render time
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    def __init__(self):
+        # {metric family: {label value: Histogram}}
+        self.histograms = {family: {} for family in FAMILIES}
+        self._gauges = []
+        self._runner = None
+
+    def histogram(self, family: str, name: str) -> Histogram:
+        hists = self.histograms[family]
+        hist = hists.get(name)
+        if hist is None:
+            hist = hists[name] = Histogram()
+        return hist
+
+    def gauge(self, name: str, help_text: str, fn):
+        """Register a gauge. fn() returns a number or a {label_value: number} dict (label "name")."""
+        self._gauges.append((name, help_text, fn))
+
+    def wrap(self, family: str, name: str, coro_func):
+        hist = self.histogram(family, name)
+
+        @functools.wraps(coro_func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await coro_func(*args, **kwargs)
+            except Exception:
+                hist.errors += 1
+                raise
+            finally:
+                hist.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def instrument_tree(self, tree):
+        """Wrap every registered app command callback."""
+        for command in tree.walk_commands():
+            callback = getattr(command, "_callback", None)
+            if callback is not None and not getattr(callback, "_skybot_metrics", False):
+                wrapped = self.wrap("command", command.qualified_name, callback)
+                wrapped._skybot_metrics = True
+                command._callback = wrapped
+
+    def instrument_events(self, client):
+        """Wrap every on_* handler registered with @client.event."""
+        for name, handler in list(vars(client).items()):
+            if name.startswith("on_") and callable(handler) and not getattr(handler, "_skybot_metrics", False):
+                wrapped = self.wrap("event", name, handler)
+                wrapped._skybot_metrics = True
+                setattr(client, name, wrapped)
+
+    def render(self) -> str:
+        out = []
+        for family, (hname, ename, label, hhelp, ehelp) in FAMILIES.items():
+            hists = self.histograms[family]
+            out.append(f"# HELP {hname} {hhelp}")
+            out.append(f"# TYPE {hname} histogram")
+            for name, hist in sorted(hists.items()):
+                lv = _escape(name)
+                cumulative = 0
+                for bound, count in zip(hist.bounds, hist.counts):
+                    cumulative += count
+                    out.append(f'{hname}_bucket{{{label}="{lv}",le="{bound}"}} {cumulative}')
+                out.append(f'{hname}_bucket{{{label}="{lv}",le="+Inf"}} {hist.count}')
+                out.append(f'{hname}_sum{{{label}="{lv}"}} {hist.sum:.6f}')
+                out.append(f'{hname}_count{{{label}="{lv}"}} {hist.count}')
+            out.append(f"# HELP {ename} {ehelp}")
+            out.append(f"# TYPE {ename} counter")
+            for name, hist in sorted(hists.items()):
+                out.append(f'{ename}{{{label}="{_escape(name)}"}} {hist.errors}')
+        for name, help_text, fn in self._gauges:
+            try:
+                value = fn()
+            except Exception as e:
+                log.debug("Gauge %s failed: %s", name, e)
+                continue
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                for key, v in value.items():
+                    out.append(f'{name}{{name="{_escape(key)}"}} {float(v)}')
+            elif value is not None:
+                out.append(f"{name} {float(value)}")
+        return "\n".join(out) + "\n"
+
+    async def _handle(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info("Serving metrics on http://%s:%s/metrics", host, port)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
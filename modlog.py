@@ -0,0 +1,166 @@
+"""Batched, non-blocking modlog delivery.
+
+``ModLog.log()`` appends an entry to the guild's queue and returns
+immediately. A per-guild flusher wakes up after ``flush_interval`` and packs
+everything queued into as few sends as possible: multi-line text messages
+(up to 2000 chars), or up to 10 embeds per message when ``embeds`` is on.
+
+Queues are bounded; when one is full the entry is dropped and counted, and
+the next batch reports how many were lost. ``drain()`` flushes whatever is
+left at shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from rest_scheduler import NOTIFICATION, run_direct
+
+log = logging.getLogger("skybot.modlog")
+
+MAX_MESSAGE_CHARS = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBED_TOTAL = 6000
+
+
+class _GuildLog:
+    __slots__ = ("guild", "entries", "dropped", "task", "sending")
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.entries = deque()
+        self.dropped = 0
+        self.task = None
+        # True once the flusher is past its sleep and sending
+        self.sending = False
+
+
+class ModLog:
+    def __init__(self, resolve_channel, flush_interval: float = 2.0, capacity: int = 500, embeds: bool = False, scheduler=None):
+        # resolve_channel(guild) -> channel or None, looked up once per batch
+        self.resolve_channel = resolve_channel
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.embeds = embeds
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+        self._guilds = {}
+        self._closing = False
+        self.stats = {"queued": 0, "sent_entries": 0, "sends": 0, "dropped": 0, "failed": 0}
+
+    def depth(self) -> int:
+        return sum(len(g.entries) for g in self._guilds.values())
+
+    def log(self, guild, message: str):
+        """Queue one log line for a guild. Never blocks and never raises."""
+        if guild is None or self._closing:
+            return
+        g = self._guilds.get(guild.id)
+        if g is None:
+            g = self._guilds[guild.id] = _GuildLog(guild)
+        if len(g.entries) >= self.capacity:
+            g.dropped += 1
+            self.stats["dropped"] += 1
+        else:
+            g.entries.append((time.time(), message))
+            self.stats["queued"] += 1
+        if g.task is None:
+            g.task = asyncio.create_task(self._flush_later(g))
+
+    async def _flush_later(self, g):
+        try:
+            await asyncio.sleep(self.flush_interval)
+            g.sending = True
+            await self._flush(g)
+        finally:
+            g.task = None
+            g.sending = False
+            if (g.entries or g.dropped) and not self._closing:
+                # More arrived while sending
+                g.task = asyncio.create_task(self._flush_later(g))
+
+    def _take_lines(self, g, max_chars: int) -> tuple[list[str], int]:
+        lines = []
+        taken = 0
+        size = 0
+        if g.dropped:
+            note = f"⚠️ {g.dropped} log entr{'y' if g.dropped == 1 else 'ies'} dropped (log queue full)"
+            g.dropped = 0
+            lines.append(note)
+            size = len(note) + 1
+        while g.entries:
+            ts, message = g.entries[0]
+            line = f"<t:{int(ts)}:T> {message}"
+            if len(line) > max_chars:
+                line = line[:max_chars - 1] + "…"
+            if lines and size + len(line) + 1 > max_chars:
+                break
+            g.entries.popleft()
+            lines.append(line)
+            size += len(line) + 1
+            taken += 1
+        return lines, taken
+
+    def _build_payload(self, g) -> tuple[int, dict]:
+        if not self.embeds:
+            lines, taken = self._take_lines(g, MAX_MESSAGE_CHARS - len("[LOG] "))
+            return taken, {"content": "[LOG] " + "\n".join(lines)}
+        embeds = []
+        count = 0
+        total = 0
+        while (g.entries or g.dropped) and len(embeds) < MAX_EMBEDS:
+            budget = min(MAX_EMBED_DESCRIPTION, MAX_EMBED_TOTAL - total - 10)
+            if budget < 200:
+                break
+            lines, taken = self._take_lines(g, budget)
+            description = "\n".join(lines)
+            total += len(description) + 3
+            count += taken
+            embeds.append(discord.Embed(title="Log" if not embeds else None, description=description, color=discord.Color.dark_grey()))
+        return count, {"embeds": embeds}
+
+    async def _flush(self, g):
+        guild = g.guild
+        channel = self.resolve_channel(guild)
+        if channel is None:
+            # Nowhere to log: discard instead of holding memory
+            g.entries.clear()
+            g.dropped = 0
+            return
+        while g.entries or g.dropped:
+            count, payload = self._build_payload(g)
+            try:
+                await self._submit(NOTIFICATION, f"messages:{channel.id}", channel.send, allowed_mentions=discord.AllowedMentions.none(), **payload)
+                self.stats["sends"] += 1
+                self.stats["sent_entries"] += count
+            except Exception as e:
+                self.stats["failed"] += count
+                log.warning("Failed to send %s log entr%s in guild %s: %s", count, 'y' if count == 1 else 'ies', guild.id, e)
+                if isinstance(e, discord.Forbidden):
+                    g.entries.clear()
+                    return
+
+    async def drain(self, timeout: float = 5.0):
+        """Flush all pending entries now (used at shutdown)."""
+        self._closing = True
+        flushes = []
+        for g in self._guilds.values():
+            if g.task is not None and g.sending:
+                # Mid-send: its batch is already off the queue, so let it finish
+                # (it keeps going until the queue is empty)
+                flushes.append(g.task)
+                continue
+            if g.task is not None:
+                g.task.cancel()
+                g.task = None
+            if g.entries or g.dropped:
+                flushes.append(self._flush(g))
+        if not flushes:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*flushes, return_exceptions=True), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Drain timed out with %s entries unsent", self.depth())
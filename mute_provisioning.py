@@ -0,0 +1,135 @@
+"""Mute role lookup and background channel-overwrite provisioning.
+
+The anti-spam mute needs a role that is denied Send Messages in every
+channel. Creating the role is one REST call and happens inline; writing the
+per-channel overwrites can be hundreds of calls, so it runs as a background
+job per guild:
+
+- only channels whose overwrite differs are written, so re-running a job is
+  cheap and a job interrupted by a restart simply picks up where it left off
+- each guild job runs a few workers at most, and only a few guild jobs run
+  at once, so provisioning never hogs the bot's REST budget. Each
+  set_permissions call is its own per-channel route bucket; discord.py waits
+  out those buckets, and 429s that still surface are retried after
+  retry_after
+- the role ID and a "complete" flag are kept per guild (persisted by the
+  caller) so lookups are a dict probe and unfinished jobs resume on startup
+"""
+
+import asyncio
+import logging
+
+import discord
+
+from rest_scheduler import MODERATION, run_direct
+
+log = logging.getLogger("skybot.mute")
+
+
+class MuteProvisioner:
+    def __init__(self, role_name: str, state: dict | None = None, workers_per_guild: int = 3, max_jobs: int = 2, on_change=None, scheduler=None):
+        self.role_name = role_name
+        # {guild_id: {"role_id": int, "complete": bool}}
+        self.state = state if state is not None else {}
+        self.workers_per_guild = workers_per_guild
+        self._job_slots = asyncio.Semaphore(max_jobs)
+        self._jobs = {}
+        self._rerun = set()
+        self._role_locks = {}
+        # Called with guild_id whenever self.state changes (e.g. to persist it)
+        self._on_change = on_change or (lambda guild_id: None)
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+
+    def _set_state(self, guild_id: int, **values):
+        self.state.setdefault(guild_id, {}).update(values)
+        self._on_change(guild_id)
+
+    def cached_role(self, guild: discord.Guild) -> discord.Role | None:
+        conf = self.state.get(guild.id)
+        return guild.get_role(conf["role_id"]) if conf else None
+
+    async def get_or_create_role(self, guild: discord.Guild) -> discord.Role:
+        role = self.cached_role(guild)
+        if role is not None:
+            return role
+        lock = self._role_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            role = self.cached_role(guild)
+            if role is not None:
+                return role
+            # First spam event in this guild (or the role was deleted): one scan, then cached
+            role = discord.utils.get(guild.roles, name=self.role_name)
+            if role is None:
+                role = await self._submit(MODERATION, f"roles:{guild.id}", guild.create_role, name=self.role_name, reason="Anti-spam mute")
+            self._set_state(guild.id, role_id=role.id, complete=False)
+        self.schedule(guild)
+        return role
+
+    def schedule(self, guild: discord.Guild):
+        """Start (or queue a re-run of) the overwrite job for a guild. Never blocks."""
+        task = self._jobs.get(guild.id)
+        if task is not None and not task.done():
+            self._rerun.add(guild.id)
+            return
+        self._jobs[guild.id] = asyncio.create_task(self._run(guild))
+
+    def resume(self, guilds):
+        """Re-schedule jobs left incomplete by a previous run."""
+        for guild in guilds:
+            conf = self.state.get(guild.id)
+            if conf and not conf.get("complete"):
+                self.schedule(guild)
+
+    def pending(self) -> int:
+        return sum(1 for task in self._jobs.values() if not task.done())
+
+    @staticmethod
+    def needs_overwrite(channel, role) -> bool:
+        return channel.overwrites_for(role).send_messages is not False
+
+    async def apply(self, channel, role) -> bool:
+        """Deny Send Messages for the role in one channel if not already denied."""
+        overwrite = channel.overwrites_for(role)
+        if overwrite.send_messages is False:
+            return False
+        overwrite.send_messages = False
+        for attempt in range(5):
+            try:
+                await self._submit(MODERATION, f"channels:{channel.guild.id}", channel.set_permissions, role, overwrite=overwrite, reason="Anti-spam mute role")
+                return True
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == 4:
+                    raise
+                await asyncio.sleep(getattr(e, "retry_after", None) or 2 ** attempt)
+        return False
+
+    async def _run(self, guild: discord.Guild):
+        async with self._job_slots:
+            while True:
+                self._rerun.discard(guild.id)
+                role = self.cached_role(guild)
+                if role is None:
+                    return
+                channels = [ch for ch in guild.channels if self.needs_overwrite(ch, role)]
+                queue = asyncio.Queue()
+                for ch in channels:
+                    queue.put_nowait(ch)
+                failures = []
+
+                async def worker():
+                    while not queue.empty():
+                        ch = queue.get_nowait()
+                        try:
+                            await self.apply(ch, role)
+                        except Exception as e:
+                            failures.append((ch, e))
+
+                await asyncio.gather(*(worker() for _ in range(min(self.workers_per_guild, len(channels)))))
+                if failures:
+                    log.warning("Guild %s: %s/%s channel overwrite(s) failed, e.g. %s", guild.id, len(failures), len(channels), failures[0][1])
+                else:
+                    log.info("Guild %s: provisioned %s channel(s) for mute role", guild.id, len(channels))
+                if guild.id not in self._rerun:
+                    # Failed channels stay incomplete and are retried on the next run
+                    self._set_state(guild.id, complete=not failures)
+                    return
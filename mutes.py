@@ -0,0 +1,204 @@
+"""Anti-spam mutes: native timeouts or the Muted role, with escalating durations.
+
+Two modes per guild:
+
+- ``timeout`` (default): Discord's member timeout, one REST call per mute.
+  Discord lifts it by itself and it covers channels created later. If the
+  bot isn't allowed to time the member out (missing Moderate Members, or
+  the member is above the bot), that mute falls back to the role
+- ``role``: the Muted role from ``MuteProvisioner`` (per-channel
+  overwrites, provisioned in the background). The bot lifts it when the
+  mute expires
+
+Repeat offenders get longer mutes: the n-th strike uses ``ladder[n - 1]``
+(the last rung repeats). Strikes are forgotten ``reset_after`` seconds
+after the last one.
+
+Every mute is kept in ``state`` (persisted by the caller) as
+``{guild_id: {user_id (str): {"strikes", "last", "until", "mode"}}}``, and
+two things per entry are driven by one ``TimerWheel``: lifting a role mute
+at ``until`` and dropping the entry once its strikes reset. ``resume()``
+re-arms those timers after a restart, so overdue role mutes are lifted on
+startup.
+"""
+
+import datetime
+import logging
+import time
+
+import discord
+
+from rest_scheduler import MODERATION, run_direct
+from timer_wheel import TimerWheel
+
+log = logging.getLogger("skybot.mutes")
+
+TIMEOUT = "timeout"
+ROLE = "role"
+MODES = (TIMEOUT, ROLE)
+# 1 min, 5 min, 15 min, 1 h, 6 h, 1 day
+DEFAULT_LADDER = (60, 300, 900, 3600, 6 * 3600, 86400)
+# Discord's limit for a member timeout
+MAX_TIMEOUT = 28 * 86400
+LIFT_RETRY = 60.0
+# Give up lifting a role mute after this many failed attempts (about 30 minutes)
+LIFT_ATTEMPTS = 30
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+class Mute:
+    __slots__ = ("mode", "duration", "strikes")
+
+    def __init__(self, mode: str, duration: float, strikes: int):
+        self.mode = mode
+        self.duration = duration
+        self.strikes = strikes
+
+
+class MuteManager:
+    def __init__(self, provisioner, state: dict | None = None, settings: dict | None = None, resolve_guild=None,
+                 resolve_member=None, on_change=None, ladder=DEFAULT_LADDER, reset_after: float = 86400.0,
+                 scheduler=None, wheel: TimerWheel | None = None):
+        self.provisioner = provisioner
+        # {guild_id: {user_id (str): {"strikes": int, "last": epoch, "until": epoch, "mode": str}}}
+        self.state = state if state is not None else {}
+        # {guild_id: {"mode": str}}
+        self.settings = settings if settings is not None else {}
+        self.resolve_guild = resolve_guild or (lambda guild_id: None)
+        # async (guild, user_id) -> Member | None
+        self.resolve_member = resolve_member
+        self._on_change = on_change or (lambda guild_id: None)
+        self.ladder = tuple(ladder)
+        self.reset_after = reset_after
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+        self.wheel = wheel if wheel is not None else TimerWheel(self._expire)
+        self.stats = {"timeouts": 0, "role_mutes": 0, "fallbacks": 0, "lifted": 0, "lift_failures": 0}
+
+    def mode(self, guild_id: int) -> str:
+        return self.settings.get(guild_id, {}).get("mode", TIMEOUT)
+
+    def pending(self) -> int:
+        return len(self.wheel)
+
+    def duration(self, strikes: int) -> float:
+        return self.ladder[min(strikes, len(self.ladder)) - 1]
+
+    def muted_until(self, guild_id: int, user_id: int) -> float:
+        entry = self.state.get(guild_id, {}).get(str(user_id))
+        return entry["until"] if entry else 0.0
+
+    async def mute(self, member: discord.Member, reason: str = "Spamming") -> Mute | None:
+        """Mute for the member's next strike; None if they are still muted."""
+        guild = member.guild
+        now = time.time()
+        users = self.state.setdefault(guild.id, {})
+        entry = users.get(str(member.id))
+        if entry and entry["until"] > now:
+            # Messages that were already in flight when the mute landed
+            return None
+        strikes = entry["strikes"] + 1 if entry and now - entry["last"] < self.reset_after else 1
+        duration = self.duration(strikes)
+        mode = self.mode(guild.id)
+        # Recorded before the REST calls so concurrent spam from the same author doesn't mute twice
+        current = users[str(member.id)] = {"strikes": strikes, "last": now, "until": now + duration, "mode": mode}
+        try:
+            if mode == TIMEOUT:
+                try:
+                    await self._submit(MODERATION, f"members:{guild.id}", member.timeout,
+                                       datetime.timedelta(seconds=min(duration, MAX_TIMEOUT)), reason=reason)
+                    self.stats["timeouts"] += 1
+                except discord.Forbidden as e:
+                    log.info("Can't time out %s in guild %s (%s); using the mute role", member.id, guild.id, e)
+                    self.stats["fallbacks"] += 1
+                    mode = current["mode"] = ROLE
+            if mode == ROLE:
+                role = await self.provisioner.get_or_create_role(guild)
+                await self._submit(MODERATION, f"roles:{guild.id}", member.add_roles, role, reason=reason)
+                self.stats["role_mutes"] += 1
+        except BaseException:
+            if entry is None:
+                users.pop(str(member.id), None)
+            else:
+                users[str(member.id)] = entry
+            raise
+        self._on_change(guild.id)
+        self._arm(guild.id, member.id)
+        return Mute(mode, duration, strikes)
+
+    def _arm(self, guild_id: int, user_id: int):
+        entry = self.state.get(guild_id, {}).get(str(user_id))
+        if entry is None:
+            self.wheel.cancel((guild_id, user_id))
+            return
+        lift_pending = entry["mode"] == ROLE and entry["until"] > 0
+        when = entry["until"] if lift_pending else entry["last"] + self.reset_after
+        self.wheel.schedule((guild_id, user_id), when)
+
+    def resume(self, guild_ids):
+        """Re-arm timers for persisted mutes (after a restart)."""
+        count = 0
+        for guild_id in guild_ids:
+            for user_id in list(self.state.get(guild_id, {})):
+                self._arm(guild_id, int(user_id))
+                count += 1
+        if count:
+            log.info("Resumed %s pending mute expiry timer(s)", count)
+
+    async def _expire(self, key, attempts):
+        guild_id, user_id = key
+        users = self.state.get(guild_id)
+        entry = users.get(str(user_id)) if users else None
+        if entry is None:
+            return
+        now = time.time()
+        if entry["mode"] == ROLE and 0 < entry["until"] <= now:
+            if not await self._lift(guild_id, user_id):
+                # Guild not available yet (e.g. still starting up) or Discord
+                # errored: try again shortly
+                attempts = (attempts or 0) + 1
+                if attempts < LIFT_ATTEMPTS:
+                    self.wheel.schedule(key, now + LIFT_RETRY, attempts)
+                    return
+                log.warning("Giving up lifting the mute for %s in guild %s after %s attempts", user_id, guild_id, attempts)
+            entry["until"] = 0.0
+        if now - entry["last"] >= self.reset_after:
+            del users[str(user_id)]
+            if not users:
+                del self.state[guild_id]
+        self._on_change(guild_id)
+        self._arm(guild_id, user_id)
+
+    async def _lift(self, guild_id: int, user_id: int) -> bool:
+        """Remove the mute role; False if it should be retried later."""
+        guild = self.resolve_guild(guild_id)
+        if guild is None:
+            return False
+        role = self.provisioner.cached_role(guild)
+        if role is None:
+            # Role deleted: nothing to lift
+            return True
+        try:
+            member = await self.resolve_member(guild, user_id) if self.resolve_member else guild.get_member(user_id)
+            if member is None:
+                # Member left
+                return True
+            await self._submit(MODERATION, f"roles:{guild_id}", member.remove_roles, role, reason="Mute expired")
+            self.stats["lifted"] += 1
+            log.info("Lifted mute for %s in guild %s", user_id, guild_id)
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            self.stats["lift_failures"] += 1
+            log.warning("Failed to lift mute for %s in guild %s: %s", user_id, guild_id, e)
+            return False
+        return True
+
+    async def close(self):
+        await self.wheel.close()
@@ -0,0 +1,174 @@
+"""Message purges for /purge: streaming history scan plus bulk deletes.
+
+A ``PurgeJob`` describes what to remove (authors, a substring, bots only,
+messages after a point in time) across one or more channels, and carries
+live counters for progress reports and a cancel flag. ``Purger.run()``
+works through its channels (a few at once):
+
+- history is streamed newest first with ``channel.history()``, which pages
+  100 messages at a time, so nothing is materialized beyond one page
+- matching messages younger than Discord's 14-day bulk-delete limit are
+  removed with the bulk endpoint, 100 per request
+- older ones can only be deleted one by one; that fallback is paced to one
+  every ``old_interval`` seconds on top of discord.py's 429 handling
+- pinned messages are never removed
+
+Deletes go through the REST scheduler (``messages:<channel>`` route,
+moderation priority) when one is given.
+"""
+
+import asyncio
+import datetime
+import logging
+
+import discord
+
+from rest_scheduler import MODERATION, run_direct
+
+log = logging.getLogger("skybot.purge")
+
+BULK_MAX = 100
+# Discord rejects bulk deletes of messages older than 14 days; keep a margin
+# for messages that age past it while a purge runs
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+OLD_DELETE_INTERVAL = 1.0
+
+
+class PurgeJob:
+    def __init__(self, channels: list, user_ids=None, contains: str | None = None, bots: bool = False,
+                 after: datetime.datetime | None = None, limit: int = 100, scan_limit: int | None = None,
+                 reason: str | None = None):
+        self.channels = channels
+        self.user_ids = frozenset(user_ids) if user_ids else None
+        self.contains = contains.casefold() if contains else None
+        self.bots = bots
+        self.after = after
+        # Most messages to delete (all channels together)
+        self.limit = limit
+        # Most messages to read per channel (None: everything after ``after``)
+        self.scan_limit = scan_limit
+        self.reason = reason
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.old_deleted = 0
+        self.failed = 0
+        self.channels_done = 0
+        self.skipped_channels = []
+        self.finished = False
+        self._cancelled = asyncio.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def matches(self, message: discord.Message) -> bool:
+        if message.pinned:
+            return False
+        if self.user_ids is not None and message.author.id not in self.user_ids:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.contains is not None and self.contains not in message.content.casefold():
+            return False
+        return True
+
+    def _stop(self) -> bool:
+        return self.cancelled or self.matched >= self.limit
+
+
+class Purger:
+    def __init__(self, scheduler=None, old_interval: float = OLD_DELETE_INTERVAL, concurrency: int = 4):
+        self._submit = scheduler.submit if scheduler is not None else run_direct
+        self.old_interval = old_interval
+        self.concurrency = concurrency
+        self.stats = {"jobs": 0, "bulk_requests": 0, "deleted": 0, "old_deleted": 0, "failed": 0}
+
+    async def run(self, job: PurgeJob) -> PurgeJob:
+        self.stats["jobs"] += 1
+        limiter = asyncio.Semaphore(self.concurrency)
+
+        async def one(channel):
+            async with limiter:
+                if not job._stop():
+                    await self._channel(job, channel)
+                job.channels_done += 1
+
+        try:
+            await asyncio.gather(*(one(channel) for channel in job.channels))
+        finally:
+            job.finished = True
+        return job
+
+    async def _channel(self, job: PurgeJob, channel):
+        bulk_cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        batch = []
+        try:
+            async for message in channel.history(limit=job.scan_limit, after=job.after, oldest_first=False):
+                if job._stop():
+                    break
+                job.scanned += 1
+                if not job.matches(message):
+                    continue
+                job.matched += 1
+                if message.created_at > bulk_cutoff:
+                    batch.append(message)
+                    if len(batch) >= BULK_MAX:
+                        await self._bulk(job, channel, batch)
+                        batch = []
+                else:
+                    # Newest first: everything from here on is too old for the bulk endpoint
+                    if batch:
+                        await self._bulk(job, channel, batch)
+                        batch = []
+                    await self._old(job, channel, message)
+            if batch and not job.cancelled:
+                await self._bulk(job, channel, batch)
+        except discord.Forbidden as e:
+            log.info("Purge skipped #%s (%s): %s", getattr(channel, "name", channel.id), channel.id, e)
+            job.skipped_channels.append(channel)
+
+    async def _bulk(self, job: PurgeJob, channel, batch: list):
+        try:
+            # delete_messages() uses the single-delete endpoint for a batch of one
+            await self._submit(MODERATION, f"messages:{channel.id}", channel.delete_messages, batch, reason=job.reason)
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            # e.g. one of them was deleted meanwhile: fall back to one by one
+            log.info("Bulk delete of %s in %s failed (%s); deleting individually", len(batch), channel.id, e)
+            for message in batch:
+                await self._single(job, channel, message)
+            return
+        self.stats["bulk_requests"] += 1
+        job.deleted += len(batch)
+        self.stats["deleted"] += len(batch)
+
+    async def _single(self, job: PurgeJob, channel, message) -> bool:
+        try:
+            await self._submit(MODERATION, f"messages:{channel.id}", message.delete)
+        except discord.NotFound:
+            return False
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            log.warning("Failed to delete message %s in %s: %s", message.id, channel.id, e)
+            job.failed += 1
+            self.stats["failed"] += 1
+            return False
+        job.deleted += 1
+        self.stats["deleted"] += 1
+        return True
+
+    async def _old(self, job: PurgeJob, channel, message):
+        if await self._single(job, channel, message):
+            job.old_deleted += 1
+            self.stats["old_deleted"] += 1
+        # Old-message deletes have a much tighter rate limit than bulk deletes
+        try:
+            await asyncio.wait_for(job._cancelled.wait(), self.old_interval)
+        except asyncio.TimeoutError:
+            pass
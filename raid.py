@@ -0,0 +1,133 @@
+"""Per-guild join-flood (raid) detection.
+
+Each guild keeps a ring buffer of its last ``limit`` join timestamps, so a
+join costs O(1) no matter how large the burst is. When ``limit`` earlier
+joins plus the current one fall inside ``window`` seconds, the guild enters
+raid mode. Raid mode ends once ``cooldown`` seconds pass without another
+tripping join; every tripping join during a raid pushes the end back.
+
+What the bot does while a guild is in raid mode is configured per guild:
+
+- ``pause_autorole``: skip autorole on join
+- ``skip_welcome``: skip welcome embeds
+- ``alert``: post to the modlog when raid mode starts and ends
+"""
+
+import time
+from array import array
+
+DEFAULTS = {
+    "enabled": True,
+    "limit": 5,
+    "window": 10.0,
+    "cooldown": 120.0,
+    "pause_autorole": False,
+    "skip_welcome": True,
+    "alert": True,
+}
+
+# Transitions returned by RaidDetector.record_join()
+NORMAL = 0
+STARTED = 1
+ONGOING = 2
+ENDED = 3
+
+
+class _GuildRaidState:
+    __slots__ = ("joins", "head", "raid_until", "raid_started", "raid_joins")
+
+    def __init__(self, limit: int):
+        self.joins = array("d", (float("-inf"),) * limit)
+        self.head = 0
+        self.raid_until = 0.0
+        self.raid_started = 0.0
+        self.raid_joins = 0
+
+
+class RaidDetector:
+    def __init__(self, default_limit: int, default_window: float, settings: dict | None = None):
+        self.defaults = dict(DEFAULTS, limit=default_limit, window=float(default_window))
+        # {guild_id: {key: value}} holding only overrides of DEFAULTS (persisted by the caller)
+        self.settings = settings if settings is not None else {}
+        self._states = {}
+
+    def get(self, guild_id: int, key: str):
+        conf = self.settings.get(guild_id)
+        if conf is not None and key in conf:
+            return conf[key]
+        return self.defaults[key]
+
+    def config(self, guild_id: int) -> dict:
+        return dict(self.defaults, **self.settings.get(guild_id, {}))
+
+    def update(self, guild_id: int, **changes):
+        """Apply overrides; ``None`` values (options left unset) are ignored."""
+        old_limit = self.get(guild_id, "limit")
+        conf = self.settings.setdefault(guild_id, {})
+        for key, value in changes.items():
+            if value is None:
+                continue
+            if value == self.defaults[key]:
+                conf.pop(key, None)
+            else:
+                conf[key] = value
+        if not conf:
+            del self.settings[guild_id]
+        state = self._states.get(guild_id)
+        limit = self.get(guild_id, "limit")
+        if state is not None and limit != old_limit:
+            # The ring buffer is sized for the old limit; keep any raid in
+            # progress so it still ends (and alerts) through expire()
+            state.joins = array("d", (float("-inf"),) * limit)
+            state.head = 0
+
+    def in_raid(self, guild_id: int, now: float | None = None) -> bool:
+        state = self._states.get(guild_id)
+        if state is None or not state.raid_until:
+            return False
+        return (time.monotonic() if now is None else now) < state.raid_until
+
+    def record_join(self, guild_id: int, now: float | None = None) -> tuple[int, int]:
+        """Record one join. Returns (transition, joins counted during the current/last raid)."""
+        if not self.get(guild_id, "enabled"):
+            return NORMAL, 0
+        if now is None:
+            now = time.monotonic()
+        state = self._states.get(guild_id)
+        if state is None:
+            state = self._states[guild_id] = _GuildRaidState(self.get(guild_id, "limit"))
+        joins = state.joins
+        tripped = now - joins[state.head] <= self.get(guild_id, "window")
+        joins[state.head] = now
+        state.head = (state.head + 1) % len(joins)
+
+        if tripped:
+            if state.raid_until:
+                # Still flooding: extend (or resume, if the expiry sweep hasn't run yet)
+                transition = ONGOING
+            else:
+                transition = STARTED
+                state.raid_started = now
+                state.raid_joins = 0
+            state.raid_until = now + self.get(guild_id, "cooldown")
+        elif state.raid_until:
+            if now < state.raid_until:
+                transition = ONGOING
+            else:
+                state.raid_until = 0.0
+                return ENDED, state.raid_joins
+        else:
+            return NORMAL, 0
+        state.raid_joins += 1
+        return transition, state.raid_joins
+
+    def expire(self, now: float | None = None) -> list[tuple[int, int, float]]:
+        """End raids whose cool-down has passed. Returns [(guild_id, joins, duration)]."""
+        if now is None:
+            now = time.monotonic()
+        ended = []
+        for guild_id, state in self._states.items():
+            if state.raid_until and now >= state.raid_until:
+                ended.append((guild_id, state.raid_joins, state.raid_until - state.raid_started))
+                state.raid_until = 0.0
+        return ended
@@ -0,0 +1,140 @@
+"""Per-(guild, user) sliding rate windows for the anti-spam check.
+
+Each author gets a fixed-size ring buffer of their last ``limit`` message
+timestamps stored in an ``array('d')`` (no per-timestamp float objects).
+Slot 0 holds the ring head; slots 1..limit hold timestamps. A message trips
+the limit when the oldest remembered timestamp is still inside the window,
+i.e. ``limit`` earlier messages plus this one all fall within ``window``.
+
+Entries idle for longer than their window carry no state worth keeping, so
+a periodic sweeper evicts them and memory tracks active authors only.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+
+log = logging.getLogger("skybot.antispam")
+
+_NEG_INF = float("-inf")
+
+
+class _GuildWindows:
+    __slots__ = ("users", "limit", "window", "blank")
+
+    def __init__(self, limit: int, window: float):
+        self.users = {}
+        self.limit = limit
+        self.window = window
+        # Template copied for each new author (head slot + limit timestamps)
+        self.blank = array("d", (0.0,) + (_NEG_INF,) * limit)
+
+
+class RateWindows:
+    def __init__(self, default_limit: int, default_window: float, limits: dict | None = None):
+        self.default_limit = default_limit
+        self.default_window = default_window
+        # {guild_id: {"limit": int, "window": float}} (persisted by the caller)
+        self.limits = limits if limits is not None else {}
+        # {guild_id: _GuildWindows}
+        self._windows = {}
+        self._sweep_task = None
+
+    def get_limits(self, guild_id: int) -> tuple[int, float]:
+        conf = self.limits.get(guild_id)
+        if conf:
+            return conf.get("limit", self.default_limit), conf.get("window", self.default_window)
+        return self.default_limit, self.default_window
+
+    def set_limits(self, guild_id: int, limit: int, window: float):
+        self.limits[guild_id] = {"limit": limit, "window": window}
+        # Existing buffers are sized for the old limit
+        self._windows.pop(guild_id, None)
+
+    def reset_limits(self, guild_id: int):
+        self.limits.pop(guild_id, None)
+        self._windows.pop(guild_id, None)
+
+    def _guild(self, guild_id: int) -> _GuildWindows:
+        limit, window = self.get_limits(guild_id)
+        g = self._windows[guild_id] = _GuildWindows(limit, window)
+        return g
+
+    def hit(self, guild_id: int, user_id: int, now: float | None = None) -> bool:
+        """Record one message. Returns True if the author exceeded the guild's limit."""
+        if now is None:
+            now = time.monotonic()
+        g = self._windows.get(guild_id) or self._guild(guild_id)
+        users = g.users
+        buf = users.get(user_id)
+        if buf is None:
+            buf = users[user_id] = g.blank[:]
+            buf[1] = now
+            buf[0] = 1 % g.limit
+            return False
+        head = int(buf[0])
+        if now - buf[head + 1] <= g.window:
+            # Tripped: drop the window so the same burst is acted on once
+            del users[user_id]
+            return True
+        buf[head + 1] = now
+        head += 1
+        buf[0] = head if head < g.limit else 0
+        return False
+
+    def forget(self, guild_id: int, user_id: int):
+        g = self._windows.get(guild_id)
+        if g is not None:
+            g.users.pop(user_id, None)
+
+    def drop_guild(self, guild_id: int):
+        self._windows.pop(guild_id, None)
+
+    def __len__(self):
+        return sum(len(g.users) for g in self._windows.values())
+
+    async def sweep(self, now: float | None = None, chunk: int = 10000) -> int:
+        """Evict authors whose newest message is older than their guild's window."""
+        if now is None:
+            now = time.monotonic()
+        evicted = 0
+        for guild_id in list(self._windows):
+            g = self._windows.get(guild_id)
+            if g is None:
+                continue
+            users = g.users
+            limit = g.limit
+            cutoff = now - g.window
+            user_ids = list(users)
+            for start in range(0, len(user_ids), chunk):
+                for user_id in user_ids[start:start + chunk]:
+                    buf = users.get(user_id)
+                    if buf is None:
+                        continue
+                    newest = buf[(int(buf[0]) - 1) % limit + 1]
+                    if newest < cutoff:
+                        del users[user_id]
+                        evicted += 1
+                # Yield between chunks so a large sweep never stalls the gateway
+                await asyncio.sleep(0)
+            if not users and self._windows.get(guild_id) is g:
+                del self._windows[guild_id]
+        return evicted
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                log.warning("Sweep failed: %s", e)
+
+    def start(self, interval: float = 60.0):
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop(interval))
+
+    def stop(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
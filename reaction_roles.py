@@ -0,0 +1,110 @@
+"""Reaction-role lookup for on_raw_reaction_add / on_raw_reaction_remove.
+
+Raw reaction events fire for every reaction the bot can see, so the handlers
+must reject non-panel reactions as cheaply as possible. All panels of all
+guilds are flattened into one dict keyed by (message_id, emoji key); a
+reaction that isn't a panel reaction costs exactly one dict probe.
+
+Two config sources feed the index:
+
+- ``autorole_settings[guild]["verification"]``: the ✅ verification message
+  (role is granted on react and kept on unreact, as before)
+- ``panels[guild]``: reaction-role panels,
+  ``{message_id (str): {"channel_id": int, "roles": {emoji key (str): role_id}}}``;
+  unreacting removes the role
+"""
+
+import discord
+
+VERIFY_EMOJI = "✅"
+
+
+def emoji_key(emoji) -> str:
+    """Stable key for a PartialEmoji/Emoji/str: custom emoji by ID, unicode by text."""
+    emoji_id = getattr(emoji, "id", None)
+    if emoji_id:
+        return str(emoji_id)
+    return getattr(emoji, "name", None) or str(emoji)
+
+
+class RoleAction:
+    __slots__ = ("guild_id", "channel_id", "role_id", "revoke", "reason")
+
+    def __init__(self, guild_id: int, channel_id: int, role_id: int, revoke: bool, reason: str):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.role_id = role_id
+        self.revoke = revoke
+        self.reason = reason
+
+
+class ReactionRoleIndex:
+    def __init__(self, autorole_settings: dict, panels: dict):
+        self.autorole_settings = autorole_settings
+        self.panels = panels
+        # {(message_id, emoji key): RoleAction}
+        self._index = {}
+        # {guild_id: [index keys]} so one guild can be rebuilt on its own
+        self._by_guild = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def match(self, message_id: int, emoji) -> RoleAction | None:
+        # Unicode emoji have no ID; custom emoji are keyed by ID
+        emoji_id = emoji.id
+        return self._index.get((message_id, str(emoji_id) if emoji_id else emoji.name))
+
+    def rebuild_all(self):
+        self._index.clear()
+        self._by_guild.clear()
+        for guild_id in set(self.autorole_settings) | set(self.panels):
+            self.rebuild(guild_id)
+
+    def rebuild(self, guild_id: int):
+        for key in self._by_guild.pop(guild_id, ()):
+            self._index.pop(key, None)
+        keys = []
+        verification = self.autorole_settings.get(guild_id, {}).get("verification")
+        if verification and verification.get("message_id"):
+            key = (verification["message_id"], VERIFY_EMOJI)
+            self._index[key] = RoleAction(guild_id, verification["channel_id"], verification["role_id"], False, "Verified via reaction")
+            keys.append(key)
+        for message_id, panel in self.panels.get(guild_id, {}).items():
+            for emoji, role_id in panel.get("roles", {}).items():
+                key = (int(message_id), emoji)
+                self._index[key] = RoleAction(guild_id, panel["channel_id"], role_id, True, "Reaction role")
+                keys.append(key)
+        if keys:
+            self._by_guild[guild_id] = keys
+
+    def add(self, guild_id: int, channel_id: int, message_id: int, emoji, role_id: int):
+        guild_panels = self.panels.setdefault(guild_id, {})
+        panel = guild_panels.setdefault(str(message_id), {"channel_id": channel_id, "roles": {}})
+        panel["roles"][emoji_key(emoji)] = role_id
+        self.rebuild(guild_id)
+
+    def remove(self, guild_id: int, message_id: int, emoji=None) -> bool:
+        """Remove one emoji from a panel, or the whole panel when emoji is None."""
+        guild_panels = self.panels.get(guild_id, {})
+        panel = guild_panels.get(str(message_id))
+        if panel is None:
+            return False
+        if emoji is None:
+            del guild_panels[str(message_id)]
+        else:
+            if panel["roles"].pop(emoji_key(emoji), None) is None:
+                return False
+            if not panel["roles"]:
+                del guild_panels[str(message_id)]
+        if not guild_panels:
+            self.panels.pop(guild_id, None)
+        self.rebuild(guild_id)
+        return True
+
+
+def format_emoji(guild: discord.Guild, key: str) -> str:
+    if key.isdigit():
+        emoji = guild.get_emoji(int(key)) if guild else None
+        return str(emoji) if emoji else f"<:emoji:{key}>"
+    return key
@@ -0,0 +1,96 @@
+"""Pack N repeats of a message into as few Discord messages as possible.
+
+Used by /raiz and /raizv2 for both the public follow-ups and the ephemeral
+preview. Repeats are joined with newlines; every payload holds whole
+repeats only, and the counts per payload are exact (they don't depend on
+how many newlines the message itself contains).
+
+Lengths are measured in UTF-16 code units, which is never less than the
+code point count, so payloads with emoji or other astral characters still
+fit Discord's 2000-character limit whichever way it is counted. A single
+repeat longer than the limit is cut (at a code point boundary, with "…")
+and sent one per payload.
+"""
+
+MAX_MESSAGE_CHARS = 2000
+MAX_FOLLOWUPS = 5  # follow-ups allowed per interaction for this command
+
+
+def text_length(text: str) -> int:
+    """Length as counted in UTF-16 code units."""
+    return len(text) + sum(1 for ch in text if ord(ch) > 0xFFFF)
+
+
+def truncate(text: str, limit: int, ellipsis: str = "…") -> str:
+    if text_length(text) <= limit:
+        return text
+    budget = limit - text_length(ellipsis)
+    out = []
+    used = 0
+    for ch in text:
+        size = 2 if ord(ch) > 0xFFFF else 1
+        if used + size > budget:
+            break
+        out.append(ch)
+        used += size
+    return "".join(out) + ellipsis
+
+
+class Packing:
+    __slots__ = ("payloads", "counts", "requested")
+
+    def __init__(self, payloads: list[str], counts: list[int], requested: int):
+        self.payloads = payloads
+        # Exact number of repeats in each payload
+        self.counts = counts
+        self.requested = requested
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def complete(self) -> bool:
+        return self.total >= self.requested
+
+
+def pack_repeats(message: str, times: int, max_payloads: int = MAX_FOLLOWUPS, limit: int = MAX_MESSAGE_CHARS,
+                 sep: str = "\n") -> Packing:
+    """Fit ``times`` repeats into the fewest payloads of at most ``limit`` chars.
+
+    Uses at most ``max_payloads`` payloads; if the repeats don't all fit,
+    as many as possible are packed and ``Packing.complete`` is False.
+    """
+    if times <= 0 or max_payloads <= 0:
+        return Packing([], [], times)
+    unit = text_length(message)
+    gap = text_length(sep)
+    # k repeats take k * unit + (k - 1) * gap
+    per_payload = (limit + gap) // (unit + gap) if unit + gap else times
+    if per_payload == 0:
+        message = truncate(message, limit)
+        per_payload = 1
+    fit = min(times, per_payload * max_payloads)
+    payloads = []
+    counts = []
+    left = fit
+    while left:
+        count = min(per_payload, left)
+        payloads.append(sep.join([message] * count))
+        counts.append(count)
+        left -= count
+    return Packing(payloads, counts, times)
+
+
+def preview(message: str, times: int, limit: int = 1900, sep: str = "\n") -> tuple[str, int]:
+    """One payload with as many whole repeats as fit, plus a note if some didn't.
+
+    Returns (text, repeats shown).
+    """
+    packing = pack_repeats(message, times, max_payloads=1, limit=limit, sep=sep)
+    if not packing.payloads or packing.complete:
+        return (packing.payloads[0] if packing.payloads else ""), packing.total
+    # Make room for the note and pack again
+    room = text_length(f"{sep}… (+{times} more)")
+    packing = pack_repeats(message, times, max_payloads=1, limit=max(1, limit - room), sep=sep)
+    return packing.payloads[0] + f"{sep}… (+{times - packing.total} more)", packing.total
@@ -0,0 +1,378 @@
+"""Offline gateway-event replay: recording, fake REST and an in-process replayer.
+
+Lets on_message, on_member_join, the reaction handlers and slash commands be
+load-tested without a Discord connection.
+
+File format: gzip-compressed text. The first line is a JSON header
+(``{"format": "skybot-replay", "version": 1}``); every other line is one
+gateway dispatch::
+
+    <ms since previous event>\\t<EVENT TYPE>\\t<compact JSON payload>
+
+Events are written in arrival order, so repeated payload shapes (same
+guild, channel and author fields) compress well.
+
+- ``GatewayRecorder`` writes live dispatches to a file (bot.py attaches it
+  when ``SKYBOT_RECORD_EVENTS`` is set; recordings contain message content)
+- ``FakeRest`` replaces discord.py's HTTP and interaction-webhook requests:
+  every call is recorded, answered with a plausible payload after a
+  simulated latency, and per-route buckets produce 429s that are waited out
+  the way discord.py does
+- ``Replayer`` feeds events through discord.py's own gateway parsers, so
+  handlers see the same objects as in production, and times every handler
+  the parsers dispatch (including slash commands through the command tree)
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter
+
+import discord
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+log = logging.getLogger("skybot.replay")
+
+HEADER = {"format": "skybot-replay", "version": 1}
+# Dispatches worth replaying; READY is reduced to the bot user
+RECORDED_EVENTS = frozenset({
+    "READY", "GUILD_CREATE", "GUILD_MEMBER_ADD", "GUILD_MEMBER_REMOVE", "MESSAGE_CREATE", "MESSAGE_DELETE",
+    "MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE", "INTERACTION_CREATE", "CHANNEL_CREATE",
+})
+
+
+def write_events(path: str, events) -> int:
+    """Write ``(seconds, type, payload)`` tuples (absolute times, ascending); returns the count."""
+    count = 0
+    last = None
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(HEADER) + "\n")
+        for at, event_type, data in events:
+            delta = 0 if last is None else max(0, round((at - last) * 1000))
+            last = at
+            f.write(f"{delta}\t{event_type}\t{json.dumps(data, separators=(',', ':'), ensure_ascii=False)}\n")
+            count += 1
+    return count
+
+
+def read_events(path: str):
+    """Yield ``(seconds since the first event, type, payload)``."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != HEADER["format"] or header.get("version") != HEADER["version"]:
+            raise ValueError(f"{path} is not a version {HEADER['version']} replay file")
+        at = 0.0
+        for line in f:
+            delta, event_type, data = line.rstrip("\n").split("\t", 2)
+            at += int(delta) / 1000
+            yield at, event_type, json.loads(data)
+
+
+class GatewayRecorder:
+    """Append live gateway dispatches to a replay file.
+
+    Needs ``enable_debug_events=True`` on the client; register
+    ``on_socket_raw_receive`` as a listener.
+    """
+
+    def __init__(self, path: str, events=RECORDED_EVENTS):
+        self.path = path
+        self.events = events
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(json.dumps(HEADER) + "\n")
+        self._last = None
+        self.count = 0
+
+    async def on_socket_raw_receive(self, msg):
+        if self._file is None or not isinstance(msg, dict) or msg.get("op") != 0:
+            return
+        event_type = msg.get("t")
+        if event_type not in self.events:
+            return
+        data = msg.get("d")
+        if event_type == "READY":
+            data = {"user": data.get("user")}
+        now = time.monotonic()
+        delta = 0 if self._last is None else round((now - self._last) * 1000)
+        self._last = now
+        self._file.write(f"{delta}\t{event_type}\t{json.dumps(data, separators=(',', ':'), ensure_ascii=False)}\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.info("Recorded %s gateway event(s) to %s", self.count, self.path)
+
+
+class RestCall:
+    __slots__ = ("at", "method", "path", "route", "status", "waited")
+
+    def __init__(self, at: float, method: str, path: str, route: str, status: int, waited: float):
+        self.at = at
+        self.method = method
+        self.path = path
+        self.route = route
+        self.status = status
+        self.waited = waited
+
+
+# Fake response shapes, by route template
+_MESSAGE_ROUTES = re.compile(r"/messages(/@original|/\{message_id\})?$|^/webhooks/\{webhook_id\}/\{webhook_token\}$")
+
+
+class FakeRest:
+    """Stands in for Discord's REST API.
+
+    ``latency`` is the median response time; the spread is log-normal with
+    sigma ``jitter``. Each route bucket (method, path template and major
+    parameters, like discord.py's) allows ``limit`` calls per ``per``
+    seconds (the default is Discord's global 50/s; real per-route buckets
+    are often 5 per 5s); ``route_limits`` overrides that per path template. A call over
+    the limit is answered with a 429, waited out and retried, and both
+    attempts are recorded.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, limit: int = 50, per: float = 1.0,
+                 route_limits: dict | None = None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.limit = limit
+        self.per = per
+        self.route_limits = route_limits or {}
+        self._random = random.Random(seed)
+        # bucket -> [remaining, reset_at]
+        self._buckets = {}
+        self._ids = 1 << 60
+        self.user = None
+        # Interaction token -> channel ID, for follow-up message payloads
+        self.interaction_channels = {}
+        self.calls = []
+        self._saved = None
+
+    def install(self, bot):
+        """Route ``bot``'s HTTP requests and every interaction webhook request here."""
+        self.user = bot._connection.user
+        fake = self
+
+        async def http_request(route, *, files=None, form=None, **kwargs):
+            return await fake.request(route, kwargs.get("json"))
+
+        async def webhook_request(adapter, route, session, *, payload=None, **kwargs):
+            return await fake.request(route, payload)
+
+        self._saved = (bot.http, bot.http.__dict__.get("request"), AsyncWebhookAdapter.request)
+        bot.http.request = http_request
+        AsyncWebhookAdapter.request = webhook_request
+
+    def uninstall(self):
+        if self._saved is None:
+            return
+        http, request, webhook_request = self._saved
+        if request is None:
+            del http.request
+        else:
+            http.request = request
+        AsyncWebhookAdapter.request = webhook_request
+        self._saved = None
+
+    def _next_id(self) -> str:
+        self._ids += 1
+        return str(self._ids)
+
+    def _delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        return self.latency * math.exp(self._random.gauss(0, self.jitter))
+
+    async def request(self, route, payload):
+        bucket_key = f"{route.key}:{route.major_parameters}"
+        limit, per = self.route_limits.get(route.path, (self.limit, self.per))
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None or bucket[1] <= now:
+                bucket = self._buckets[bucket_key] = [limit, now + per]
+            if bucket[0] > 0:
+                bucket[0] -= 1
+                break
+            # 429: discord.py sleeps for retry_after and tries again
+            retry_after = bucket[1] - now
+            self.calls.append(RestCall(now, route.method, route.path, bucket_key, 429, waited))
+            await asyncio.sleep(retry_after)
+            waited += retry_after
+        await asyncio.sleep(self._delay())
+        self.calls.append(RestCall(time.monotonic(), route.method, route.path, bucket_key, 200, waited))
+        return self._response(route, payload or {})
+
+    def _response(self, route, payload: dict):
+        path = route.path
+        if _MESSAGE_ROUTES.search(path):
+            channel_id = route.channel_id or self.interaction_channels.get(route.webhook_token) or "0"
+            return self._message(str(channel_id), payload)
+        if route.method == "POST" and path == "/guilds/{guild_id}/roles":
+            return {"id": self._next_id(), "name": payload.get("name", "role"), "permissions": str(payload.get("permissions", 0)),
+                    "position": 1, "color": 0, "hoist": False, "managed": False, "mentionable": False}
+        if route.method in ("GET", "PATCH") and path == "/guilds/{guild_id}/members/{user_id}":
+            user_id = route.url.rsplit("/", 1)[-1]
+            return {"user": {"id": user_id, "username": f"u{user_id}", "discriminator": "0", "avatar": None},
+                    "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0,
+                    "communication_disabled_until": payload.get("communication_disabled_until")}
+        if route.method == "GET" and path.endswith("/messages"):
+            return []
+        return None
+
+    def _message(self, channel_id: str, payload: dict) -> dict:
+        return {
+            "id": self._next_id(), "channel_id": channel_id, "content": payload.get("content") or "",
+            "author": {"id": str(self.user.id) if self.user else "1", "username": "bot", "discriminator": "0", "avatar": None, "bot": True},
+            "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": [], "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [], "pinned": False, "type": 0, "flags": payload.get("flags", 0),
+        }
+
+    def summary(self) -> dict:
+        ok = [c for c in self.calls if c.status == 200]
+        return {
+            "calls": len(ok),
+            "rate_limited": len(self.calls) - len(ok),
+            "waited": sum(c.waited for c in ok),
+            "by_route": Counter(f"{c.method} {c.path}" for c in ok),
+        }
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Replayer:
+    """Feed gateway events into ``bot`` in-process and time its handlers.
+
+    GUILD_CREATE and READY populate the cache directly (no chunking, no
+    on_ready); every other event goes through discord.py's parser for it.
+    Handlers run as concurrent tasks, as they would live.
+    """
+
+    def __init__(self, bot, rest: FakeRest):
+        self.bot = bot
+        self.rest = rest
+        self.state = bot._connection
+        self.timings = []
+        self.errors = 0
+        self._tasks = set()
+
+    async def install(self):
+        bot = self.bot
+        # What login() would do: bind the client to the running loop
+        await bot._async_setup_hook()
+        bot._ready.set()
+        replayer = self
+
+        def schedule_event(coro, event_name, *args, **kwargs):
+            # _run_event reports handler errors to on_error; count them on the way
+            async def counted(*args, **kwargs):
+                try:
+                    return await coro(*args, **kwargs)
+                except Exception:
+                    replayer.errors += 1
+                    raise
+            return replayer._spawn(bot._run_event(counted, event_name, *args, **kwargs))
+
+        def from_interaction(interaction):
+            async def invoke():
+                try:
+                    await bot.tree._call(interaction)
+                except discord.app_commands.AppCommandError as e:
+                    replayer.errors += 1
+                    await bot.tree._dispatch_error(interaction, e)
+            replayer._spawn(invoke())
+
+        bot._schedule_event = schedule_event
+        bot.tree._from_interaction = from_interaction
+
+    def uninstall(self):
+        self.bot.__dict__.pop("_schedule_event", None)
+        self.bot.tree.__dict__.pop("_from_interaction", None)
+
+    def _spawn(self, coro):
+        async def timed():
+            start = time.perf_counter()
+            try:
+                await coro
+            except Exception:
+                self.errors += 1
+                log.exception("Handler failed during replay")
+            finally:
+                self.timings.append(time.perf_counter() - start)
+        task = asyncio.get_running_loop().create_task(timed())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def feed(self, event_type: str, data: dict) -> bool:
+        """Process one dispatch; returns False if the type isn't handled."""
+        state = self.state
+        if event_type == "READY":
+            state.user = discord.ClientUser(state=state, data=data["user"])
+            self.rest.user = state.user
+            return True
+        if event_type == "GUILD_CREATE":
+            state._add_guild_from_data(data)
+            return True
+        if event_type == "INTERACTION_CREATE" and data.get("channel_id"):
+            self.rest.interaction_channels[data["token"]] = data["channel_id"]
+        parser = state.parsers.get(event_type)
+        if parser is None:
+            return False
+        parser(data)
+        return True
+
+    async def run(self, events, speed: float | None = None, settle: float = 0.5, max_settle: float = 30.0) -> dict:
+        """Replay ``events`` (``(seconds, type, payload)``); ``speed=None`` is as fast as possible.
+
+        Afterwards waits for handler tasks, then until no REST call has been
+        made for ``settle`` seconds (background queues draining), at most
+        ``max_settle``.
+        """
+        fed = skipped = 0
+        first = None
+        start = time.monotonic()
+        for at, event_type, data in events:
+            if speed:
+                first = at if first is None else first
+                delay = (at - first) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if self.feed(event_type, data):
+                fed += 1
+            else:
+                skipped += 1
+            if fed % 256 == 0:
+                # Let handlers run, as the gateway reader would between frames
+                await asyncio.sleep(0)
+        fed_at = time.monotonic()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        handled_at = time.monotonic()
+        deadline = handled_at + max_settle
+        while time.monotonic() < deadline:
+            last_call = self.rest.calls[-1].at if self.rest.calls else handled_at
+            if time.monotonic() - last_call >= settle and not self._tasks:
+                break
+            await asyncio.sleep(settle / 5)
+        return {
+            "events": fed,
+            "skipped": skipped,
+            "feed_seconds": fed_at - start,
+            "handled_seconds": handled_at - start,
+            "settled_seconds": time.monotonic() - start,
+        }
@@ -0,0 +1,123 @@
+"""Priority-aware scheduling of outbound REST actions.
+
+discord.py waits out rate limits per route bucket, but it serves callers in
+whatever order they arrive, so a burst of fun-command edits can sit in front
+of a ban or a mute. Actions that matter go through ``RestScheduler.submit()``
+instead of awaiting the REST call directly:
+
+- a global cap on in-flight actions (``max_inflight``); when it is reached,
+  waiters are granted strictly by priority class (``MODERATION`` first,
+  ``FUN`` last), FIFO within a class
+- a per-route cap: ``route`` is ``"<kind>:<id>"`` (e.g. ``"roles:<guild>"``,
+  ``"messages:<channel>"``) and ``route_limits[kind]`` bounds how many
+  actions on one route run at once, so one channel can't eat every slot
+- per-priority wait-time histograms and queue depths for /metrics
+
+Initial interaction responses are not scheduled: they must go out within 3
+seconds and use the interaction's own token-scoped rate limit.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+from metrics import Histogram
+
+MODERATION, VERIFICATION, NOTIFICATION, FUN = range(4)
+PRIORITY_NAMES = ("moderation", "verification", "notification", "fun")
+
+DEFAULT_ROUTE_LIMITS = {
+    "messages": 1,   # per channel: keeps sends ordered
+    "roles": 2,      # per guild: member role add/remove
+    "channels": 2,   # per guild: overwrites and channel edits
+    "members": 2,    # per guild: ban/kick
+    "interaction": 1,  # per interaction: follow-ups and edits
+}
+
+
+async def run_direct(priority: int, route: str, coro_func, *args, **kwargs):
+    """Stand-in for RestScheduler.submit when no scheduler is configured."""
+    return await coro_func(*args, **kwargs)
+
+
+class RestScheduler:
+    def __init__(self, max_inflight: int = 8, route_limits: dict | None = None, default_route_limit: int = 2):
+        self.max_inflight = max_inflight
+        self.route_limits = dict(DEFAULT_ROUTE_LIMITS, **(route_limits or {}))
+        self.default_route_limit = default_route_limit
+        self._inflight = 0
+        self._routes = {}
+        # [(priority, seq, route, enqueued_at, future)]
+        self._heap = []
+        self._seq = itertools.count()
+        self.wait_histograms = {name: Histogram() for name in PRIORITY_NAMES}
+
+    def depth(self) -> dict:
+        counts = dict.fromkeys(PRIORITY_NAMES, 0)
+        for priority, _, _, _, fut in self._heap:
+            if not fut.done():
+                counts[PRIORITY_NAMES[priority]] += 1
+        counts["inflight"] = self._inflight
+        return counts
+
+    def _route_limit(self, route: str) -> int:
+        return self.route_limits.get(route.partition(":")[0], self.default_route_limit)
+
+    def _take(self, route: str):
+        self._inflight += 1
+        self._routes[route] = self._routes.get(route, 0) + 1
+
+    def _release(self, route: str):
+        self._inflight -= 1
+        left = self._routes[route] - 1
+        if left:
+            self._routes[route] = left
+        else:
+            del self._routes[route]
+        self._dispatch()
+
+    def _dispatch(self):
+        blocked = []
+        now = time.monotonic()
+        while self._heap and self._inflight < self.max_inflight:
+            entry = heapq.heappop(self._heap)
+            priority, _, route, enqueued_at, fut = entry
+            if fut.done():
+                # Waiter was cancelled
+                continue
+            if self._routes.get(route, 0) >= self._route_limit(route):
+                blocked.append(entry)
+                continue
+            self._take(route)
+            self.wait_histograms[PRIORITY_NAMES[priority]].observe(now - enqueued_at)
+            fut.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._heap, entry)
+
+    async def _acquire(self, priority: int, route: str):
+        if not self._heap and self._inflight < self.max_inflight and self._routes.get(route, 0) < self._route_limit(route):
+            self._take(route)
+            self.wait_histograms[PRIORITY_NAMES[priority]].observe(0.0)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), route, time.monotonic(), fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Granted, but the caller went away before using the slot
+                self._release(route)
+            raise
+
+    async def submit(self, priority: int, route: str, coro_func, *args, **kwargs):
+        """Wait for a slot, then ``await coro_func(*args, **kwargs)`` and return its result."""
+        await self._acquire(priority, route)
+        try:
+            return await coro_func(*args, **kwargs)
+        except Exception:
+            self.wait_histograms[PRIORITY_NAMES[priority]].errors += 1
+            raise
+        finally:
+            self._release(route)
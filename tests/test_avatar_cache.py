@@ -0,0 +1,132 @@
+"""AvatarCache LRU eviction and recency across restarts, against a local CDN."""
+
+import asyncio
+import os
+
+import pytest
+from aiohttp import web
+
+from avatar_cache import AvatarCache
+
+SIZE = 100
+
+
+def run(tmp_path, scenario, max_bytes=3 * SIZE):
+    """Start a fake CDN serving SIZE-byte images, run ``scenario(make_cache, url, hits)``."""
+    async def main():
+        hits = []
+
+        async def image(request):
+            hits.append(request.match_info["hash"])
+            await asyncio.sleep(0.01)
+            return web.Response(body=b"x" * int(request.query.get("bytes", SIZE)), content_type="image/png")
+
+        app = web.Application()
+        app.router.add_get("/avatars/{hash}.png", image)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        caches = []
+
+        async def make_cache(**kwargs):
+            cache = AvatarCache(str(tmp_path), max_bytes=max_bytes, **kwargs)
+            await cache.start()
+            caches.append(cache)
+            return cache
+
+        def url(avatar_hash, size=SIZE):
+            return f"http://127.0.0.1:{port}/avatars/{avatar_hash}.png?bytes={size}"
+
+        try:
+            return await scenario(make_cache, url, hits)
+        finally:
+            for cache in caches:
+                await cache.close()
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def files(tmp_path):
+    return sorted(os.listdir(tmp_path))
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    async def scenario(make_cache, url, hits):
+        cache = await make_cache()
+        for h in "abc":
+            await cache.get(h, 128, "png", url(h))
+        # Touch "a" so "b" is now the oldest
+        await cache.get("a", 128, "png", url("a"))
+        await cache.get("d", 128, "png", url("d"))
+        return cache, hits
+
+    cache, hits = run(tmp_path, scenario)
+    assert hits == ["a", "b", "c", "d"]
+    assert [cache.cached(h, 128, "png") for h in "abcd"] == [True, False, True, True]
+    assert files(tmp_path) == ["a-128.png", "c-128.png", "d-128.png"]
+    assert cache.size() == 3 * SIZE
+    assert cache.stats["evictions"] == 1 and cache.stats["hits"] == 1
+
+
+def test_recency_survives_a_restart(tmp_path):
+    async def scenario(make_cache, url, hits):
+        first = await make_cache()
+        for h in "abc":
+            await first.get(h, 128, "png", url(h))
+        await first.get("a", 128, "png", url("a"))
+        await first.close()
+        # A new process rebuilds the order from file mtimes: b, c, a
+        second = await make_cache()
+        loaded = len(second), second.size()
+        await second.get("d", 128, "png", url("d"))
+        after_d = [second.cached(h, 128, "png") for h in "abcd"]
+        await second.get("e", 128, "png", url("e"))
+        after_e = [second.cached(h, 128, "png") for h in "abcde"]
+        return loaded, after_d, after_e
+
+    loaded, after_d, after_e = run(tmp_path, scenario)
+    assert loaded == (3, 3 * SIZE)
+    assert after_d == [True, False, True, True]
+    assert after_e == [True, False, False, True, True]
+    assert files(tmp_path) == ["a-128.png", "d-128.png", "e-128.png"]
+
+
+def test_restart_trims_to_a_smaller_limit_and_drops_partial_downloads(tmp_path):
+    async def scenario(make_cache, url, hits):
+        first = await make_cache()
+        for h in "abc":
+            await first.get(h, 128, "png", url(h))
+        await first.close()
+        (tmp_path / "z-128.png.tmp").write_bytes(b"partial")
+        second = await make_cache()
+        second.max_bytes = 2 * SIZE
+        await second.start()
+        return [second.cached(h, 128, "png") for h in "abc"]
+
+    assert run(tmp_path, scenario) == [False, True, True]
+    assert files(tmp_path) == ["b-128.png", "c-128.png"]
+
+
+def test_concurrent_misses_share_one_download(tmp_path):
+    async def scenario(make_cache, url, hits):
+        cache = await make_cache()
+        paths = await asyncio.gather(*(cache.get("a", 256, "png", url("a")) for _ in range(5)))
+        return cache, paths, hits
+
+    cache, paths, hits = run(tmp_path, scenario)
+    assert hits == ["a"]
+    assert len(set(paths)) == 1 and os.path.getsize(paths[0]) == SIZE
+    assert cache.stats["misses"] == 1 and cache.stats["coalesced"] == 4
+
+
+def test_oversized_image_is_refused(tmp_path):
+    async def scenario(make_cache, url, hits):
+        cache = await make_cache(max_entry_bytes=SIZE)
+        with pytest.raises(ValueError):
+            await cache.get("big", 128, "png", url("big", SIZE + 1))
+        return cache
+
+    cache = run(tmp_path, scenario)
+    assert len(cache) == 0 and files(tmp_path) == []
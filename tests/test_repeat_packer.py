@@ -0,0 +1,86 @@
+"""Length and count invariants of repeat_packer."""
+
+import random
+
+import pytest
+
+from repeat_packer import MAX_FOLLOWUPS, MAX_MESSAGE_CHARS, pack_repeats, preview, text_length, truncate
+
+MESSAGES = [
+    "hi",
+    "a" * 999,
+    "a" * 1000,
+    "line one\nline two",
+    "😀" * 700,
+    "mix 😀 é 🇺🇸\n" * 20,
+    "x" * 5000,
+    "🎉" * 1500,
+]
+
+
+def test_text_length_counts_utf16_code_units():
+    assert text_length("abc") == 3
+    assert text_length("é") == 1
+    assert text_length("😀") == 2
+    assert text_length("a😀b") == 4
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+def test_truncate_fits_and_keeps_whole_code_points(limit):
+    text = "😀a" * 100
+    cut = truncate(text, limit)
+    assert text_length(cut) <= limit
+    assert cut.endswith("…")
+    assert text.startswith(cut[:-1])
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+@pytest.mark.parametrize("times", [1, 2, 7, 50, 1000])
+def test_pack_repeats_invariants(message, times):
+    packing = pack_repeats(message, times)
+    assert len(packing.payloads) == len(packing.counts) <= MAX_FOLLOWUPS
+    assert 0 < packing.total <= times
+    assert packing.complete == (packing.total == times)
+    unit = truncate(message, MAX_MESSAGE_CHARS)
+    for payload, count in zip(packing.payloads, packing.counts):
+        assert text_length(payload) <= MAX_MESSAGE_CHARS
+        # Whole repeats only, and the count is exact even for multi-line messages
+        assert payload == "\n".join([unit] * count)
+    if not packing.complete:
+        # Every payload is full: one more repeat wouldn't have fit
+        per_payload = max(packing.counts)
+        assert len(packing.payloads) == MAX_FOLLOWUPS
+        assert text_length("\n".join([unit] * (per_payload + 1))) > MAX_MESSAGE_CHARS
+
+
+def test_pack_repeats_random():
+    rnd = random.Random(7)
+    alphabet = "ab \n😀é🇺"
+    for _ in range(2000):
+        message = "".join(rnd.choices(alphabet, k=rnd.randint(1, 2500)))
+        times = rnd.randint(1, 200)
+        limit = rnd.randint(1, MAX_MESSAGE_CHARS)
+        max_payloads = rnd.randint(1, MAX_FOLLOWUPS)
+        packing = pack_repeats(message, times, max_payloads=max_payloads, limit=limit)
+        assert len(packing.payloads) <= max_payloads
+        assert all(text_length(p) <= limit for p in packing.payloads)
+        assert 0 < packing.total <= times
+        # The counts are what the payloads actually hold
+        unit = truncate(message, limit)
+        assert packing.payloads == ["\n".join([unit] * c) for c in packing.counts]
+
+
+@pytest.mark.parametrize("times", [0, -3])
+def test_pack_repeats_nothing_requested(times):
+    packing = pack_repeats("hi", times)
+    assert packing.payloads == [] and packing.total == 0
+
+
+@pytest.mark.parametrize("message", MESSAGES)
+@pytest.mark.parametrize("times", [1, 3, 500])
+def test_preview_fits_and_reports_what_it_shows(message, times):
+    text, shown = preview(message, times)
+    assert text_length(text) <= 1900
+    assert 0 < shown <= times
+    if shown < times:
+        assert text.endswith(f"… (+{times - shown} more)")
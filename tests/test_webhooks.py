@@ -0,0 +1,130 @@
+"""WebhookClient against a local stand-in for Discord's webhook endpoint."""
+
+import asyncio
+import time
+
+from aiohttp import web
+
+from webhooks import WebhookClient
+
+LIMIT = 5
+PER = 1.0
+# Sleeps can wake a little early on coarse clocks
+SLACK = 0.95
+
+
+class FakeDiscord:
+    def __init__(self):
+        # webhook id -> [monotonic arrival times]
+        self.arrivals = {}
+        self.violations = 0
+        # bucket webhook: (window start, requests in window)
+        self.window = (0.0, 0)
+        self.global_until = 0.0
+
+    def bucket(self, now: float) -> web.Response:
+        start, used = self.window
+        if now - start >= PER:
+            start, used = now, 0
+        if used >= LIMIT:
+            self.violations += 1
+            return web.json_response({"retry_after": PER - (now - start), "global": False}, status=429)
+        used += 1
+        self.window = (start, used)
+        return web.json_response({"id": "1"}, headers={
+            "X-RateLimit-Remaining": str(LIMIT - used),
+            "X-RateLimit-Reset-After": f"{PER - (now - start):.3f}",
+        })
+
+    async def handle(self, request):
+        now = time.monotonic()
+        hook = request.match_info["id"]
+        seen = self.arrivals.setdefault(hook, [])
+        seen.append(now)
+        if now < self.global_until:
+            self.violations += 1
+            return web.json_response({"retry_after": self.global_until - now, "global": True}, status=429)
+        if hook == "bucket":
+            return self.bucket(now)
+        if len(seen) == 1:
+            if hook == "retry":
+                return web.json_response({"retry_after": 0.5, "global": False}, status=429)
+            if hook == "global":
+                self.global_until = now + 0.4
+                return web.json_response({"retry_after": 0.4, "global": True}, status=429)
+            if hook == "list-body":
+                return web.json_response([], status=429, headers={"Retry-After": "0.3"})
+            if hook == "text-body":
+                return web.Response(text="slow down", status=429, headers={"Retry-After": "0.3"})
+        return web.json_response({"id": "1"})
+
+
+def run(scenario):
+    """Start the fake API, run ``scenario(client, base_url, fake)``, clean up."""
+    async def main():
+        fake = FakeDiscord()
+        app = web.Application()
+        app.router.add_post("/api/webhooks/{id}/{token}", fake.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        client = WebhookClient()
+        try:
+            return await scenario(client, f"http://127.0.0.1:{port}/api/webhooks", fake)
+        finally:
+            await client.close()
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def test_bucket_headers_pace_sends():
+    async def scenario(client, base, fake):
+        start = time.monotonic()
+        sent = await client.send_many(f"{base}/bucket/t", [{"content": str(i)} for i in range(LIMIT * 3)])
+        return sent, time.monotonic() - start, fake.violations
+
+    sent, elapsed, violations = run(scenario)
+    assert [status for status, _ in sent] == [200] * LIMIT * 3
+    assert violations == 0
+    # Three windows' worth takes at least two full resets
+    assert elapsed >= 2 * PER * SLACK
+
+
+def test_429_is_retried_after_retry_after():
+    async def scenario(client, base, fake):
+        status, _ = await client.send(f"{base}/retry/t", {"content": "x"})
+        return status, fake.arrivals["retry"]
+
+    status, arrivals = run(scenario)
+    assert status == 200
+    assert len(arrivals) == 2
+    assert arrivals[1] - arrivals[0] >= 0.5 * SLACK
+
+
+def test_global_429_holds_back_other_webhooks():
+    async def scenario(client, base, fake):
+        first = asyncio.create_task(client.send(f"{base}/global/t", {"content": "x"}))
+        await asyncio.sleep(0.05)
+        other_status, _ = await client.send(f"{base}/other/t", {"content": "y"})
+        status, _ = await first
+        return status, other_status, fake.arrivals, fake.violations
+
+    status, other_status, arrivals, violations = run(scenario)
+    assert (status, other_status) == (200, 200)
+    assert arrivals["other"][0] - arrivals["global"][0] >= 0.4 * SLACK
+    assert violations == 0
+
+
+def test_non_object_429_bodies_fall_back_to_retry_after_header():
+    async def scenario(client, base, fake):
+        results = {}
+        for hook in ("list-body", "text-body"):
+            status, _ = await client.send(f"{base}/{hook}/t", {"content": "x"})
+            results[hook] = (status, fake.arrivals[hook])
+        return results
+
+    for hook, (status, arrivals) in run(scenario).items():
+        assert status == 200, hook
+        assert arrivals[1] - arrivals[0] >= 0.3 * SLACK, hook
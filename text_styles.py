@@ -0,0 +1,165 @@
+"""Text transformation styles (/emojify, /raizv2 big text).
+
+A ``TextStyle`` is a character table compiled once, at import, into a
+``str.translate`` table, plus an optional per-line prefix (``# `` for
+Discord's big heading text). Adding a style is adding an entry to
+``STYLES``.
+
+Styled output can be much longer than its input, so ``split()`` cuts it
+into Discord-sized messages on grapheme boundaries: a keycap (``1️⃣``), an
+emoji with a variation selector or skin tone, a ZWJ sequence or a flag is
+never cut in half. The segmentation covers the sequences these styles and
+Discord users actually produce (combining marks, variation selectors,
+keycaps, skin tones, ZWJ joins, tag sequences, regional indicator pairs);
+it is not a full UAX #29 implementation.
+"""
+
+import unicodedata
+
+from repeat_packer import MAX_MESSAGE_CHARS, text_length
+
+ZWJ = "\u200d"
+ZWSP = "\u200b"
+KEYCAP = "\u20e3"
+
+
+def _extends(ch: str) -> bool:
+    """True if ch attaches to the preceding character."""
+    cp = ord(ch)
+    return (
+        0xFE00 <= cp <= 0xFE0F           # variation selectors
+        or cp == 0x20E3                  # combining enclosing keycap
+        or 0x1F3FB <= cp <= 0x1F3FF      # skin tone modifiers
+        or 0xE0020 <= cp <= 0xE007F      # tag characters (subdivision flags)
+        or cp == 0x200D
+        or unicodedata.combining(ch) != 0
+        or unicodedata.category(ch) in ("Mn", "Me", "Mc")
+    )
+
+
+def _regional(ch: str) -> bool:
+    return 0x1F1E6 <= ord(ch) <= 0x1F1FF
+
+
+def graphemes(text: str):
+    """Yield user-perceived characters (see the module docstring for coverage)."""
+    cluster = ""
+    ri_count = 0
+    for ch in text:
+        if cluster and (_extends(ch) or cluster[-1] == ZWJ):
+            cluster += ch
+            continue
+        if cluster and _regional(ch) and ri_count % 2 == 1 and _regional(cluster[-1]):
+            # Second half of a flag
+            cluster += ch
+            ri_count += 1
+            continue
+        if cluster:
+            yield cluster
+        cluster = ch
+        ri_count = 1 if _regional(ch) else 0
+    if cluster:
+        yield cluster
+
+
+class TextStyle:
+    __slots__ = ("name", "description", "line_prefix", "_table")
+
+    def __init__(self, name: str, description: str, table: dict | None = None, casefold: bool = True, line_prefix: str = ""):
+        self.name = name
+        self.description = description
+        self.line_prefix = line_prefix
+        table = dict(table or {})
+        if casefold:
+            # Upper-case letters map like their lower-case versions unless given explicitly
+            for ch, out in list(table.items()):
+                if ch.isalpha() and ch.upper() not in table:
+                    table[ch.upper()] = out
+        self._table = str.maketrans(table)
+
+    def transform(self, text: str) -> str:
+        out = text.translate(self._table)
+        if self.line_prefix:
+            out = "\n".join(self.line_prefix + line if line.strip() else line for line in out.split("\n"))
+        return out
+
+    def render(self, text: str, limit: int = MAX_MESSAGE_CHARS) -> list[str]:
+        """Transform and split into messages of at most ``limit`` chars."""
+        if not self.line_prefix:
+            return split(self.transform(text), limit)
+        # Prefixed styles: every message (and every piece of an over-long line)
+        # has to start with the prefix again
+        lines = []
+        for line in text.translate(self._table).split("\n"):
+            if not line.strip():
+                lines.append(line)
+                continue
+            lines.extend(self.line_prefix + piece for piece in split(line, limit - text_length(self.line_prefix)))
+        return split("\n".join(lines), limit)
+
+
+def split(text: str, limit: int = MAX_MESSAGE_CHARS) -> list[str]:
+    """Split on grapheme boundaries into chunks of at most ``limit`` chars, preferring line breaks, then spaces."""
+    if text_length(text) <= limit:
+        return [text] if text else []
+    chunks = []
+    current = []
+    size = 0
+    # Index in `current` just after the last newline / space
+    last_newline = last_space = 0
+    for cluster in graphemes(text):
+        width = text_length(cluster)
+        if size + width > limit and current and cluster == "\n":
+            # The chunk ends exactly here; the line break itself isn't needed
+            chunks.append("".join(current))
+            current, size, last_newline, last_space = [], 0, 0, 0
+            continue
+        # The part kept after a cut can itself leave no room (e.g. a cut just
+        # after a leading newline): cut again, the second time the whole rest
+        while size + width > limit and current:
+            cut = last_newline or last_space or len(current)
+            chunk = "".join(current[:cut])
+            chunks.append(chunk.rstrip("\n") if cut == last_newline else chunk)
+            current = current[cut:]
+            size = sum(text_length(c) for c in current)
+            last_newline = last_space = 0
+        current.append(cluster)
+        size += width
+        if cluster == "\n":
+            last_newline = len(current)
+        elif cluster == " ":
+            last_space = len(current)
+    if current:
+        chunks.append("".join(current))
+    return [c for c in chunks if c]
+
+
+_EMOJI = {
+    'a': '🅰️', 'b': '🅱️', 'c': '🅲', 'd': '🅳', 'e': '🅴',
+    'f': '🅵', 'g': '🅶', 'h': '🅷', 'i': '🅸', 'j': '🅹',
+    'k': '🅺', 'l': '🅻', 'm': '🅼', 'n': '🅽', 'o': '🅾️',
+    'p': '🅿️', 'q': '🆀', 'r': '🆁', 's': '🆂', 't': '🆃',
+    'u': '🆄', 'v': '🆅', 'w': '🆆', 'x': '🆇', 'y': '🆈', 'z': '🆉',
+    '0': '0️⃣', '1': '1️⃣', '2': '2️⃣', '3': '3️⃣', '4': '4️⃣',
+    '5': '5️⃣', '6': '6️⃣', '7': '7️⃣', '8': '8️⃣', '9': '9️⃣',
+    '!': '❗', '?': '❓', ' ': '  '
+}
+
+_SMALL_CAPS = dict(zip(
+    "abcdefghijklmnopqrstuvwxyz",
+    "ᴀʙᴄᴅᴇꜰɢʜɪᴊᴋʟᴍɴᴏᴘǫʀꜱᴛᴜᴠᴡxʏᴢ",
+))
+
+# Adjacent regional indicators merge into flags, so each one is followed by a zero-width space
+_REGIONAL = {ch: chr(0x1F1E6 + i) + ZWSP for i, ch in enumerate("abcdefghijklmnopqrstuvwxyz")}
+_REGIONAL.update({str(d): f"{d}\ufe0f{KEYCAP}" for d in range(10)})
+_REGIONAL.update({"!": "❗", "?": "❓", " ": "   "})
+
+STYLES = {
+    style.name: style for style in (
+        TextStyle("emoji", "🅴🅼🅾🅹🅸 letters", _EMOJI),
+        TextStyle("smallcaps", "ꜱᴍᴀʟʟ ᴄᴀᴘꜱ", _SMALL_CAPS),
+        TextStyle("regional", "Regional indicator letters", _REGIONAL),
+        TextStyle("big", "Big heading text", line_prefix="# "),
+    )
+}
@@ -0,0 +1,100 @@
+"""Hashed timer wheel for bot-managed expiries (mute lifts, strike resets).
+
+One task ticks once per ``tick`` seconds and fires whatever is due, instead
+of one sleeping task per timer. Timers live in ``slots`` buckets by
+deadline tick; a tick only looks at its own bucket, so scheduling,
+cancelling and firing are O(1) per timer (a timer further out than one
+revolution is skipped ``deadline / (tick * slots)`` times).
+
+Deadlines are wall-clock (``time.time()``) seconds so they can be persisted
+and rescheduled after a restart; anything already overdue fires on the
+first tick. Timers are keyed: scheduling an existing key moves it.
+"""
+
+import asyncio
+import logging
+import math
+import time
+
+log = logging.getLogger("skybot.timers")
+
+
+class TimerWheel:
+    def __init__(self, callback, tick: float = 1.0, slots: int = 3600):
+        # ``await callback(key, payload)`` for every timer that fires
+        self.callback = callback
+        self.tick = tick
+        self.slots = slots
+        self._wheel = [dict() for _ in range(slots)]
+        # key -> (deadline tick, payload)
+        self._timers = {}
+        self._current = self._tick_of(time.time())
+        self._task = None
+        self._running = set()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def _tick_of(self, when: float) -> int:
+        return math.ceil(when / self.tick)
+
+    def schedule(self, key, when: float, payload=None):
+        self.cancel(key)
+        # Never behind the cursor, or it would wait a whole revolution
+        deadline = max(self._tick_of(when), self._current + 1)
+        self._timers[key] = (deadline, payload)
+        self._wheel[deadline % self.slots][key] = deadline
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self, key) -> bool:
+        entry = self._timers.pop(key, None)
+        if entry is None:
+            return False
+        self._wheel[entry[0] % self.slots].pop(key, None)
+        return True
+
+    def when(self, key) -> float | None:
+        entry = self._timers.get(key)
+        return entry[0] * self.tick if entry else None
+
+    def _advance(self, now_tick: int) -> list:
+        due = []
+        if now_tick - self._current >= self.slots:
+            # Slept through a whole revolution: check every slot once
+            ticks = range(self.slots)
+        else:
+            ticks = range(self._current + 1, now_tick + 1)
+        for t in ticks:
+            slot = self._wheel[t % self.slots]
+            if not slot:
+                continue
+            for key, deadline in list(slot.items()):
+                if deadline <= now_tick:
+                    del slot[key]
+                    due.append((key, self._timers.pop(key)[1]))
+        self._current = now_tick
+        return due
+
+    async def _run(self):
+        try:
+            while self._timers:
+                await asyncio.sleep(max(0.0, (self._current + 1) * self.tick - time.time()))
+                for key, payload in self._advance(self._tick_of(time.time())):
+                    task = asyncio.create_task(self._fire(key, payload))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+        finally:
+            self._task = None
+
+    async def _fire(self, key, payload):
+        try:
+            await self.callback(key, payload)
+        except Exception:
+            log.exception("Timer %s failed", key)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._running):
+            task.cancel()
@@ -0,0 +1,136 @@
+"""Hit-rate check for avatar_cache.AvatarCache against a local stand-in CDN.
+
+Starts an aiohttp server that serves deterministic fake avatars at
+``/avatars/<user>/<hash>.<fmt>?size=N`` (with optional latency), then
+replays /getpfp-style lookups: users drawn from a Zipf distribution, a few
+sizes, and occasional avatar changes (new hash). Every served file is
+checked byte-for-byte against the user's *current* avatar, so a stale
+entry fails the run. Finally the cache is reopened from disk to check the
+index survives a restart.
+
+    python tools/bench_avatar_cache.py [--requests 20000] [--users 2000] [--cache-mb 4]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from avatar_cache import AvatarCache
+
+SIZES = (128, 256, 512, 1024)
+
+
+def avatar_bytes(avatar_hash: str, size: int, fmt: str) -> bytes:
+    # Roughly proportional to the pixel size, like real PNGs
+    seed = hashlib.sha256(f"{avatar_hash}/{size}/{fmt}".encode()).digest()
+    return seed * (size * size // 64 // len(seed) + 1)
+
+
+async def start_cdn(latency: float):
+    hits = {"requests": 0, "bytes": 0}
+
+    async def serve(request):
+        hits["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        avatar_hash, fmt = request.match_info["file"].rsplit(".", 1)
+        body = avatar_bytes(avatar_hash, int(request.query.get("size", 1024)), fmt)
+        hits["bytes"] += len(body)
+        return web.Response(body=body, content_type=f"image/{fmt}")
+
+    app = web.Application()
+    app.router.add_get("/avatars/{user}/{file}", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", hits
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--change-rate", type=float, default=0.002, help="chance a lookup follows an avatar change")
+    parser.add_argument("--cache-mb", type=float, default=4)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.005, help="stand-in CDN latency (s)")
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.users)]
+    versions = [0] * args.users
+    runner, base, cdn = await start_cdn(args.latency)
+    directory = tempfile.mkdtemp(prefix="avatar-cache-")
+    cache = AvatarCache(directory, max_bytes=int(args.cache_mb * 1024 * 1024))
+    await cache.start()
+    stale = 0
+
+    async def lookup(user: int, size: int):
+        nonlocal stale
+        avatar_hash = f"u{user}v{versions[user]}"
+        fmt = "gif" if user % 10 == 0 else "png"
+        path = await cache.get(avatar_hash, size, fmt, f"{base}/avatars/{user}/{avatar_hash}.{fmt}?size={size}")
+        with open(path, "rb") as f:
+            if f.read() != avatar_bytes(f"u{user}v{versions[user]}", size, fmt):
+                stale += 1
+
+    start = time.perf_counter()
+    done = 0
+    while done < args.requests:
+        batch = []
+        for _ in range(min(args.concurrency, args.requests - done)):
+            user = rnd.choices(range(args.users), weights)[0]
+            if rnd.random() < args.change_rate:
+                versions[user] += 1
+            batch.append(lookup(user, rnd.choice(SIZES)))
+        await asyncio.gather(*batch)
+        done += len(batch)
+    elapsed = time.perf_counter() - start
+
+    stats = cache.stats
+    served_from_cache = stats["hits"] + stats["coalesced"]
+    print(f"{args.requests:,} lookups over {args.users:,} users (zipf {args.zipf}), cache {args.cache_mb:g} MiB, "
+          f"{args.concurrency} concurrent, CDN latency {args.latency * 1000:g} ms")
+    print(f"  hit rate:     {stats['hits'] / args.requests:.1%} ({stats['hits']:,} hits, "
+          f"{stats['coalesced']:,} coalesced onto an in-flight fetch)")
+    print(f"  CDN fetches:  {cdn['requests']:,} ({cdn['bytes'] / 1048576:.1f} MiB) instead of {args.requests:,}; "
+          f"{served_from_cache / args.requests:.1%} served without a download")
+    print(f"  evictions:    {stats['evictions']:,}; cache holds {len(cache):,} files, {cache.size() / 1048576:.2f} MiB")
+    print(f"  stale served: {stale}")
+    print(f"  {elapsed / args.requests * 1e6:.0f} µs/lookup wall clock")
+    assert stale == 0, "served a stale avatar"
+    assert cache.size() <= cache.max_bytes
+
+    # Restart: the index is rebuilt from disk in LRU order
+    entries = list(cache._entries)
+    await cache.close()
+    reopened = AvatarCache(directory, max_bytes=cache.max_bytes)
+    await reopened.start()
+    assert list(reopened._entries) == entries, "LRU order lost across restart"
+    before = cdn["requests"]
+    name = entries[-1]
+    avatar_hash, rest = name.rsplit("-", 1)
+    size, fmt = rest.split(".")
+    await reopened.get(avatar_hash, int(size), fmt, f"{base}/unused")
+    assert cdn["requests"] == before and reopened.stats["hits"] == 1
+    print(f"  restart:      {len(reopened):,} files reloaded, most recent entry served without a fetch")
+    await reopened.close()
+    await runner.cleanup()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Benchmark the default vs low-memory member cache modes.
+
+Feeds a synthetic workload (default: 50 guilds, 500k members) through
+discord.py's own ConnectionState, offline:
+
+- default:    GUILD_CREATE for every guild, then every member arrives via
+              GUILD_MEMBERS_CHUNK (1000 per chunk) and is cached, as with
+              chunk_guilds_at_startup=True
+- low-memory: GUILD_CREATE only, MemberCacheFlags.none(); the bot is ready
+              as soon as the guilds are in
+
+Each mode runs in its own subprocess so RSS numbers don't mix. "Ready" is
+the CPU time to process the gateway payloads; on a live connection the
+default mode also waits for Discord to stream every chunk, so the real gap
+is larger.
+
+    python tools/bench_member_cache.py [--guilds 50] [--members 500000]
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def guild_payload(guild_id: int, member_count: int) -> dict:
+    return {
+        "id": str(guild_id),
+        "name": f"guild-{guild_id}",
+        "member_count": member_count,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [],
+        "members": [],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "owner_id": "1",
+    }
+
+
+def member_payload(user_id: int) -> dict:
+    return {
+        "user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None},
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def run_mode(mode: str, guilds: int, members: int) -> dict:
+    import discord
+    from discord.member import Member
+    from discord.state import ConnectionState
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    options = {"intents": intents}
+    if mode == "low-memory":
+        options.update(chunk_guilds_at_startup=False, member_cache_flags=discord.MemberCacheFlags.none())
+    state = ConnectionState(dispatch=lambda *a, **k: None, handlers={}, hooks={}, http=None, **options)
+
+    gc.collect()
+    base = rss_mib()
+    per_guild = members // guilds
+    chunk_size = 1000
+    chunks = 0
+    start = time.perf_counter()
+    next_user = 10_000_000
+    for g in range(guilds):
+        guild = state._add_guild_from_data(guild_payload(1000 + g, per_guild))
+        if state._chunk_guilds:
+            # What ChunkRequest.add_members does for each GUILD_MEMBERS_CHUNK
+            for offset in range(0, per_guild, chunk_size):
+                batch = [member_payload(next_user + i) for i in range(min(chunk_size, per_guild - offset))]
+                next_user += len(batch)
+                for data in batch:
+                    guild._add_member(Member(data=data, guild=guild, state=state))
+                chunks += 1
+    ready = time.perf_counter() - start
+    gc.collect()
+    return {
+        "mode": mode,
+        "ready_s": ready,
+        "rss_delta_mib": rss_mib() - base,
+        "cached_members": sum(len(g._members) for g in state._guilds.values()),
+        "chunk_events": chunks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--members", type=int, default=500_000)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.guilds, args.members)))
+        return
+
+    print(f"{args.guilds} guilds, {args.members:,} members")
+    for mode in ("default", "low-memory"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--guilds", str(args.guilds), "--members", str(args.members)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out)
+        print(f"  {r['mode']:<11} ready {r['ready_s']:6.2f}s  RSS +{r['rss_delta_mib']:7.1f} MiB  "
+              f"cached members {r['cached_members']:>8,}  chunk events {r['chunk_events']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark per-message on_message overhead before and after the filter pipeline.
+
+Real discord.Message objects (built through discord.py's ConnectionState)
+are pushed through:
+
+- before:   anti-spam window update, then bot.process_commands() with the
+            default help command registered (prefix parsing on every message)
+- after:    MessagePipeline.run() with anti-spam enabled; process_commands()
+            skipped because no text commands exist
+- disabled: MessagePipeline.run() for a guild with every filter turned off
+- exempt:   anti-spam enabled, but the channel is exempt
+
+Authors rotate over many users so nobody trips the spam limit.
+
+    python tools/bench_message_pipeline.py [--messages 200000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.ext import commands
+
+from message_pipeline import MessagePipeline
+from ratewindow import RateWindows
+
+GUILD_ID = 1 << 40
+CHANNEL_ID = GUILD_ID + 1
+
+
+def build_messages(bot, count: int, users: int) -> list:
+    state = bot._connection
+    # process_commands compares against bot.user
+    state.user = discord.ClientUser(state=state, data={"id": "1", "username": "bot", "discriminator": "0", "avatar": None})
+    guild = state._add_guild_from_data({
+        "id": str(GUILD_ID), "name": "bench", "member_count": users, "owner_id": "1",
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0}],
+        "members": [], "emojis": [], "stickers": [], "features": [],
+    })
+    channel = guild.get_channel(CHANNEL_ID)
+    messages = []
+    for i in range(count):
+        user_id = 10_000 + i % users
+        messages.append(discord.Message(state=state, channel=channel, data={
+            "id": str(GUILD_ID + 100 + i), "channel_id": str(CHANNEL_ID), "guild_id": str(GUILD_ID),
+            "author": {"id": str(user_id), "username": f"u{user_id}", "discriminator": "0", "avatar": None},
+            "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False},
+            "content": "hello there, just chatting", "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+            "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+        }))
+    return messages
+
+
+async def run(label: str, handler, messages: list) -> float:
+    for message in messages[:1000]:
+        await handler(message)
+    start = time.perf_counter()
+    for message in messages:
+        await handler(message)
+    per_msg = (time.perf_counter() - start) / len(messages)
+    print(f"  {label:<9} {per_msg * 1e6:6.2f} µs/msg")
+    return per_msg
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    args = parser.parse_args()
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    old_bot = commands.Bot(command_prefix="!", intents=intents)
+    new_bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+    messages = build_messages(old_bot, args.messages, args.users)
+
+    old_windows = RateWindows(5, 3, {})
+
+    async def before(message):
+        if message.author == old_bot.user:
+            return
+        if message.guild and not message.author.bot:
+            old_windows.hit(message.guild.id, message.author.id)
+        await old_bot.process_commands(message)
+
+    def after_handler(settings):
+        windows = RateWindows(5, 3, {})
+
+        async def antispam(message):
+            return windows.hit(message.guild.id, message.author.id)
+
+        pipeline = MessagePipeline(settings)
+        pipeline.register("antispam", antispam)
+
+        async def handler(message):
+            if message.guild and not message.author.bot:
+                await pipeline.run(message)
+            if new_bot.all_commands:
+                await new_bot.process_commands(message)
+        return handler
+
+    print(f"{args.messages:,} messages from {args.users:,} authors")
+    base = await run("before", before, messages)
+    after = await run("after", after_handler({}), messages)
+    await run("disabled", after_handler({GUILD_ID: {"disabled": ["antispam"]}}), messages)
+    await run("exempt", after_handler({GUILD_ID: {"exempt_channels": [CHANNEL_ID]}}), messages)
+    print(f"  after/before: {after / base:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
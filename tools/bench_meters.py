@@ -0,0 +1,140 @@
+"""Benchmark the per-invocation cost of a meter command handler.
+
+Compares the old copy-pasted /femboymeter and /uwumeter handlers with the
+table-driven engine (random and daily mode). The interaction is a stub whose
+send_message does nothing, so this measures only the handler's own work:
+scoring, formatting, AllowedMentions and logging.
+
+    python tools/bench_meters.py [--calls 200000] [--users 1000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+import meters
+
+cmd_log = logging.getLogger("skybot.commands")
+
+
+class StubUser:
+    __slots__ = ("id", "mention", "display_name")
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+        self.display_name = f"user{user_id}"
+
+
+class StubResponse:
+    async def send_message(self, content, **kwargs):
+        pass
+
+
+class StubInteraction:
+    def __init__(self, user):
+        self.user = user
+        self.response = StubResponse()
+
+
+async def old_femboymeter(interaction, user):
+    target = user if user is not None else interaction.user
+    percentage = random.randint(1, 100)
+    if percentage > 50:
+        result_msg = f"🎀 {target.mention} is **{percentage}%** femboy! They are a femboy! 💖"
+    else:
+        result_msg = f"🎀 {target.mention} is **{percentage}%** femboy!"
+    try:
+        await interaction.response.send_message(
+            result_msg,
+            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
+        )
+        cmd_log.info("[femboymeter] Sent result for %s: %s%%", getattr(target, 'display_name', getattr(target, 'name', str(target))), percentage)
+    except Exception as e:
+        cmd_log.warning("[femboymeter] Failed to send: %s", e)
+
+
+async def old_uwumeter(interaction, user):
+    import random
+    target = user if user is not None else interaction.user
+    percentage = random.randint(1, 100)
+    if percentage < 30:
+        vibe = "Barely any UwU energy... kinda sus ngl 😐"
+    elif percentage < 60:
+        vibe = "Moderate UwU vibes detected owo"
+    elif percentage < 90:
+        vibe = "HIGH UwU LEVELS!! They're dangerously cute!! >w<"
+    else:
+        vibe = "🚨 MAXIMUM UwU OVERLOAD!! *notices your bulge* OwO 🚨"
+    result_msg = f"💕 {target.mention} is **{percentage}%** UwU!\n{vibe}"
+    try:
+        await interaction.response.send_message(
+            result_msg,
+            allowed_mentions=discord.AllowedMentions(users=True, roles=False, everyone=False)
+        )
+        cmd_log.info("[uwumeter] %s: %s%%", getattr(target, 'display_name', getattr(target, 'name', str(target))), percentage)
+    except Exception as e:
+        cmd_log.warning("[uwumeter] Failed: %s", e)
+
+
+METER_MENTIONS = discord.AllowedMentions(users=True, roles=False, everyone=False)
+
+
+def new_handler(meter, daily: bool):
+    # Same body as bot.send_meter
+    async def handler(interaction, *users):
+        if None in users:
+            users = tuple(u if u is not None else interaction.user for u in users)
+        score = meters.score(meter, tuple([u.id for u in users]), daily=daily)
+        result_msg = meter.render(score, *users)
+        try:
+            await interaction.response.send_message(result_msg, allowed_mentions=METER_MENTIONS)
+            cmd_log.info("[%s] %s: %s%%", meter.name, ", ".join([getattr(u, 'display_name', str(u)) for u in users]), score)
+        except Exception as e:
+            cmd_log.warning("[%s] Failed to send: %s", meter.name, e)
+    return handler
+
+
+async def run(label: str, handler, interaction, users: list, calls: int, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(calls):
+            await handler(interaction, users[i % len(users)])
+        best = min(best, time.perf_counter() - start)
+    per_call = best / calls
+    print(f"  {label:<28} {per_call * 1e6:6.2f} µs/call (best of {repeat})")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Logging on at INFO but without output, as with a quiet production handler
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+    users = [StubUser(10_000 + i) for i in range(args.users)]
+    interaction = StubInteraction(users[0])
+    by_name = {m.name: m for m in meters.METERS}
+
+    print(f"{args.calls:,} calls over {args.users:,} users")
+    await run("old /femboymeter", old_femboymeter, interaction, users, args.calls)
+    await run("new /femboymeter (random)", new_handler(by_name["femboymeter"], False), interaction, users, args.calls)
+    await run("new /femboymeter (daily)", new_handler(by_name["femboymeter"], True), interaction, users, args.calls)
+    await run("old /uwumeter", old_uwumeter, interaction, users, args.calls)
+    await run("new /uwumeter (random)", new_handler(by_name["uwumeter"], False), interaction, users, args.calls)
+    await run("new /uwumeter (daily)", new_handler(by_name["uwumeter"], True), interaction, users, args.calls)
+    print(f"  daily LRU: {meters.cache_info()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Benchmark the anti-spam rate windows.
+
+Compares the old ``defaultdict(deque)`` keyed on author ID with
+``ratewindow.RateWindows`` keyed on (guild, author): per-message cost and
+memory held after 1M distinct authors, plus memory left after a sweep.
+
+    python tools/bench_ratewindow.py [--authors 1000000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ratewindow import RateWindows  # noqa: E402
+
+LIMIT = 5
+WINDOW = 3.0
+GUILDS = 50
+
+
+def old_hit(store, user_id, now):
+    times = store[user_id]
+    times.append(now)
+    while times and now - times[0] > WINDOW:
+        times.popleft()
+    return len(times) > LIMIT
+
+
+def run_old(authors):
+    store = defaultdict(deque)
+    tracemalloc.start()
+    start = time.perf_counter()
+    now = 0.0
+    for i in range(authors):
+        now += 0.000001
+        old_hit(store, i, now)
+    elapsed = time.perf_counter() - start
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, mem
+
+
+def run_new(authors):
+    windows = RateWindows(LIMIT, WINDOW)
+    tracemalloc.start()
+    start = time.perf_counter()
+    now = 0.0
+    for i in range(authors):
+        now += 0.000001
+        windows.hit(i % GUILDS, i, now)
+    elapsed = time.perf_counter() - start
+    mem, _ = tracemalloc.get_traced_memory()
+    evicted = asyncio.run(windows.sweep(now=now + WINDOW + 1))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, mem, evicted, after
+
+
+def run_hot(hits):
+    # Steady state: few authors, repeated hits on existing buffers
+    windows = RateWindows(LIMIT, WINDOW)
+    store = defaultdict(deque)
+    now = 0.0
+    start = time.perf_counter()
+    for i in range(hits):
+        now += 0.5
+        windows.hit(i % GUILDS, i % 1000, now)
+    new = time.perf_counter() - start
+    now = 0.0
+    start = time.perf_counter()
+    for i in range(hits):
+        now += 0.5
+        old_hit(store, i % 1000, now)
+    old = time.perf_counter() - start
+    return old, new
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=1_000_000)
+    parser.add_argument("--hits", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    old_t, old_mem = run_old(args.authors)
+    new_t, new_mem, evicted, after = run_new(args.authors)
+    hot_old, hot_new = run_hot(args.hits)
+
+    mb = 1024 * 1024
+    print(f"{args.authors:,} distinct authors, limit {LIMIT}/{WINDOW}s")
+    print(f"  defaultdict(deque): {old_t / args.authors * 1e9:7.0f} ns/msg  {old_mem / mb:8.1f} MiB (never freed)")
+    print(f"  RateWindows:        {new_t / args.authors * 1e9:7.0f} ns/msg  {new_mem / mb:8.1f} MiB")
+    print(f"  after sweep:        evicted {evicted:,}, {after / mb:.1f} MiB held")
+    print(f"{args.hits:,} hits on 1,000 active authors")
+    print(f"  defaultdict(deque): {hot_old / args.hits * 1e9:7.0f} ns/msg")
+    print(f"  RateWindows:        {hot_new / args.hits * 1e9:7.0f} ns/msg")
+
+
+if __name__ == "__main__":
+    main()
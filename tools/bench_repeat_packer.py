@@ -0,0 +1,114 @@
+"""Compare the old /raiz chunking loop with repeat_packer.pack_repeats.
+
+For every message length in a range and every `times` from 1 to 10, counts
+the follow-up calls each approach makes and how many repeats are actually
+delivered (the old loop inferred progress from newlines, so multi-line
+messages are also checked). Then runs randomized invariant checks on
+unicode/multi-line messages and times the packer.
+
+    python tools/bench_repeat_packer.py [--cases 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repeat_packer import MAX_FOLLOWUPS, MAX_MESSAGE_CHARS, pack_repeats, preview, text_length
+
+
+def old_chunks(message: str, times: int) -> tuple[list[str], int]:
+    """The pre-packer loop from /raiz; returns (payloads, repeats it believed it sent)."""
+    payloads = []
+    sent = 0
+    chunks = 0
+    max_chunks = 5
+    while sent < times and chunks < max_chunks:
+        remaining = times - sent
+        slots_left = max_chunks - chunks
+        per_chunk = (remaining + slots_left - 1) // slots_left
+        block = ("\n").join([message] * per_chunk)
+        if len(block) > 1900:
+            max_lines = max(1, 1900 // max(1, len(message) + 1))
+            block = ("\n").join([message] * max_lines)
+        payloads.append(block)
+        sent += block.count("\n") + 1
+        chunks += 1
+    return payloads, sent
+
+
+def compare(lengths, multiline: bool):
+    old_calls = new_calls = old_delivered = new_delivered = old_oversize = old_miscount = 0
+    invocations = 0
+    for length in lengths:
+        base = "ab\ncd" * (length // 5 + 1) if multiline else "x" * length
+        message = base[:length]
+        for times in range(1, 11):
+            invocations += 1
+            payloads, believed = old_chunks(message, times)
+            actual = 0
+            for p in payloads:
+                old_calls += 1
+                if len(p) > MAX_MESSAGE_CHARS:
+                    # Discord rejects it and the loop stops
+                    old_oversize += 1
+                    break
+                actual += (p.count("\n") + 1) // (message.count("\n") + 1)
+            old_delivered += min(actual, times)
+            old_miscount += believed != actual
+            packing = pack_repeats(message, times)
+            new_calls += len(packing.payloads)
+            new_delivered += packing.total
+    kind = "multi-line" if multiline else "single-line"
+    print(f"{kind}, lengths {lengths.start}-{lengths.stop - 1}, times 1-10 ({invocations:,} invocations)")
+    print(f"  old:    {old_calls / invocations:.2f} follow-ups/invocation, {old_delivered:,} repeats delivered, "
+          f"{old_oversize} rejected oversize payloads, {old_miscount} wrong progress reports")
+    print(f"  packer: {new_calls / invocations:.2f} follow-ups/invocation, {new_delivered:,} repeats delivered")
+
+
+def check_invariants(cases: int, seed: int = 1):
+    rnd = random.Random(seed)
+    alphabet = ["a", "Z", " ", "\n", "é", "中", "😀", "👨‍👩‍👧", "#", "*"]
+    sizes = [0, 1, 7, 50, 399, 400, 999, 1000, 1001, 1999, 2000, 2001, 3000]
+    for _ in range(cases):
+        message = "".join(rnd.choice(alphabet) for _ in range(rnd.choice(sizes)))
+        times = rnd.randint(1, 10)
+        packing = pack_repeats(message, times)
+        unit = text_length(message)
+        assert len(packing.payloads) == len(packing.counts) <= MAX_FOLLOWUPS
+        assert all(text_length(p) <= MAX_MESSAGE_CHARS for p in packing.payloads)
+        assert packing.total <= times and all(c > 0 for c in packing.counts)
+        if unit <= MAX_MESSAGE_CHARS:
+            per_payload = (MAX_MESSAGE_CHARS + 1) // (unit + 1)
+            # Exact contents, the most repeats possible, in the fewest payloads
+            assert all(p == "\n".join([message] * c) for p, c in zip(packing.payloads, packing.counts))
+            assert packing.total == min(times, per_payload * MAX_FOLLOWUPS)
+            assert len(packing.payloads) == -(-packing.total // per_payload)
+        text, shown = preview(message, times)
+        assert text_length(text) <= 1900 and shown <= times
+    print(f"invariants hold on {cases:,} random unicode/multi-line cases")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20_000)
+    args = parser.parse_args()
+
+    compare(range(1, 101), multiline=False)
+    compare(range(1, 2501), multiline=False)
+    compare(range(5, 1001, 5), multiline=True)
+    check_invariants(args.cases)
+
+    message = "hello world 👋"
+    n = 100_000
+    start = time.perf_counter()
+    for i in range(n):
+        pack_repeats(message, 1 + i % 10)
+    print(f"pack_repeats: {(time.perf_counter() - start) / n * 1e6:.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Throughput benchmarks for the bot's gateway handlers, replayed offline.
+
+Each scenario generates a synthetic gateway stream (see replay.py for the
+file format) and replays it into bot.py's handlers in-process, with
+replay.FakeRest standing in for Discord:
+
+- spam-wave:       a crowd of users flooding messages next to normal chat
+                   (anti-spam mutes, notices, modlog)
+- copy-raid:       many accounts posting the same link once each across
+                   channels (duplicate-content detection, batch removal)
+- join-raid:       a burst of member joins (raid detection, batched
+                   welcomes, autorole)
+- reaction-storm:  reactions on a reaction-role panel, unreacts and noise
+                   reactions on other messages
+- command-burst:   /femboymeter and /emojify invocations
+
+Reported per scenario: events/sec until every handler has returned,
+handler p50/p99 latency, outbound REST calls per event (and simulated
+429s), and RSS growth (``--tracemalloc`` adds traced Python allocations).
+
+    python tools/bench_replay.py [--scenario spam-wave] [--scale 1.0] [--latency 0.05]
+    python tools/bench_replay.py --save spam.replay.gz --scenario spam-wave   # write the stream
+    python tools/bench_replay.py --file recorded.replay.gz                    # replay a recording
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Never touch the real settings database
+os.environ["SKYBOT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="skybot-replay-"), "bench.db")
+
+import replay
+
+GUILD_ID = 1 << 41
+BOT_ID = GUILD_ID + 1
+OWNER_ID = GUILD_ID + 2
+GENERAL, WELCOME, MODLOG, VERIFY = (GUILD_ID + 10 + i for i in range(4))
+EXTRA_CHANNELS = 20
+MEMBER_ROLE, MUTED_ROLE, VERIFIED_ROLE, GAMER_ROLE, BOT_ROLE = (GUILD_ID + 100 + i for i in range(5))
+VERIFY_MESSAGE = GUILD_ID + 500
+PANEL_MESSAGE = GUILD_ID + 501
+APPLICATION_ID = BOT_ID
+USER_BASE = 1 << 42
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def user(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"u{user_id}", "discriminator": "0", "avatar": None}
+
+
+def member(user_id: int, roles=()) -> dict:
+    return {"user": user(user_id), "roles": [str(r) for r in roles], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+
+
+def role(role_id: int, name: str, permissions: int = 0, position: int = 1) -> dict:
+    return {"id": str(role_id), "name": name, "permissions": str(permissions), "position": position, "color": 0,
+            "hoist": False, "managed": False, "mentionable": False}
+
+
+def fixture(members: int) -> list:
+    """READY + one GUILD_CREATE with the channels and roles the scenarios use."""
+    channels = [{"id": str(cid), "type": 0, "name": name, "position": i, "permission_overwrites": []}
+                for i, (cid, name) in enumerate([(GENERAL, "general"), (WELCOME, "welcome"), (MODLOG, "modlog"), (VERIFY, "verify")])]
+    channels += [{"id": str(GUILD_ID + 1000 + i), "type": 0, "name": f"chat-{i}", "position": 10 + i, "permission_overwrites": []}
+                 for i in range(EXTRA_CHANNELS)]
+    guild = {
+        "id": str(GUILD_ID), "name": "replay", "owner_id": str(OWNER_ID), "member_count": members + 1,
+        "roles": [role(GUILD_ID, "@everyone", 0x400 | 0x800 | 0x40, 0), role(MEMBER_ROLE, "Member"), role(MUTED_ROLE, "Muted"),
+                  role(VERIFIED_ROLE, "Verified"), role(GAMER_ROLE, "Gamer"), role(BOT_ROLE, "Bot", 0x8, 10)],
+        "channels": channels,
+        "members": [member(BOT_ID, [BOT_ROLE])] + [member(USER_BASE + i, [MEMBER_ROLE]) for i in range(members)],
+        "emojis": [], "stickers": [], "features": [],
+    }
+    return [(0.0, "READY", {"user": dict(user(BOT_ID), bot=True)}), (0.0, "GUILD_CREATE", guild)]
+
+
+def message(at: float, message_id: int, author_id: int, channel_id: int, content: str):
+    return at, "MESSAGE_CREATE", {
+        "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(GUILD_ID), "author": user(author_id),
+        "member": {"roles": [str(MEMBER_ROLE)], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0},
+        "content": content, "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False, "mention_everyone": False,
+        "mentions": [], "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+    }
+
+
+def spam_wave(scale: float, rnd: random.Random) -> list:
+    spammers = int(200 * scale)
+    chatters = int(2000 * scale)
+    events = []
+    next_id = GUILD_ID + 10_000
+    for i in range(chatters):
+        next_id += 1
+        events.append(message(rnd.uniform(0, 10), next_id, USER_BASE + i, GUILD_ID + 1000 + i % EXTRA_CHANNELS, "just chatting"))
+    for i in range(spammers):
+        start = rnd.uniform(2, 6)
+        for n in range(8):
+            next_id += 1
+            events.append(message(start + n * 0.2, next_id, USER_BASE + chatters + i, GENERAL, f"SPAM {n} buy now"))
+    return sorted(events, key=lambda e: e[0])
+
+
+def copy_raid(scale: float, rnd: random.Random) -> list:
+    raiders = int(300 * scale)
+    chatters = int(2000 * scale)
+    events = []
+    next_id = GUILD_ID + 10_000
+    for i in range(chatters):
+        next_id += 1
+        events.append(message(rnd.uniform(0, 10), next_id, USER_BASE + i, GUILD_ID + 1000 + i % EXTRA_CHANNELS,
+                              f"chatting about topic number {rnd.randrange(10_000)}"))
+    for i in range(raiders):
+        # One message each (never trips the per-author limit), same link, any channel
+        next_id += 1
+        events.append(message(rnd.uniform(3, 6), next_id, USER_BASE + chatters + i, GUILD_ID + 1000 + rnd.randrange(EXTRA_CHANNELS),
+                              "FREE NITRO 🎁 claim at https://disc0rd-gift.example/claim"))
+    return sorted(events, key=lambda e: e[0])
+
+
+def join_raid(scale: float, rnd: random.Random) -> list:
+    joins = int(1000 * scale)
+    events = []
+    for i in range(joins):
+        data = dict(member(USER_BASE + 1_000_000 + i), guild_id=str(GUILD_ID))
+        events.append((rnd.uniform(0, 10), "GUILD_MEMBER_ADD", data))
+    return sorted(events, key=lambda e: e[0])
+
+
+def reaction_storm(scale: float, rnd: random.Random) -> list:
+    users = int(3000 * scale)
+    events = []
+    for i in range(users):
+        user_id = USER_BASE + i
+        at = rnd.uniform(0, 10)
+        target, emoji = rnd.choice([(VERIFY_MESSAGE, "✅"), (PANEL_MESSAGE, "🎮"), (GUILD_ID + 20_000 + i, "😂")])
+        payload = {"user_id": str(user_id), "channel_id": str(VERIFY), "message_id": str(target), "guild_id": str(GUILD_ID),
+                   "emoji": {"id": None, "name": emoji}, "member": member(user_id, [MEMBER_ROLE]), "burst": False}
+        events.append((at, "MESSAGE_REACTION_ADD", payload))
+        if target == PANEL_MESSAGE and rnd.random() < 0.3:
+            removal = {k: v for k, v in payload.items() if k != "member"}
+            events.append((at + rnd.uniform(0.1, 2), "MESSAGE_REACTION_REMOVE", removal))
+    return sorted(events, key=lambda e: e[0])
+
+
+def command_burst(scale: float, rnd: random.Random) -> list:
+    invocations = int(500 * scale)
+    events = []
+    for i in range(invocations):
+        user_id = USER_BASE + i
+        if i % 2:
+            target = USER_BASE + rnd.randrange(invocations)
+            target_member = {k: v for k, v in member(target, [MEMBER_ROLE]).items() if k != "user"}
+            data = {"id": str(GUILD_ID + 900), "name": "femboymeter", "type": 1,
+                    "options": [{"name": "user", "type": 6, "value": str(target)}],
+                    "resolved": {"users": {str(target): user(target)}, "members": {str(target): dict(target_member, permissions="3072")}}}
+        else:
+            data = {"id": str(GUILD_ID + 901), "name": "emojify", "type": 1,
+                    "options": [{"name": "text", "type": 3, "value": "hello world " * rnd.randint(1, 40)}]}
+        events.append((rnd.uniform(0, 10), "INTERACTION_CREATE", {
+            "id": str(GUILD_ID + 30_000 + i), "application_id": str(APPLICATION_ID), "type": 2, "token": f"token-{i}",
+            "version": 1, "guild_id": str(GUILD_ID), "channel_id": str(GENERAL),
+            "member": dict(member(user_id, [MEMBER_ROLE]), permissions="3072"), "data": data,
+            "locale": "en-US", "guild_locale": "en-US", "app_permissions": "8",
+        }))
+    return sorted(events, key=lambda e: e[0])
+
+
+SCENARIOS = {
+    "spam-wave": spam_wave,
+    "copy-raid": copy_raid,
+    "join-raid": join_raid,
+    "reaction-storm": reaction_storm,
+    "command-burst": command_burst,
+}
+
+
+def configure(skybot):
+    """Per-guild settings the scenarios exercise, as the setup commands would store them."""
+    skybot.guild_settings[GUILD_ID] = {"welcome_channel": WELCOME, "leave_channel": WELCOME}
+    skybot.autorole_settings[GUILD_ID] = {
+        "autorole": MEMBER_ROLE,
+        "verification": {"channel_id": VERIFY, "message_id": VERIFY_MESSAGE, "role_id": VERIFIED_ROLE},
+    }
+    skybot.reaction_role_panels[GUILD_ID] = {str(PANEL_MESSAGE): {"channel_id": VERIFY, "roles": {"🎮": GAMER_ROLE}}}
+    skybot.reaction_roles.rebuild(GUILD_ID)
+    skybot.log_channels[GUILD_ID] = MODLOG
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def run_scenario(name: str, events: list, args) -> None:
+    # A fresh bot module per scenario so state from one doesn't leak into the next
+    sys.modules.pop("bot", None)
+    import bot as skybot
+
+    rest = replay.FakeRest(latency=args.latency, jitter=args.jitter, limit=args.limit, per=args.per, seed=args.seed)
+    replayer = replay.Replayer(skybot.bot, rest)
+    await replayer.install()
+    # READY/GUILD_CREATE first, outside the measurement
+    setup = [e for e in events if e[1] in ("READY", "GUILD_CREATE")]
+    stream = [e for e in events if e[1] not in ("READY", "GUILD_CREATE")]
+    for _, event_type, data in setup:
+        replayer.feed(event_type, data)
+    rest.install(skybot.bot)
+    configure(skybot)
+
+    rss_before = rss_bytes()
+    if args.tracemalloc:
+        tracemalloc.start()
+    result = await replayer.run(stream, speed=args.speed)
+    traced = tracemalloc.get_traced_memory()[0] if args.tracemalloc else None
+    if args.tracemalloc:
+        tracemalloc.stop()
+    rss_growth = rss_bytes() - rss_before
+    summary = rest.summary()
+
+    events_count = max(1, result["events"])
+    print(f"{name}: {result['events']:,} events ({result['skipped']} skipped)")
+    print(f"  throughput:  {result['events'] / result['handled_seconds']:,.0f} events/s "
+          f"(all handlers returned after {result['handled_seconds']:.2f}s; background queues idle after {result['settled_seconds']:.2f}s)")
+    print(f"  handlers:    {len(replayer.timings):,} runs, p50 {replay.percentile(replayer.timings, 0.5) * 1000:.2f} ms, "
+          f"p99 {replay.percentile(replayer.timings, 0.99) * 1000:.2f} ms, {replayer.errors} errors")
+    print(f"  REST:        {summary['calls']:,} calls ({summary['calls'] / events_count:.3f}/event), "
+          f"{summary['rate_limited']:,} simulated 429s, {summary['waited']:.1f}s spent waiting them out")
+    for route, count in summary["by_route"].most_common(5):
+        print(f"               {count:>6,}  {route}")
+    memory = f"  memory:      RSS +{rss_growth / 1048576:.1f} MiB"
+    if traced is not None:
+        memory += f", {traced / 1048576:.1f} MiB traced Python allocations"
+    print(memory)
+
+    replayer.uninstall()
+    rest.uninstall()
+    for task in (skybot.join_processor.drain(timeout=0), skybot.modlog.drain(), skybot.animator.close()):
+        try:
+            await task
+        except Exception:
+            pass
+    skybot.spam_windows.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="default: all")
+    parser.add_argument("--file", help="replay a recorded/saved stream instead of a scenario")
+    parser.add_argument("--save", help="write the generated scenario stream to this file and exit")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--members", type=int, default=5000, help="members in the synthetic guild")
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake REST latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--limit", type=int, default=50, help="fake REST calls allowed per route bucket per --per seconds")
+    parser.add_argument("--per", type=float, default=1.0)
+    parser.add_argument("--speed", type=float, help="replay at N x recorded speed (default: as fast as possible)")
+    parser.add_argument("--tracemalloc", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL,
+                        handlers=None if args.verbose else [logging.NullHandler()])
+
+    if args.file:
+        started = time.perf_counter()
+        events = list(replay.read_events(args.file))
+        print(f"loaded {len(events):,} events from {args.file} in {time.perf_counter() - started:.2f}s")
+        await run_scenario(os.path.basename(args.file), events, args)
+        return
+
+    for name in args.scenario or sorted(SCENARIOS):
+        rnd = random.Random(args.seed)
+        events = fixture(args.members) + SCENARIOS[name](args.scale, rnd)
+        if args.save:
+            count = replay.write_events(args.save, events)
+            print(f"wrote {count:,} events to {args.save} ({os.path.getsize(args.save) / 1024:.0f} KiB)")
+            return
+        await run_scenario(name, events, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
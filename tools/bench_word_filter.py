@@ -0,0 +1,162 @@
+"""Benchmark the per-guild word/link filter at large list sizes.
+
+Builds a guild list of ``--terms`` entries (words, with a share of blocked
+domains) plus ``--regexes`` patterns, then scans chat-like messages (a mix
+of lengths, some with links, a few containing a banned entry):
+
+- naive:    loop over every entry per message (substring test, then the
+            same boundary rules) and every pattern separately
+- compiled: WordFilters.scan(): one Aho-Corasick pass + one combined regex
+
+Results are checked against each other, then the compiled filter is run
+paced at ``--rate`` messages/s for a few seconds to show the share of the
+event loop it takes and the worst per-message latency.
+
+    python tools/bench_word_filter.py [--terms 10000] [--rate 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import word_filter
+from duplicates import normalize
+
+GUILD_ID = 1
+
+
+def random_word(rnd: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(low, high)))
+
+
+def build_list(rnd: random.Random, terms: int, regexes: int) -> dict:
+    domains = terms // 20
+    words = {random_word(rnd) for _ in range(terms - domains)}
+    words = [w + "*" if rnd.random() < 0.05 else w for w in words]
+    domain_list = [f"{random_word(rnd)}.{rnd.choice(['com', 'net', 'gg', 'xyz'])}" for _ in range(domains)]
+    patterns = [rf"{random_word(rnd, 3, 5)}\d{{2,4}}{random_word(rnd, 2, 3)}" for _ in range(regexes)]
+    return {
+        "words": [word_filter.clean_term(word_filter.WORD, w) for w in words],
+        "domains": list(dict.fromkeys(word_filter.clean_term(word_filter.DOMAIN, d) for d in domain_list)),
+        "regexes": [word_filter.clean_term(word_filter.REGEX, p) for p in patterns],
+    }
+
+
+def build_messages(rnd: random.Random, count: int, conf: dict) -> list[str]:
+    vocab = [random_word(rnd, 2, 8) for _ in range(5000)]
+    messages = []
+    for _ in range(count):
+        words = rnd.choices(vocab, k=rnd.choice([3, 8, 15, 40, 120]))
+        roll = rnd.random()
+        if roll < 0.10:
+            words.append(f"https://{rnd.choice(['cdn.', '', 'www.'])}{random_word(rnd)}.com/{random_word(rnd)}")
+        elif roll < 0.12:
+            words.insert(rnd.randrange(len(words)), rnd.choice(conf["words"]).strip("*"))
+        elif roll < 0.13:
+            words.append(f"https://{rnd.choice(conf['domains'])}/claim")
+        messages.append(" ".join(words).capitalize())
+    return messages
+
+
+class Naive:
+    """What a per-entry loop looks like, with the same matching rules."""
+
+    def __init__(self, conf: dict):
+        self.words = [(w.strip("*"), not w.startswith("*"), not w.endswith("*")) for w in conf["words"]]
+        self.domains = conf["domains"]
+        self.patterns = [re.compile(p, re.IGNORECASE) for p in conf["regexes"]]
+
+    def scan(self, content: str):
+        text = normalize(content)
+        for literal, left, right in self.words:
+            start = text.find(literal)
+            while start != -1:
+                end = start + len(literal)
+                if not ((left and start and word_filter._is_word_char(text[start - 1]))
+                        or (right and end < len(text) and word_filter._is_word_char(text[end]))):
+                    return literal
+                start = text.find(literal, start + 1)
+        for domain in self.domains:
+            if domain in text and word_filter.WordFilters({GUILD_ID: {"domains": [domain]}}).scan(GUILD_ID, content):
+                return domain
+        for pattern in self.patterns:
+            if pattern.search(text):
+                return pattern.pattern
+        return None
+
+
+def timed(label: str, scan, messages: list[str]) -> tuple[float, list]:
+    results = []
+    start = time.perf_counter()
+    for content in messages:
+        results.append(scan(content))
+    per_msg = (time.perf_counter() - start) / len(messages)
+    print(f"  {label:<9} {per_msg * 1e6:9.1f} µs/msg  ({1 / per_msg:,.0f} msgs/s on one core)")
+    return per_msg, results
+
+
+async def paced(filters: word_filter.WordFilters, messages: list[str], rate: float, seconds: float):
+    interval = 1 / rate
+    busy = worst = 0.0
+    count = 0
+    lag = 0.0
+    start = time.perf_counter()
+    while (now := time.perf_counter()) - start < seconds:
+        due = start + count * interval
+        if due > now:
+            await asyncio.sleep(due - now)
+        lag = max(lag, time.perf_counter() - due)
+        t0 = time.perf_counter()
+        filters.scan(GUILD_ID, messages[count % len(messages)])
+        spent = time.perf_counter() - t0
+        busy += spent
+        worst = max(worst, spent)
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"  paced at {rate:,.0f} msgs/s: {count:,} messages in {elapsed:.1f}s, "
+          f"filter busy {busy / elapsed:.1%} of the loop, worst {worst * 1e3:.2f} ms, max schedule lag {lag * 1e3:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--terms", type=int, default=10_000, help="Words + domains in the list")
+    parser.add_argument("--regexes", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--naive-messages", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=1000.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    conf = build_list(rnd, args.terms, args.regexes)
+    messages = build_messages(rnd, args.messages, conf)
+    filters = word_filter.WordFilters({GUILD_ID: conf})
+    start = time.perf_counter()
+    compiled = filters.compile(GUILD_ID)
+    build = time.perf_counter() - start
+    print(f"{len(conf['words']):,} words, {len(conf['domains']):,} domains, {len(conf['regexes'])} patterns; "
+          f"compiled in {build * 1e3:.0f} ms ({len(compiled.automaton.goto):,} automaton states)")
+    print(f"{len(messages):,} messages, average {sum(map(len, messages)) / len(messages):.0f} characters")
+
+    naive = Naive(conf)
+    sample = messages[:args.naive_messages]
+    naive_time, naive_hits = timed("naive", naive.scan, sample)
+    fast_time, _ = timed("compiled", lambda c: filters.scan(GUILD_ID, c), messages)
+    fast_hits = [filters.scan(GUILD_ID, c) for c in sample]
+    mismatches = sum((a is None) != (b is None) for a, b in zip(naive_hits, fast_hits))
+    hits = sum(filters.scan(GUILD_ID, c) is not None for c in messages)
+    print(f"  compiled/naive: {naive_time / fast_time:.0f}x faster; {hits:,} messages matched, "
+          f"{mismatches} disagreements with naive on {len(sample):,}")
+    asyncio.run(paced(filters, messages, args.rate, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Pooled webhook sender with per-webhook rate-limit buckets.
+
+One ``aiohttp.ClientSession`` (and its keep-alive connection pool) is shared
+by all outbound webhook traffic for the life of the bot, instead of a new
+session and TLS handshake per /webhooksend.
+
+Discord rate-limits each webhook separately and reports the budget in the
+``X-RateLimit-Remaining`` / ``X-RateLimit-Reset-After`` headers. Sends to the
+same webhook go through that webhook's bucket one at a time: when the bucket
+is empty the send waits for the reset instead of failing, and a 429 is
+retried after its ``retry_after`` (a global 429 pauses every bucket).
+"""
+
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+MAX_RETRIES = 3
+MAX_BUCKETS = 1000
+
+
+class _Bucket:
+    __slots__ = ("lock", "remaining", "reset_at")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.remaining = 1
+        self.reset_at = 0.0
+
+
+def webhook_id(url: str) -> str:
+    # https://discord.com/api/webhooks/<id>/<token>
+    parts = urlparse(url).path.split("/")
+    try:
+        return parts[parts.index("webhooks") + 1]
+    except (ValueError, IndexError):
+        return url
+
+
+class WebhookClient:
+    def __init__(self, pool_size: int = 20, timeout: float = 15.0):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._buckets = {}
+        self._global_reset_at = 0.0
+        self.stats = {"requests": 0, "rate_limited": 0, "waited": 0.0}
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def queued(self) -> int:
+        return sum(1 for b in self._buckets.values() if b.lock.locked())
+
+    def _bucket(self, url: str) -> _Bucket:
+        key = webhook_id(url)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                now = time.monotonic()
+                for k in [k for k, b in self._buckets.items() if not b.lock.locked() and b.reset_at <= now]:
+                    del self._buckets[k]
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    async def _wait(self, bucket: _Bucket):
+        now = time.monotonic()
+        delay = max(self._global_reset_at - now, 0.0)
+        if bucket.remaining <= 0 and bucket.reset_at > now:
+            delay = max(delay, bucket.reset_at - now)
+        if delay > 0:
+            self.stats["waited"] += delay
+            await asyncio.sleep(delay)
+
+    def _update(self, bucket: _Bucket, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None:
+            bucket.remaining = int(remaining)
+        if reset_after is not None:
+            bucket.reset_at = time.monotonic() + float(reset_after)
+        elif bucket.reset_at <= time.monotonic():
+            bucket.remaining = 1
+
+    async def send(self, url: str, payload: dict) -> tuple[int, str]:
+        """POST one payload, waiting out the webhook's rate limit. Returns (status, body)."""
+        if self._session is None:
+            await self.start()
+        bucket = self._bucket(url)
+        async with bucket.lock:
+            for attempt in range(MAX_RETRIES + 1):
+                await self._wait(bucket)
+                self.stats["requests"] += 1
+                async with self._session.post(url, json=payload) as resp:
+                    self._update(bucket, resp.headers)
+                    body = await resp.text()
+                    if resp.status != 429 or attempt == MAX_RETRIES:
+                        return resp.status, body
+                    self.stats["rate_limited"] += 1
+                    retry_after = resp.headers.get("Retry-After")
+                    try:
+                        data = await resp.json(content_type=None)
+                    except (ValueError, aiohttp.ContentTypeError):
+                        data = None
+                    is_global = False
+                    # Proxies in front of Discord can answer 429 with any body
+                    if isinstance(data, dict):
+                        retry_after = data.get("retry_after", retry_after)
+                        is_global = data.get("global", False)
+                    is_global = is_global or resp.headers.get("X-RateLimit-Global") == "true"
+                    delay = float(retry_after or 1.0)
+                    if is_global:
+                        self._global_reset_at = time.monotonic() + delay
+                    else:
+                        bucket.remaining = 0
+                        bucket.reset_at = time.monotonic() + delay
+        return 429, ""
+
+    async def send_many(self, url: str, payloads: list[dict]) -> list[tuple[int, str]]:
+        """Post several payloads to one webhook in order, paced by its bucket.
+
+        Stops at the first non-2xx result; the results list is shorter than
+        ``payloads`` in that case.
+        """
+        results = []
+        for payload in payloads:
+            status, body = await self.send(url, payload)
+            results.append((status, body))
+            if status not in (200, 204):
+                break
+        return results
@@ -0,0 +1,473 @@
+"""Per-guild banned word / link filter for the message pipeline.
+
+Each guild's list is compiled once into:
+
+- an Aho-Corasick automaton over its banned words and blocked domains, so
+  a message is scanned in one pass however long the list is
+- one combined regex (``(?:a)|(?:b)|...``) for its custom patterns
+
+and cached until the list changes (``invalidate(guild_id)``). A guild with
+nothing configured is cached as ``None`` and costs one dict lookup.
+
+Messages are normalized the same way as for duplicate detection (NFKC,
+casefold, zero-width characters dropped), so fullwidth letters and
+invisible separators don't dodge the list.
+
+Matching rules:
+
+- words match whole words only ("ass" doesn't hit "class"); a leading or
+  trailing ``*`` drops that boundary (``scam*`` also hits "scammer")
+- domains match the host and any subdomain ("example.com" hits
+  "cdn.example.com/x" but not "notexample.com")
+- regexes are Python ``re`` patterns, case-insensitive, searched anywhere
+
+Regexes run on the shared event loop and ``re`` can't be interrupted, so a
+pattern is only accepted if it can't blow up: no nested unbounded
+repeats (``(a+)+``) or unbounded repeats of alternatives, a few unbounded
+repeats at most, a cap on how many ways repeated optional parts can split
+the text (``(a?){25}``). These checks are structural, so the same pattern is always
+accepted or always rejected. ``probe()`` times a pattern on growing
+repetitive inputs for a warning only (run it off the event loop). As a last
+line of defence a guild whose patterns keep taking too long on real
+messages has them switched off until its list changes. Patterns are combined into one
+regex, so named groups, backreferences and global inline flags
+(``(?i)``) are rejected; scoped flags (``(?i:...)``) are fine.
+
+Stored (persisted by the caller) as
+``{guild_id: {"words": [...], "domains": [...], "regexes": [...]}}``.
+"""
+
+import logging
+import re
+import time
+
+try:
+    from re import _parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+
+from duplicates import normalize
+
+log = logging.getLogger("skybot.wordfilter")
+
+WORD = "word"
+DOMAIN = "domain"
+REGEX = "regex"
+KINDS = (WORD, DOMAIN, REGEX)
+_KEYS = {WORD: "words", DOMAIN: "domains", REGEX: "regexes"}
+
+MAX_TERMS = 10_000
+MAX_REGEXES = 50
+MAX_REGEX_LENGTH = 200
+# Quantifiers with no (or a huge) upper bound allowed in one pattern
+MAX_UNBOUNDED = 3
+# Most ways a pattern may split one stretch of text (see _ambiguity)
+MAX_AMBIGUITY = 1000
+# Timing probe (advisory): the pattern is searched in repetitive strings of
+# growing length up to PROBE_MAX_CHARS (Discord's longest message); a round
+# slower than PROBE_BUDGET seconds stops it and the pattern is reported slow
+PROBE_MAX_CHARS = 4000
+PROBE_BUDGET = 0.25
+# A guild's patterns are switched off after SLOW_STRIKES scans slower than this
+SLOW_SCAN = 0.05
+SLOW_STRIKES = 3
+
+_DOMAIN = re.compile(r"^(?:[\w-]+\.)+[\w-]{2,}$")
+# Backreferences would point at the wrong group once patterns are combined,
+# named groups can clash between patterns and global flags must come first
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+_NAMED_GROUP = re.compile(r"\(\?P?<(?![=!])")
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+_REPEATS = ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_host_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "-"
+
+
+def clean_term(kind: str, value: str) -> str:
+    """Normalize one entry for storage; ValueError if it can't be used."""
+    value = value.strip()
+    if kind == REGEX:
+        if len(value) > MAX_REGEX_LENGTH:
+            raise ValueError(f"patterns are limited to {MAX_REGEX_LENGTH} characters")
+        if _BACKREF.search(value):
+            raise ValueError("backreferences aren't supported")
+        if _NAMED_GROUP.search(value):
+            raise ValueError("named groups aren't supported")
+        if _GLOBAL_FLAGS.search(value):
+            raise ValueError("inline flags like (?i) aren't supported (patterns are already case-insensitive; use (?s:...) to scope one)")
+        try:
+            re.compile(value, re.IGNORECASE)
+            tree = _sre_parse.parse(value)
+        except re.error as e:
+            raise ValueError(f"invalid pattern: {e}") from None
+        if _unbounded(tree, nested=False) > MAX_UNBOUNDED:
+            raise ValueError(f"at most {MAX_UNBOUNDED} open-ended repeats (*, +, {{n,}}) per pattern")
+        if _ambiguity(tree) > MAX_AMBIGUITY:
+            raise ValueError("too many ways to match (repeated optional parts or alternatives); simplify the pattern")
+        return value
+    value = normalize(value)
+    if kind == DOMAIN:
+        value = re.sub(r"^[a-z][a-z0-9+.-]*://", "", value).split("/", 1)[0].split(":", 1)[0]
+        value = value.removeprefix("www.").strip(".")
+        if not _DOMAIN.match(value):
+            raise ValueError(f"not a domain: {value or '(empty)'}")
+        return value
+    if not value.strip("*"):
+        raise ValueError("empty word")
+    return value
+
+
+def _children(op: str, av) -> list:
+    if op in _REPEATS:
+        return [av[2]]
+    if op == "SUBPATTERN":
+        return [av[3]]
+    if op == "BRANCH":
+        return list(av[1])
+    if op in ("ASSERT", "ASSERT_NOT"):
+        return [av[1]]
+    if op == "ATOMIC_GROUP":
+        return [av]
+    if op == "GROUPREF_EXISTS":
+        return [p for p in av[1:] if p is not None]
+    return []
+
+
+def _has_branch(tree) -> bool:
+    for op, av in tree:
+        op = str(op)
+        if op == "BRANCH" or any(_has_branch(child) for child in _children(op, av)):
+            return True
+    return False
+
+
+def _ambiguity(tree, nested: bool = False) -> int:
+    """Rough count of the ways a bounded pattern can split one stretch of text.
+
+    Only repeats of something that is itself variable multiply out:
+    ``(a?){25}`` or ``(a|aa){1,30}`` has millions of splits, while
+    ``n{1,20}g{1,20}`` just scans.
+    """
+    total = 1
+    for op, av in tree:
+        op = str(op)
+        if op in _REPEATS:
+            low, high, body = av
+            if high <= 100:
+                total *= _ambiguity(body, True) ** high
+                if nested:
+                    total *= high - low + 1
+        elif op == "BRANCH":
+            total *= sum(_ambiguity(branch, nested) for branch in av[1])
+        else:
+            for child in _children(op, av):
+                total *= _ambiguity(child, nested)
+        if total > MAX_AMBIGUITY:
+            return total
+    return total
+
+
+def _unbounded(tree, nested: bool) -> int:
+    """Count open-ended repeats; ValueError on one inside another."""
+    count = 0
+    for op, av in tree:
+        op = str(op)
+        if op in _REPEATS and av[1] > 100:
+            if nested:
+                raise ValueError("nested repeats like (a+)+ can take forever; flatten the pattern")
+            if _has_branch(av[2]):
+                raise ValueError("open-ended repeats of alternatives like (a|ab)+ can take forever; bound it, e.g. (a|ab){1,10}")
+            count += 1 + sum(_unbounded(child, True) for child in _children(op, av))
+        else:
+            count += sum(_unbounded(child, nested) for child in _children(op, av))
+    return count
+
+
+def _literals(tree, found: set):
+    for op, av in tree:
+        op = str(op)
+        if op == "LITERAL":
+            found.add(chr(av))
+        elif op == "IN":
+            for item_op, item in av:
+                if str(item_op) == "LITERAL":
+                    found.add(chr(item))
+        for child in _children(op, av):
+            _literals(child, found)
+
+
+def max_entries(kind: str) -> int:
+    """Most entries of this kind a server can have."""
+    return MAX_REGEXES if kind == REGEX else MAX_TERMS
+
+
+def probe(pattern: str) -> float:
+    """Time an accepted pattern on near-miss inputs.
+
+    Returns the slowest round in seconds, stopping early once one takes
+    longer than PROBE_BUDGET. Blocking; callers run it in a thread.
+    """
+    compiled = re.compile(pattern, re.IGNORECASE)
+    chars = set()
+    _literals(_sre_parse.parse(pattern), chars)
+    chars = sorted(chars)[:8] + ["a", " ", "0"]
+    worst = 0.0
+    # Grows gently so a blow-up is noticed while each round is still cheap
+    length = 8
+    while length <= PROBE_MAX_CHARS:
+        # Runs of one character, with and without a character that breaks
+        # the match at the end (where backtracking blows up)
+        inputs = [c * length + end for c in chars for end in ("", "!")] + [("".join(chars) * length)[:length]]
+        start = time.perf_counter()
+        for text in inputs:
+            compiled.search(text)
+        worst = max(worst, time.perf_counter() - start)
+        if worst > PROBE_BUDGET:
+            break
+        length = length * 3 // 2
+    return worst
+
+
+def _combine(patterns: list):
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class Match:
+    __slots__ = ("kind", "term")
+
+    def __init__(self, kind: str, term: str):
+        self.kind = kind
+        self.term = term
+
+
+class _Automaton:
+    """Aho-Corasick over normalized text; outputs are checked for boundaries on a hit."""
+
+    __slots__ = ("goto", "fail", "out", "terms")
+
+    def __init__(self, entries):
+        # entries: [(literal, kind, left boundary, right boundary, display term)]
+        goto = [{}]
+        out = [()]
+        self.terms = []
+        for literal, kind, left, right, term in entries:
+            state = 0
+            for ch in literal:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += ((len(literal), kind, left, right, len(self.terms)),)
+            self.terms.append(term)
+        # Breadth-first failure links; each state's outputs include its fallbacks'
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] += out[fail[nxt]]
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+
+    def search(self, text: str) -> Match | None:
+        goto, fail, out = self.goto, self.fail, self.out
+        root = goto[0]
+        state = 0
+        row = root
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            nxt = row.get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            if nxt is None:
+                state, row = 0, root
+                continue
+            state = nxt
+            row = goto[state]
+            if not out[state]:
+                continue
+            for length, kind, left, right, index in out[state]:
+                start = i - length + 1
+                if kind == DOMAIN:
+                    # Host boundary on the left (a dot is fine: subdomain); on the
+                    # right allow a trailing dot only if the host ends there
+                    if start and _is_host_char(text[start - 1]):
+                        continue
+                    if i < last:
+                        after = text[i + 1]
+                        if _is_host_char(after) or (after == "." and i + 1 < last and _is_host_char(text[i + 2])):
+                            continue
+                else:
+                    if left and start and _is_word_char(text[start - 1]):
+                        continue
+                    if right and i < last and _is_word_char(text[i + 1]):
+                        continue
+                return Match(kind, self.terms[index])
+        return None
+
+
+class _Compiled:
+    __slots__ = ("automaton", "regex", "patterns")
+
+    def __init__(self, automaton: _Automaton | None, regex, patterns: list):
+        self.automaton = automaton
+        self.regex = regex
+        self.patterns = patterns
+
+
+_MISSING = object()
+
+
+class WordFilters:
+    def __init__(self, settings: dict | None = None):
+        # {guild_id: {"words": [...], "domains": [...], "regexes": [...]}} (persisted by the caller)
+        self.settings = settings if settings is not None else {}
+        # {guild_id: _Compiled | None}
+        self._compiled = {}
+        self.stats = {"scanned": 0, "matched": 0, "compiles": 0, "bad_patterns": 0, "slow_scans": 0}
+        # {guild_id: slow regex scans since its last compile}
+        self._slow = {}
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def terms(self, guild_id: int, kind: str) -> list[str]:
+        return self.settings.get(guild_id, {}).get(_KEYS[kind], [])
+
+    def count(self, guild_id: int) -> int:
+        conf = self.settings.get(guild_id, {})
+        return len(conf.get("words", ())) + len(conf.get("domains", ()))
+
+    def add(self, guild_id: int, kind: str, values) -> list[str]:
+        """Add entries (already cleaned); returns the ones that were new."""
+        current = self.terms(guild_id, kind)
+        seen = set(current)
+        added = [v for v in dict.fromkeys(values) if v not in seen]
+        if not added:
+            return []
+        if kind == REGEX:
+            if len(current) + len(added) > MAX_REGEXES:
+                raise ValueError(f"at most {MAX_REGEXES} patterns per server")
+            try:
+                _combine(current + added)
+            except re.error as e:
+                raise ValueError(f"patterns don't combine: {e}") from None
+        elif self.count(guild_id) + len(added) > MAX_TERMS:
+            raise ValueError(f"at most {MAX_TERMS:,} words and domains per server")
+        self.settings.setdefault(guild_id, {})[_KEYS[kind]] = current + added
+        self.invalidate(guild_id)
+        return added
+
+    def remove(self, guild_id: int, kind: str, values) -> list[str]:
+        conf = self.settings.get(guild_id, {})
+        current = conf.get(_KEYS[kind], [])
+        drop = set(values)
+        removed = [v for v in current if v in drop]
+        if removed:
+            conf[_KEYS[kind]] = [v for v in current if v not in drop]
+            self._tidy(guild_id)
+        return removed
+
+    def clear(self, guild_id: int, kind: str | None = None):
+        conf = self.settings.get(guild_id, {})
+        for k in (kind,) if kind else KINDS:
+            conf.pop(_KEYS[k], None)
+        self._tidy(guild_id)
+
+    def _tidy(self, guild_id: int):
+        conf = self.settings.get(guild_id)
+        if conf is not None and not any(conf.values()):
+            del self.settings[guild_id]
+        self.invalidate(guild_id)
+
+    def invalidate(self, guild_id: int | None = None):
+        if guild_id is None:
+            self._compiled.clear()
+            self._slow.clear()
+        else:
+            self._compiled.pop(guild_id, None)
+            self._slow.pop(guild_id, None)
+
+    def compile(self, guild_id: int) -> _Compiled | None:
+        conf = self.settings.get(guild_id, {})
+        entries = []
+        for word in conf.get("words", ()):
+            entries.append((word.strip("*"), WORD, not word.startswith("*"), not word.endswith("*"), word))
+        for domain in conf.get("domains", ()):
+            entries.append((domain, DOMAIN, True, True, domain))
+        patterns = self._usable_patterns(guild_id, conf.get("regexes", ()))
+        compiled = None
+        if entries or patterns:
+            regex = _combine(patterns) if patterns else None
+            compiled = _Compiled(_Automaton(entries) if entries else None, regex, patterns)
+            self.stats["compiles"] += 1
+        self._compiled[guild_id] = compiled
+        return compiled
+
+    def _usable_patterns(self, guild_id: int, stored) -> list:
+        # Stored lists are validated on /wordfilter, but may predate a check or
+        # come from an older version: skip (and log) anything that would break
+        # the combined regex instead of failing on every message
+        usable = []
+        for pattern in stored:
+            try:
+                re.compile(pattern)
+                if _BACKREF.search(pattern) or _NAMED_GROUP.search(pattern) or _GLOBAL_FLAGS.search(pattern):
+                    raise re.error("can't be combined")
+                tree = _sre_parse.parse(pattern)
+                if _unbounded(tree, nested=False) > MAX_UNBOUNDED or _ambiguity(tree) > MAX_AMBIGUITY:
+                    raise ValueError("too complex")
+                _combine(usable + [pattern])
+            except (re.error, ValueError) as e:
+                self.stats["bad_patterns"] += 1
+                log.warning("Skipping word filter pattern %r in guild %s: %s", pattern, guild_id, e)
+                continue
+            usable.append(pattern)
+        return usable
+
+    def scan(self, guild_id: int, content: str) -> Match | None:
+        compiled = self._compiled.get(guild_id, _MISSING)
+        if compiled is _MISSING:
+            compiled = self.compile(guild_id)
+        if compiled is None or not content:
+            return None
+        self.stats["scanned"] += 1
+        text = normalize(content)
+        match = compiled.automaton.search(text) if compiled.automaton else None
+        if match is None and compiled.regex is not None:
+            start = time.perf_counter()
+            hit = compiled.regex.search(text)
+            elapsed = time.perf_counter() - start
+            if elapsed > SLOW_SCAN:
+                self._slow_scan(guild_id, compiled, elapsed)
+            if hit:
+                # Rare path: find which pattern it was for the log
+                term = next((p for p in compiled.patterns if re.search(p, hit.group(0), re.IGNORECASE)), hit.group(0))
+                match = Match(REGEX, term)
+        if match is not None:
+            self.stats["matched"] += 1
+        return match
+
+    def _slow_scan(self, guild_id: int, compiled: _Compiled, elapsed: float):
+        self.stats["slow_scans"] += 1
+        strikes = self._slow[guild_id] = self._slow.get(guild_id, 0) + 1
+        log.warning("Word filter patterns in guild %s took %.0f ms on one message", guild_id, elapsed * 1e3)
+        if strikes >= SLOW_STRIKES:
+            # Stalls every guild on this loop: off until the list changes
+            log.warning("Turning off word filter patterns in guild %s after %s slow scans", guild_id, strikes)
+            compiled.regex = None